@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Converter Micro-Benchmark
+
+Times each stage of the Markdown → Confluence storage format conversion on
+synthetic pages of configurable size and feature mix, and compares the plugin's
+converter with the upstream mistune + md2cf implementation (``packages/extracted``).
+Runs entirely offline.
+
+Stages timed for the plugin converter:
+- ``image_scan``: ``_find_markdown_images``
+- ``render``: ``_render_markdown``
+- ``convert``: ``_convert_html_to_confluence`` (includes sanitising)
+- ``total``: ``_convert_markdown_to_confluence``
+
+Usage:
+python benchmarks/converter_benchmark.py --sizes 4,64,512 --pages 20
+python benchmarks/converter_benchmark.py --mix code=4,table=1 --save baseline.json
+python benchmarks/converter_benchmark.py --baseline baseline.json --tolerance 10
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXTRACTED_DIR = os.path.join(ROOT_DIR, 'packages', 'extracted', 'mkdocs_confluence_publisher')
+sys.path.insert(0, ROOT_DIR)
+
+from mkdocs_confluence_publisher import ConfluencePublisherPlugin  # noqa: E402
+
+FEATURES = ('text', 'code', 'table', 'admonition', 'image', 'svg', 'drawio')
+DEFAULT_MIX = 'text=4,code=2,table=1,admonition=1,image=1,svg=1,drawio=1'
+
+WORDS = (
+    'confluence publish page section attachment diagram build config nav '
+    'markdown storage format table macro render space parent version token'
+).split()
+
+# A 1x1 transparent PNG, written once per image name so the image scan finds real files
+PNG_BYTES = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082'
+)
+
+
+def _sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _block_text(rng, index):
+    return f"## Section {index}\n\n" + ' '.join(_sentence(rng) for _ in range(6)) + '\n'
+
+
+def _block_code(rng, index):
+    language = rng.choice(('python', 'yaml', 'json', 'bash'))
+    lines = '\n'.join(f"value_{i} = '{rng.choice(WORDS)}'  # <{rng.choice(WORDS)}>" for i in range(20))
+    return f"```{language}\n{lines}\n```\n"
+
+
+def _block_table(rng, index):
+    columns = 12
+    header = '| ' + ' | '.join(f'Column {c}' for c in range(columns)) + ' |'
+    divider = '|' + '---|' * columns
+    rows = [
+        '| ' + ' | '.join(rng.choice(WORDS) for _ in range(columns)) + ' |'
+        for _ in range(15)
+    ]
+    return '\n'.join([header, divider] + rows) + '\n'
+
+
+def _block_admonition(rng, index):
+    kind = rng.choice(('note', 'tip', 'warning', 'danger', 'example'))
+    body = '\n'.join(f"    {_sentence(rng)}" for _ in range(3))
+    return f'!!! {kind} "Admonition {index}"\n{body}\n'
+
+
+def _block_image(rng, index):
+    return f"![Figure {index}](images/figure-{index % 10}.png)\n"
+
+
+def _block_svg(rng, index):
+    shapes = ''.join(
+        f'<rect x="{i * 10}" y="{rng.randint(0, 90)}" width="8" height="8" fill="#{rng.randrange(0xffffff):06x}"/>'
+        for i in range(60)
+    )
+    return f'<div class="inline-svg"><svg xmlns="http://www.w3.org/2000/svg" width="600" height="100">{shapes}</svg></div>\n'
+
+
+def _block_drawio(rng, index):
+    cells = ''.join(
+        f'<mxCell id="{index}-{i}" value="{rng.choice(WORDS)}" vertex="1" parent="1">'
+        f'<mxGeometry x="{i * 20}" y="{i * 10}" width="120" height="60" as="geometry"/></mxCell>'
+        for i in range(40)
+    )
+    return (
+        f'<div class="drawio"><mxfile host="drawio"><diagram id="d{index}">'
+        f'<mxGraphModel><root>{cells}</root></mxGraphModel></diagram></mxfile>'
+        f'<img src="" alt="" /></div>\n'
+    )
+
+
+BLOCK_GENERATORS = {
+    'text': _block_text,
+    'code': _block_code,
+    'table': _block_table,
+    'admonition': _block_admonition,
+    'image': _block_image,
+    'svg': _block_svg,
+    'drawio': _block_drawio,
+}
+
+
+def parse_mix(value):
+    """Parse a feature mix such as ``code=3,table=1`` into feature weights."""
+    mix = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in BLOCK_GENERATORS:
+            raise argparse.ArgumentTypeError(f"Unknown feature '{name}', expected one of: {', '.join(FEATURES)}")
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid weight for '{name}': {weight}")
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("Feature mix must give at least one feature a positive weight")
+    return mix
+
+
+def generate_page(size_kb, mix, seed):
+    """Generate a synthetic Markdown page of roughly ``size_kb`` kilobytes."""
+    rng = random.Random(seed)
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    blocks = [f"# Synthetic page {seed}\n"]
+    size = len(blocks[0])
+    index = 0
+    while size < size_kb * 1024:
+        block = BLOCK_GENERATORS[rng.choices(names, weights)[0]](rng, index)
+        blocks.append(block)
+        size += len(block.encode('utf-8')) + 1
+        index += 1
+    return '\n'.join(blocks)
+
+
+def build_corpus(docs_dir, size_kb, pages, mix, seed):
+    """Write a corpus of synthetic pages to disk and return (page stub, markdown) pairs."""
+    corpus_dir = os.path.join(docs_dir, f'{size_kb}kb')
+    image_dir = os.path.join(corpus_dir, 'images')
+    os.makedirs(image_dir, exist_ok=True)
+    for i in range(10):
+        with open(os.path.join(image_dir, f'figure-{i}.png'), 'wb') as f:
+            f.write(PNG_BYTES)
+
+    corpus = []
+    for n in range(pages):
+        markdown = generate_page(size_kb, mix, seed + n)
+        path = os.path.join(corpus_dir, f'page-{n}.md')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(markdown)
+        # The converters only read the page's source location
+        page = types.SimpleNamespace(file=types.SimpleNamespace(abs_src_path=path, src_path=f'page-{n}.md'))
+        corpus.append((page, markdown))
+    return corpus
+
+
+def load_extracted_converter():
+    """Import ``generate_confluence_content`` from the extracted upstream package.
+
+    The package's ``__init__`` imports its plugin (and the atlassian client), so the
+    module is loaded through a bare package object instead. Returns None when mistune
+    or md2cf are not installed.
+    """
+    package_name = '_extracted_confluence_publisher'
+    if package_name not in sys.modules:
+        package = types.ModuleType(package_name)
+        package.__path__ = [EXTRACTED_DIR]
+        sys.modules[package_name] = package
+    try:
+        module = importlib.import_module(f'{package_name}.update_page')
+    except ImportError as e:
+        print(f"Warning: skipping extracted converter ({e})")
+        return None
+    return module.generate_confluence_content
+
+
+def converter_stages(implementations):
+    """Map each implementation to its named stages.
+
+    A stage is a ``(page, markdown)`` callable, or a ``(prepare, func)`` pair whose
+    ``prepare(markdown)`` output is computed untimed and passed to ``func``.
+    """
+    stages = {}
+    if 'plugin' in implementations:
+        plugin = ConfluencePublisherPlugin()
+        stages['plugin'] = {
+            'image_scan': lambda page, md: plugin._find_markdown_images(md, page),
+            'render': lambda page, md: plugin._render_markdown(md),
+            # Fed with pre-rendered HTML, see run_stage
+            'convert': (plugin._render_markdown, plugin._convert_html_to_confluence),
+            'total': lambda page, md: plugin._convert_markdown_to_confluence(md, page),
+        }
+    if 'extracted' in implementations:
+        generate_confluence_content = load_extracted_converter()
+        if generate_confluence_content:
+            stages['extracted'] = {
+                'total': lambda page, md: generate_confluence_content(md, {}, page),
+            }
+    return stages
+
+
+def run_stage(stage, corpus, repeat):
+    """Time a stage over the corpus, returning per-run wall times and peak memory."""
+    if isinstance(stage, tuple):
+        # Prepare the stage input outside the timed region
+        prepare, stage_func = stage
+        inputs = [prepare(md) for _, md in corpus]
+        func = lambda: [stage_func(value) for value in inputs]
+    else:
+        func = lambda: [stage(page, md) for page, md in corpus]
+
+    func()  # warm-up: imports, regex compilation, extension loading
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    # Measured separately, tracing would distort the timings above
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return times, peak
+
+
+def run_benchmarks(args):
+    mix = args.mix
+    stages = converter_stages(args.implementations)
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix='converter-bench-') as docs_dir:
+        for size_kb in args.sizes:
+            corpus = build_corpus(docs_dir, size_kb, args.pages, mix, args.seed)
+            corpus_bytes = sum(len(md.encode('utf-8')) for _, md in corpus)
+            for implementation, implementation_stages in stages.items():
+                for stage_name, stage in implementation_stages.items():
+                    times, peak = run_stage(stage, corpus, args.repeat)
+                    best = min(times)
+                    results.append({
+                        'implementation': implementation,
+                        'stage': stage_name,
+                        'size_kb': size_kb,
+                        'pages': len(corpus),
+                        'bytes': corpus_bytes,
+                        'best_s': best,
+                        'median_s': statistics.median(times),
+                        'pages_per_s': len(corpus) / best if best else None,
+                        'mb_per_s': corpus_bytes / best / 1e6 if best else None,
+                        'peak_memory_bytes': peak,
+                    })
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'sizes': args.sizes,
+            'pages': args.pages,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'mix': mix,
+        },
+        'results': results,
+    }
+
+
+def _result_key(result):
+    return result['implementation'], result['stage'], result['size_kb']
+
+
+def print_report(report, baseline=None, tolerance=10.0):
+    """Print a results table, with the change against a baseline when one is given.
+
+    Returns the number of results that got slower than the baseline by more than
+    ``tolerance`` percent.
+    """
+    baseline_results = {_result_key(r): r for r in (baseline or {}).get('results', [])}
+    regressions = 0
+
+    header = f"{'implementation':<12} {'stage':<11} {'size':>7} {'pages/s':>10} {'MB/s':>8} {'peak MB':>9}"
+    if baseline_results:
+        header += f" {'vs base':>9}"
+    print(header)
+    print('-' * len(header))
+
+    for result in report['results']:
+        line = (
+            f"{result['implementation']:<12} {result['stage']:<11} {result['size_kb']:>5}kB "
+            f"{result['pages_per_s']:>10.1f} {result['mb_per_s']:>8.2f} "
+            f"{result['peak_memory_bytes'] / 1e6:>9.2f}"
+        )
+        previous = baseline_results.get(_result_key(result))
+        if previous and previous['best_s']:
+            change = (result['best_s'] - previous['best_s']) / previous['best_s'] * 100
+            line += f" {change:>+8.1f}%"
+            if change > tolerance:
+                line += '  REGRESSION'
+                regressions += 1
+        print(line)
+
+    # Side-by-side totals make the implementation comparison easy to read
+    totals = {}
+    for result in report['results']:
+        if result['stage'] == 'total':
+            totals.setdefault(result['size_kb'], {})[result['implementation']] = result['best_s']
+    for size_kb, by_implementation in totals.items():
+        if 'plugin' in by_implementation and 'extracted' in by_implementation and by_implementation['plugin']:
+            ratio = by_implementation['extracted'] / by_implementation['plugin']
+            print(f"{size_kb}kB pages: extracted converter takes {ratio:.2f}x the plugin converter's time")
+
+    return regressions
+
+
+def _size_list(value):
+    try:
+        sizes = [int(size) for size in value.split(',') if size.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size list: {value}")
+    if not sizes or min(sizes) <= 0:
+        raise argparse.ArgumentTypeError("Page sizes must be positive kilobyte values")
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Markdown to Confluence storage format converters')
+    parser.add_argument('--sizes', type=_size_list, default=[4, 64, 512],
+                        help='Comma-separated page sizes in kB (default: 4,64,512)')
+    parser.add_argument('--pages', type=int, default=20, help='Pages per corpus (default: 20)')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'Feature weights, from: {", ".join(FEATURES)} (default: {DEFAULT_MIX})')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per stage; the best is reported (default: 5)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for page generation (default: 0)')
+    parser.add_argument('--implementations', default='plugin,extracted',
+                        type=lambda value: [name.strip() for name in value.split(',') if name.strip()],
+                        help='Converters to run: plugin, extracted (default: both)')
+    parser.add_argument('--save', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Compare against results previously written with --save')
+    parser.add_argument('--tolerance', type=float, default=10.0,
+                        help='Slowdown in percent reported as a regression (default: 10)')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    report = run_benchmarks(args)
+    regressions = print_report(report, baseline, args.tolerance)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if regressions:
+        print(f"{regressions} result(s) regressed by more than {args.tolerance:.0f}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""
+Fake Confluence REST Server
+
+An in-process stand-in for the parts of the Confluence REST API the publisher
+uses, for benchmarks and local experiments without a live Confluence:
+
+- ``GET/POST /rest/api/content`` (title lookup, page creation)
+- ``GET/PUT/DELETE /rest/api/content/{id}`` (page and version, page update and move, deletion)
+- ``GET /rest/api/content/{id}/descendant/page``
+- ``GET/POST /rest/api/content/{id}/child/attachment`` and ``.../{attachment_id}/data``
+
+Latency, throttling (429 with ``Retry-After``) and failures can be injected, and
+every request is counted per endpoint together with the bytes transferred.
+
+Usage:
+    with FakeConfluenceServer(parent_page_id=1000, latency=0.02, rate_limit=50) as server:
+        os.environ['CONFLUENCE_URL'] = server.url
+        ...
+        print(server.stats.summary())
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+ROUTES = [
+    ('GET', re.compile(r'^/rest/api/content$'), '_find_pages'),
+    ('POST', re.compile(r'^/rest/api/content$'), '_create_page'),
+    ('GET', re.compile(r'^/rest/api/content/(\d+)$'), '_get_page'),
+    ('PUT', re.compile(r'^/rest/api/content/(\d+)$'), '_update_page'),
+    ('DELETE', re.compile(r'^/rest/api/content/(\d+)$'), '_delete_page'),
+    ('GET', re.compile(r'^/rest/api/content/(\d+)/descendant/page$'), '_get_descendants'),
+    ('GET', re.compile(r'^/rest/api/content/(\d+)/child/attachment$'), '_get_attachments'),
+    ('POST', re.compile(r'^/rest/api/content/(\d+)/child/attachment$'), '_create_attachment'),
+    ('POST', re.compile(r'^/rest/api/content/(\d+)/child/attachment/(att\d+)/data$'), '_update_attachment'),
+]
+
+
+def endpoint_name(method: str, path: str) -> str:
+    """Collapse IDs in a request path so requests group by endpoint."""
+    path = re.sub(r'/att\d+', '/{attachment_id}', path)
+    path = re.sub(r'/\d+', '/{id}', path)
+    return f"{method} {path[len('/rest/api'):] if path.startswith('/rest/api') else path}"
+
+
+class RequestStats:
+    """Thread-safe request counters, per endpoint and in total."""
+
+    def __init__(self):
+        self.endpoints: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, status: int, bytes_in: int, bytes_out: int):
+        with self._lock:
+            entry = self.endpoints.setdefault(endpoint, {
+                'requests': 0, 'bytes_in': 0, 'bytes_out': 0, 'statuses': {},
+            })
+            entry['requests'] += 1
+            entry['bytes_in'] += bytes_in
+            entry['bytes_out'] += bytes_out
+            entry['statuses'][str(status)] = entry['statuses'].get(str(status), 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+
+    def summary(self) -> dict:
+        """Return the counters with totals across all endpoints."""
+        with self._lock:
+            endpoints = json.loads(json.dumps(self.endpoints))
+        return {
+            'requests': sum(e['requests'] for e in endpoints.values()),
+            'bytes_in': sum(e['bytes_in'] for e in endpoints.values()),
+            'bytes_out': sum(e['bytes_out'] for e in endpoints.values()),
+            'endpoints': endpoints,
+        }
+
+
+class FakeConfluence:
+    """In-memory Confluence space: pages with versions and their attachments."""
+
+    def __init__(self, space_key: str, parent_page_id: int):
+        self.space_key = space_key
+        self.pages: Dict[int, dict] = {}
+        self.attachments: Dict[int, Dict[str, dict]] = {}
+        self._next_id = parent_page_id + 1
+        self._next_attachment_id = 1
+        self._lock = threading.Lock()
+        self.add_page('Benchmark Root', None, page_id=parent_page_id)
+
+    def add_page(self, title: str, parent_id: Optional[int], body: str = '', page_id: Optional[int] = None) -> dict:
+        with self._lock:
+            if page_id is None:
+                page_id = self._next_id
+                self._next_id += 1
+            page = {'id': page_id, 'title': title, 'parent_id': parent_id, 'version': 1, 'body': body}
+            self.pages[page_id] = page
+            return page
+
+    def delete_page(self, page: dict):
+        """Remove a page and its attachments; its children move up to its parent, as in Confluence."""
+        with self._lock:
+            del self.pages[page['id']]
+            self.attachments.pop(page['id'], None)
+            for child in self.pages.values():
+                if child['parent_id'] == page['id']:
+                    child['parent_id'] = page['parent_id']
+
+    def ancestors(self, page: dict) -> List[dict]:
+        chain = []
+        parent_id = page['parent_id']
+        while parent_id is not None and parent_id in self.pages:
+            chain.append(self.pages[parent_id])
+            parent_id = self.pages[parent_id]['parent_id']
+        return list(reversed(chain))
+
+    def page_json(self, page: dict, expand: str = '') -> dict:
+        data = {
+            'id': str(page['id']),
+            'type': 'page',
+            'title': page['title'],
+            'space': {'key': self.space_key},
+            'version': {'number': page['version']},
+        }
+        if 'body.storage' in expand:
+            data['body'] = {'storage': {'value': page['body'], 'representation': 'storage'}}
+        if 'ancestors' in expand:
+            data['ancestors'] = [{'id': str(a['id']), 'title': a['title']} for a in self.ancestors(page)]
+        return data
+
+    def attachment_json(self, attachment: dict) -> dict:
+        return {
+            'id': attachment['id'],
+            'type': 'attachment',
+            'title': attachment['title'],
+            'version': {'number': attachment['version']},
+            'metadata': {'comment': attachment['comment']},
+            'extensions': {'fileSize': attachment['size']},
+        }
+
+    def put_attachment(self, page_id: int, title: str, comment: str, size: int,
+                       attachment_id: Optional[str] = None) -> Optional[dict]:
+        with self._lock:
+            page_attachments = self.attachments.setdefault(page_id, {})
+            if attachment_id:
+                attachment = next((a for a in page_attachments.values() if a['id'] == attachment_id), None)
+                if attachment is None:
+                    return None
+                attachment.update(comment=comment, size=size, version=attachment['version'] + 1)
+                return attachment
+            attachment = page_attachments.get(title)
+            if attachment is None:
+                attachment = {'id': f'att{self._next_attachment_id}', 'title': title, 'version': 0}
+                self._next_attachment_id += 1
+                page_attachments[title] = attachment
+            attachment.update(comment=comment, size=size, version=attachment['version'] + 1)
+            return attachment
+
+
+def _paginate(items: list, params: dict, default_limit: int = 25, max_limit: int = 200) -> dict:
+    start = int(params.get('start', 0))
+    limit = min(int(params.get('limit', default_limit)), max_limit)
+    results = items[start:start + limit]
+    links = {}
+    if start + limit < len(items):
+        links['next'] = f'?start={start + limit}&limit={limit}'
+    return {'results': results, 'start': start, 'limit': limit, 'size': len(results), '_links': links}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; don't let Nagle delay the body
+    disable_nagle_algorithm = True
+    server: 'FakeConfluenceServer'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method: str):
+        parts = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        endpoint = endpoint_name(method, parts.path)
+
+        status, payload, headers = self._respond_to(method, parts.path, params, body)
+        data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.stats.record(endpoint, status, len(self.requestline) + length, len(data))
+
+    def _respond_to(self, method: str, path: str, params: dict, body: bytes):
+        server = self.server
+        server.inject_latency()
+
+        retry_after = server.throttle()
+        if retry_after is not None:
+            return 429, {'message': 'Rate limit exceeded'}, {'Retry-After': f'{retry_after:.2f}'}
+        if server.should_fail():
+            return 503, {'message': 'Injected failure'}, {}
+
+        for route_method, pattern, handler in ROUTES:
+            match = pattern.match(path)
+            if match and route_method == method:
+                return getattr(self, handler)(params, body, *match.groups())
+        return 404, {'message': f'No route for {method} {path}'}, {}
+
+    # Page endpoints
+
+    def _find_pages(self, params, body):
+        space = self.server.space
+        title = params.get('title')
+        results = [
+            space.page_json(page, params.get('expand', ''))
+            for page in list(space.pages.values())
+            if page['title'] == title and params.get('spaceKey', space.space_key) == space.space_key
+        ]
+        return 200, _paginate(results, params), {}
+
+    def _create_page(self, params, body):
+        space = self.server.space
+        data = json.loads(body or b'{}')
+        title = data.get('title')
+        if any(page['title'] == title for page in list(space.pages.values())):
+            return 400, {'message': f'A page with this title already exists: {title}'}, {}
+        ancestors = data.get('ancestors') or []
+        parent_id = int(ancestors[-1]['id']) if ancestors else None
+        page = space.add_page(title, parent_id, data.get('body', {}).get('storage', {}).get('value', ''))
+        return 200, space.page_json(page, 'ancestors'), {}
+
+    def _get_page(self, params, body, page_id):
+        space = self.server.space
+        page = space.pages.get(int(page_id))
+        if not page:
+            return 404, {'message': 'Page not found'}, {}
+        return 200, space.page_json(page, params.get('expand', '')), {}
+
+    def _update_page(self, params, body, page_id):
+        space = self.server.space
+        page = space.pages.get(int(page_id))
+        if not page:
+            return 404, {'message': 'Page not found'}, {}
+        data = json.loads(body or b'{}')
+        version = data.get('version', {}).get('number')
+        if version != page['version'] + 1:
+            return 409, {'message': f'Version must be {page["version"] + 1}, got {version}'}, {}
+        title = data.get('title', page['title'])
+        if any(other['title'] == title and other is not page for other in list(space.pages.values())):
+            return 400, {'message': f'A page with this title already exists: {title}'}, {}
+        ancestors = data.get('ancestors') or []
+        page.update(
+            title=title,
+            parent_id=int(ancestors[-1]['id']) if ancestors else page['parent_id'],
+            body=data.get('body', {}).get('storage', {}).get('value', page['body']),
+            version=version,
+        )
+        return 200, space.page_json(page), {}
+
+    def _delete_page(self, params, body, page_id):
+        space = self.server.space
+        page = space.pages.get(int(page_id))
+        if not page:
+            return 404, {'message': 'Page not found'}, {}
+        space.delete_page(page)
+        return 204, None, {}
+
+    def _get_descendants(self, params, body, page_id):
+        space = self.server.space
+        page_id = int(page_id)
+        results = [
+            space.page_json(page, params.get('expand', ''))
+            for page in list(space.pages.values())
+            if any(a['id'] == page_id for a in space.ancestors(page))
+        ]
+        return 200, _paginate(results, params), {}
+
+    # Attachment endpoints
+
+    def _get_attachments(self, params, body, page_id):
+        space = self.server.space
+        attachments = list(space.attachments.get(int(page_id), {}).values())
+        return 200, _paginate([space.attachment_json(a) for a in attachments], params, 50), {}
+
+    def _parse_upload(self, body: bytes):
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode('utf-8') + body
+        )
+        fields, filename, size = {}, None, 0
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if name == 'file':
+                filename = part.get_filename()
+                size = len(part.get_payload(decode=True) or b'')
+            elif name:
+                fields[name] = part.get_content().strip()
+        return filename, fields.get('comment', ''), size
+
+    def _create_attachment(self, params, body, page_id):
+        return self._store_attachment(int(page_id), body, None)
+
+    def _update_attachment(self, params, body, page_id, attachment_id):
+        return self._store_attachment(int(page_id), body, attachment_id)
+
+    def _store_attachment(self, page_id: int, body: bytes, attachment_id: Optional[str]):
+        space = self.server.space
+        if page_id not in space.pages:
+            return 404, {'message': 'Page not found'}, {}
+        filename, comment, size = self._parse_upload(body)
+        if not filename:
+            return 400, {'message': 'No file in upload'}, {}
+        attachment = space.put_attachment(page_id, filename, comment, size, attachment_id)
+        if attachment is None:
+            return 404, {'message': 'Attachment not found'}, {}
+        return 200, {'results': [space.attachment_json(attachment)]}, {}
+
+
+class FakeConfluenceServer(ThreadingHTTPServer):
+    """Fake Confluence listening on localhost, served from a background thread.
+
+    Args:
+        parent_page_id: ID of the pre-existing root page pages are published under.
+        latency: Seconds added to every request.
+        jitter: Upper bound of a random extra delay per request, in seconds.
+        rate_limit: Requests per second served before answering 429 (0 = unlimited).
+        retry_after: ``Retry-After`` seconds sent with 429 responses.
+        failure_rate: Fraction of requests answered with 503.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, space_key: str = 'BENCH', parent_page_id: int = 1000, latency: float = 0.0,
+                 jitter: float = 0.0, rate_limit: float = 0.0, retry_after: float = 1.0,
+                 failure_rate: float = 0.0, seed: int = 0, port: int = 0):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.space = FakeConfluence(space_key, parent_page_id)
+        self.stats = RequestStats()
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def inject_latency(self):
+        delay = self.latency
+        if self.jitter:
+            with self._lock:
+                delay += self._random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+    def throttle(self) -> Optional[float]:
+        """Count a request against the per-second budget; return Retry-After if over it."""
+        if self.rate_limit <= 0:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+            if self._window_count > self.rate_limit:
+                return min(self.retry_after, 1.0 - (now - self._window_start))
+        return None
+
+    def should_fail(self) -> bool:
+        if self.failure_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+    def start(self) -> 'FakeConfluenceServer':
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-confluence', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'FakeConfluenceServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+End-to-End Publish Benchmark
+
+Runs a full ``mkdocs build`` of a generated N-page site with the Confluence
+publisher enabled, against the in-process fake Confluence server in
+``fake_confluence.py``, and reports wall time, requests per endpoint and bytes
+transferred. Each site size is built ``--builds`` times against the same server,
+so the second build shows the cost of re-publishing an unchanged site.
+
+Requires the plugin to be installed (``pip install -e .``).
+
+Usage:
+python benchmarks/publish_benchmark.py --pages 10,100,1000
+python benchmarks/publish_benchmark.py --pages 1000 --workers 8 --latency 0.05 --rate-limit 100
+python benchmarks/publish_benchmark.py --pages 1000 --workers 8 --conversion-workers 0
+python benchmarks/publish_benchmark.py --pages 100 --failure-rate 0.05 --incremental --save publish.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_confluence import FakeConfluenceServer  # noqa: E402
+from mkdocs.commands.build import build  # noqa: E402
+from mkdocs.config import load_config  # noqa: E402
+
+SPACE_KEY = 'BENCH'
+PARENT_PAGE_ID = 1000
+
+# A 1x1 transparent PNG shared by every page that has an image
+PNG_BYTES = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082'
+)
+
+PAGE_TEMPLATE = """# Page {index}
+
+Section {section} of the generated benchmark site.
+
+!!! note "Generated"
+    This page exists to measure publishing cost.
+
+| Key | Value |
+|-----|-------|
+| page | {index} |
+| section | {section} |
+
+```python
+def page_{index}():
+    return {index}
+```
+"""
+
+
+def generate_site(project_dir, pages, pages_per_section, images_every, args):
+    """Write docs and mkdocs.yml for a site of ``pages`` pages grouped into sections."""
+    docs_dir = os.path.join(project_dir, 'docs')
+    os.makedirs(os.path.join(docs_dir, 'images'), exist_ok=True)
+    with open(os.path.join(docs_dir, 'images', 'logo.png'), 'wb') as f:
+        f.write(PNG_BYTES)
+
+    nav = []
+    for start in range(0, pages, pages_per_section):
+        section = start // pages_per_section
+        section_dir = os.path.join(docs_dir, f'section-{section}')
+        os.makedirs(section_dir, exist_ok=True)
+        children = []
+        for index in range(start, min(start + pages_per_section, pages)):
+            content = PAGE_TEMPLATE.format(index=index, section=section)
+            if images_every and index % images_every == 0:
+                content += '\n![Logo](../images/logo.png)\n'
+            with open(os.path.join(section_dir, f'page-{index}.md'), 'w', encoding='utf-8') as f:
+                f.write(content)
+            children.append({f'Page {index}': f'section-{section}/page-{index}.md'})
+        nav.append({f'Section {section}': children})
+
+    config = {
+        'site_name': 'Publish Benchmark',
+        'docs_dir': 'docs',
+        'site_dir': 'site',
+        'nav': nav,
+        'plugins': [{
+            'confluence_publisher': {
+                'space_key': SPACE_KEY,
+                'parent_page_id': PARENT_PAGE_ID,
+                'confluence_prefix': 'Bench - ',
+                'upload_attachments': images_every > 0,
+                'incremental': args.incremental,
+                'publish_workers': args.workers,
+                'max_retries': args.max_retries,
+                'rate_limit': args.client_rate_limit,
+                'conversion_workers': args.conversion_workers,
+                'shared_attachments_page': 'Assets' if args.shared_attachments else '',
+            }
+        }],
+    }
+    config_file = os.path.join(project_dir, 'mkdocs.yml')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    return config_file
+
+
+def run_build(config_file):
+    """Run ``mkdocs build`` the way the CLI does and return the wall time."""
+    config = load_config(config_file=config_file)
+    config.plugins.on_startup(command='build', dirty=False)
+    start = time.perf_counter()
+    try:
+        build(config)
+    finally:
+        config.plugins.on_shutdown()
+    return time.perf_counter() - start
+
+
+def benchmark_site(pages, args):
+    server = FakeConfluenceServer(
+        space_key=SPACE_KEY,
+        parent_page_id=PARENT_PAGE_ID,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    builds = []
+    with server, tempfile.TemporaryDirectory(prefix='publish-bench-') as project_dir:
+        os.environ['CONFLUENCE_URL'] = server.url
+        os.environ['CONFLUENCE_API_TOKEN'] = 'benchmark-token'
+        config_file = generate_site(project_dir, pages, args.pages_per_section, args.images_every, args)
+
+        for run in range(args.builds):
+            server.stats.reset()
+            wall_time = run_build(config_file)
+            stats = server.stats.summary()
+            builds.append({'build': run + 1, 'wall_time_s': wall_time, **stats})
+            print(
+                f"{pages:>6} pages, build {run + 1}: {wall_time:8.2f}s, "
+                f"{stats['requests']:>6} requests, "
+                f"{stats['bytes_in'] / 1e6:7.2f} MB sent, {stats['bytes_out'] / 1e6:7.2f} MB received"
+            )
+            if args.verbose:
+                for endpoint, entry in sorted(stats['endpoints'].items()):
+                    statuses = ', '.join(f'{status}: {count}' for status, count in sorted(entry['statuses'].items()))
+                    print(f"         {endpoint:<50} {entry['requests']:>6}  ({statuses})")
+
+    return {'pages': pages, 'confluence_pages': len(server.space.pages) - 1, 'builds': builds}
+
+
+def _page_counts(value):
+    try:
+        counts = [int(count) for count in value.split(',') if count.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid page counts: {value}")
+    if not counts or min(counts) <= 0:
+        raise argparse.ArgumentTypeError("Page counts must be positive")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark publishing a generated site to a fake Confluence')
+    parser.add_argument('--pages', type=_page_counts, default=[10, 100],
+                        help='Comma-separated site sizes in pages (default: 10,100)')
+    parser.add_argument('--pages-per-section', type=int, default=50, help='Pages per nav section (default: 50)')
+    parser.add_argument('--images-every', type=int, default=5,
+                        help='Add an image to every Nth page, 0 for none (default: 5)')
+    parser.add_argument('--builds', type=int, default=2, help='Builds per site size (default: 2)')
+    parser.add_argument('--workers', type=int, default=1, help='publish_workers plugin option (default: 1)')
+    parser.add_argument('--conversion-workers', type=int, default=1,
+                        help='conversion_workers plugin option, 0 = one per CPU (default: 1)')
+    parser.add_argument('--shared-attachments', action='store_true',
+                        help='Upload images once to a shared attachments page')
+    parser.add_argument('--incremental', action='store_true', help='Enable the incremental plugin option')
+    parser.add_argument('--max-retries', type=int, default=5, help='max_retries plugin option (default: 5)')
+    parser.add_argument('--client-rate-limit', type=float, default=0,
+                        help='rate_limit plugin option, requests/s (default: 0)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Server latency per request in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random extra server latency, up to this many seconds')
+    parser.add_argument('--rate-limit', type=float, default=0.0,
+                        help='Server requests/s before answering 429, 0 = unlimited (default: 0)')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After sent with 429 responses')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for jitter and failures')
+    parser.add_argument('--save', help='Write the results as JSON to this file')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print requests per endpoint')
+    args = parser.parse_args()
+
+    # Keep the build output readable; the publisher's own errors still show
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+    logging.getLogger('mkdocs').setLevel(logging.ERROR)
+    logging.getLogger('mkdocs.plugins.confluence_publisher').setLevel(logging.ERROR)
+
+    results = [benchmark_site(pages, args) for pages in args.pages]
+
+    if args.save:
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': {k: v for k, v in vars(args).items() if k != 'save'},
+            'results': results,
+        }
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
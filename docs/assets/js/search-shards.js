@@ -0,0 +1,321 @@
+/*
+ * Client for the sharded or prebuilt search index written by the enhanced_search
+ * plugin (shard_index / prebuild_index). Only search/search_manifest.json is
+ * fetched up front; each query then loads just the shards whose term prefixes
+ * cover every query term, and loaded shards are kept for later queries.
+ * Prebuilt shards are searched as downloaded, without building an index.
+ *
+ * Loaded as a web worker, this is the site's search: overrides/main.html points
+ * Material's search worker here while either plugin option is on, and results
+ * come back in the messages the theme's search UI expects. Loaded as a page
+ * script, it exposes the same search for other UIs:
+ *
+ *   searchShards.search("publish attachments").then(function (results) { ... });
+ *
+ * Results are {location, title, text, score}, best first. A term matches a
+ * word it is a prefix of, and every term must match for a result.
+ */
+(function () {
+  "use strict";
+
+  var isWorker = typeof importScripts === "function";
+  var script = isWorker ? null : document.currentScript;
+  // This file is served from assets/js/, the index from search/
+  var searchUrl = new URL("../../search/", script ? script.src : self.location.href);
+  var trimPattern = /^[^\p{L}\p{N}_]+|[^\p{L}\p{N}_]+$/gu;
+  var tagPattern = /<[^>]*>/g;
+  var entityPattern = /&(#x[0-9a-f]+|#[0-9]+|[a-z]+);/gi;
+  var entities = {amp: "&", lt: "<", gt: ">", quot: "\"", apos: "'", nbsp: "\u00a0"};
+  // lunr's English stop word filter, left out of prebuilt shards as well
+  var stopWords = new Set((
+    "a able about across after all almost also am among an and any are as at be because been but by " +
+    "can cannot could dear did do does either else ever every for from get got had has have he her " +
+    "hers him his how however i if in into is it its just least let like likely may me might most " +
+    "must my neither no nor not of off often on only or other our own rather said say says she " +
+    "should since so some than that the their them then there these they this tis to too twas us " +
+    "wants was we were what when where which while who whom why will with would yet you your"
+  ).split(" "));
+  var manifest = null;
+  var shards = {};
+  // Index entries by location, for the page entry each group of results is shown under
+  var pages = {};
+
+  function fetchJson(path) {
+    return fetch(new URL(path, searchUrl)).then(function (response) {
+      if (!response.ok) {
+        throw new Error("Could not load " + path + ": " + response.status);
+      }
+      return response.json();
+    });
+  }
+
+  function loadManifest() {
+    if (!manifest) {
+      manifest = fetchJson("search_manifest.json").then(function (data) {
+        data.separatorPattern = new RegExp(data.config.separator || "[\\s\\-]+", "u");
+        data.stopWords = indexStopWords(data.config);
+        data.shards.forEach(function (shard) {
+          // No prefixes: the only shard, always searched
+          shard.prefixList = shard.prefixes === null ? null : shard.prefixes ? shard.prefixes.split(" ") : [];
+        });
+        return data;
+      });
+      manifest.catch(function () {
+        manifest = null;
+      });
+    }
+    return manifest;
+  }
+
+  // Like the plugin: MkDocs' search always filters stop words, Material's per its pipeline
+  function indexStopWords(config) {
+    var lang = [].concat(config.lang || ["en"]);
+    var filtered = !config.pipeline || config.pipeline.indexOf("stopWordFilter") !== -1;
+    return filtered && lang.indexOf("en") !== -1 ? stopWords : new Set();
+  }
+
+  // Index titles and text hold HTML; search their text only
+  function stripHtml(html) {
+    return (html || "").replace(tagPattern, " ").replace(entityPattern, function (entity, name) {
+      if (name.charAt(0) === "#") {
+        var code = name.charAt(1).toLowerCase() === "x" ? parseInt(name.slice(2), 16) : parseInt(name.slice(1), 10);
+        return String.fromCodePoint(code);
+      }
+      return entities[name.toLowerCase()] || entity;
+    });
+  }
+
+  function tokenize(text, data) {
+    return (text || "").toLowerCase().split(data.separatorPattern).map(function (term) {
+      return term.replace(trimPattern, "");
+    }).filter(function (term) {
+      return term && !data.stopWords.has(term);
+    });
+  }
+
+  // Position of the first entry of a sorted list that is not before key
+  function lowerBound(list, key) {
+    var low = 0;
+    var high = list.length;
+    while (low < high) {
+      var middle = (low + high) >> 1;
+      if (list[middle] < key) {
+        low = middle + 1;
+      } else {
+        high = middle;
+      }
+    }
+    return low;
+  }
+
+  // Whether any prefix in the sorted list could start a word beginning with term
+  function hasPrefix(prefixList, term, length) {
+    if (prefixList === null) {
+      return true;
+    }
+    var key = term.slice(0, length);
+    var position = lowerBound(prefixList, key);
+    return position < prefixList.length && prefixList[position].indexOf(key) === 0;
+  }
+
+  function tokenizeDoc(doc, data) {
+    doc.titleTerms = tokenize(stripHtml(doc.title), data);
+    doc.textTerms = tokenize(stripHtml(doc.text), data);
+    return doc;
+  }
+
+  function loadShard(shard, manifestData) {
+    if (!shards[shard.name]) {
+      shards[shard.name] = fetchJson(shard.url).then(function (data) {
+        data.docs.forEach(function (doc) {
+          pages[doc.location] = doc;
+          if (!data.terms) {
+            tokenizeDoc(doc, manifestData);
+          }
+        });
+        return data;
+      });
+      shards[shard.name].catch(function () {
+        delete shards[shard.name];
+      });
+    }
+    return shards[shard.name];
+  }
+
+  function countMatches(words, term) {
+    var count = 0;
+    for (var i = 0; i < words.length; i++) {
+      if (words[i].indexOf(term) === 0) {
+        count++;
+      }
+    }
+    return count;
+  }
+
+  function score(doc, terms) {
+    var total = 0;
+    for (var i = 0; i < terms.length; i++) {
+      var matches = 10 * countMatches(doc.titleTerms, terms[i]) + countMatches(doc.textTerms, terms[i]);
+      if (!matches) {
+        return 0;
+      }
+      total += matches;
+    }
+    return total * (doc.boost || 1);
+  }
+
+  function result(doc, score) {
+    return {location: doc.location, title: doc.title, text: doc.text, score: score};
+  }
+
+  function scoreDocs(data, terms, results) {
+    data.docs.forEach(function (doc) {
+      var value = score(doc, terms);
+      if (value) {
+        results.push(result(doc, value));
+      }
+    });
+  }
+
+  // Prebuilt shards: add up the postings of every indexed word each term is a prefix of
+  function searchPostings(data, terms, results) {
+    var scores = {};
+    var matched = {};
+    terms.forEach(function (term, position) {
+      for (var i = lowerBound(data.terms, term); i < data.terms.length && data.terms[i].indexOf(term) === 0; i++) {
+        var postings = data.postings[i];
+        for (var j = 0; j < postings.length; j += 2) {
+          var doc = postings[j];
+          // Every term must match, so only docs matched by all earlier terms count
+          if ((matched[doc] || 0) === position) {
+            matched[doc] = position + 1;
+          }
+          if (matched[doc] === position + 1) {
+            scores[doc] = (scores[doc] || 0) + postings[j + 1];
+          }
+        }
+      }
+    });
+    Object.keys(scores).forEach(function (doc) {
+      if (matched[doc] === terms.length) {
+        results.push(result(data.docs[doc], scores[doc]));
+      }
+    });
+  }
+
+  function search(query, limit) {
+    return loadManifest().then(function (data) {
+      var terms = tokenize(query, data);
+      if (!terms.length) {
+        return [];
+      }
+      var needed = data.shards.filter(function (shard) {
+        return terms.every(function (term) {
+          return hasPrefix(shard.prefixList, term, data.prefix_length);
+        });
+      });
+      return Promise.all(needed.map(function (shard) {
+        return loadShard(shard, data);
+      })).then(function (loaded) {
+        var results = [];
+        loaded.forEach(function (shard) {
+          if (shard.terms) {
+            searchPostings(shard, terms, results);
+          } else {
+            scoreDocs(shard, terms, results);
+          }
+        });
+        results.sort(function (a, b) {
+          return b.score - a.score;
+        });
+        return results.slice(0, limit || 20);
+      });
+    });
+  }
+
+  /*
+   * Web worker protocol of Material for MkDocs: the page sends SETUP with the
+   * theme's own index, answered with READY, then a QUERY per input, answered
+   * with RESULT, where items are the matches grouped by page.
+   */
+  var SETUP = 0;
+  var READY = 1;
+  var QUERY = 2;
+  var RESULT = 3;
+
+  /*
+   * Without a manifest (e.g. on file:// builds) search the theme's index as one
+   * shard. Served over HTTP the theme gets a stub index without docs, since the
+   * whole index is in the shards; file:// builds load the offline plugin's
+   * search_index.js, which keeps it.
+   */
+  function setup(index) {
+    index.docs.forEach(function (doc) {
+      pages[doc.location] = doc;
+    });
+    return loadManifest().catch(function () {
+      var data = {
+        config: index.config,
+        separatorPattern: new RegExp(index.config.separator || "[\\s\\-]+", "u"),
+        stopWords: indexStopWords(index.config),
+        shards: [{name: "site", prefixList: null}]
+      };
+      manifest = Promise.resolve(data);
+      shards.site = Promise.resolve({
+        docs: index.docs.map(function (doc) {
+          return tokenizeDoc(Object.assign({}, doc), data);
+        })
+      });
+    });
+  }
+
+  function groupByPage(results, queryTerms) {
+    var terms = {};
+    queryTerms.forEach(function (term) {
+      terms[term] = true;
+    });
+    var groups = new Map();
+    results.forEach(function (item) {
+      var page = item.location.split("#")[0];
+      if (!groups.has(page)) {
+        groups.set(page, []);
+      }
+      groups.get(page).push(Object.assign(item, {terms: terms}));
+    });
+    // The theme renders each group under its page, so every group needs one
+    groups.forEach(function (items, page) {
+      var found = items.some(function (item) {
+        return item.location === page;
+      });
+      if (!found) {
+        items.push(Object.assign(result(pages[page] || {location: page, title: items[0].title, text: ""}, 0), {terms: {}}));
+      }
+    });
+    return Array.from(groups.values());
+  }
+
+  if (isWorker) {
+    addEventListener("message", function (event) {
+      var message = event.data;
+      if (message.type === SETUP) {
+        setup(message.data).then(function () {
+          postMessage({type: READY});
+        });
+      } else if (message.type === QUERY) {
+        Promise.all([loadManifest(), search(message.data, Infinity)]).then(function (loaded) {
+          var terms = tokenize(message.data, loaded[0]);
+          postMessage({type: RESULT, data: {items: groupByPage(loaded[1], terms)}});
+        }, function (error) {
+          console.warn("Search failed: " + error.message);
+          postMessage({type: RESULT, data: {items: []}});
+        });
+      }
+    });
+  } else {
+    window.searchShards = {
+      // Fetch the manifest early, e.g. when the search box gets focus
+      load: loadManifest,
+      search: search
+    };
+  }
+})();
@@ -14,12 +14,21 @@ Requirements:
 
 Usage:
 python word_to_markdown.py --input /path/to/word/docs --output /path/to/markdown/docs
+python word_to_markdown.py --input /path/to/word/docs --output /path/to/markdown/docs --jobs 8
+
+Sub-folders of the input directory are converted too, into the same folders
+under the output directory. A document that fails to convert is reported in
+the summary at the end and does not stop the rest of the batch.
 """
 
 import os
 import argparse
 import re
 import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 import mammoth
 import yaml
 from pathlib import Path
@@ -97,23 +106,115 @@ def process_document(docx_path, output_dir):
     print(f"Converted: {docx_path} -> {output_path}")
     
     # Report any warnings
-    for warning in result.warnings:
-        print(f"Warning: {warning}")
+    for message in result.messages:
+        print(f"Warning: {message.message}")
+
+def find_documents(input_dir, output_dir):
+    """Find Word documents below input_dir, paired with the folder to write each one to."""
+    output_root = os.path.abspath(output_dir)
+    documents = []
+    for root, dirs, files in os.walk(input_dir):
+        # Don't convert our own output again when it sits inside the input directory
+        dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != output_root)
+        relative = os.path.relpath(root, input_dir)
+        for file in sorted(files):
+            if file.endswith('.docx') and not file.startswith('~$'):  # Skip temporary Word files
+                documents.append((os.path.join(root, file), os.path.normpath(os.path.join(output_dir, relative))))
+    return documents
+
+def convert_document(docx_path, output_dir):
+    """Convert one document, returning the error instead of raising so a batch carries on."""
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        process_document(docx_path, output_dir)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+def convert_all(documents, jobs):
+    """Convert documents, jobs at a time in worker processes, and return the failures."""
+    failures = []
+
+    def record(docx_path, error):
+        print(f"Failed: {docx_path}: {error}")
+        failures.append((docx_path, error))
+
+    if jobs == 1:
+        for docx_path, output_dir in documents:
+            error = convert_document(docx_path, output_dir)
+            if error:
+                record(docx_path, error)
+        return failures
+
+    pending = list(reversed(documents))
+    while pending:
+        suspects = run_pool(pending, jobs, record)
+        # A worker process died, taking the pool with it: one of the documents it was
+        # converting crashed it. Retry those one per pool so only that one fails.
+        for document in suspects:
+            if run_pool([document], 1, record):
+                record(document[0], "worker process crashed")
+    return failures
+
+def run_pool(pending, jobs, record):
+    """Convert documents popped from pending with at most jobs in flight.
+
+    Returns the documents still in flight if a worker process died, else an empty list.
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        in_flight = {}
+        while pending or in_flight:
+            while pending and len(in_flight) < jobs:
+                document = pending.pop()
+                in_flight[executor.submit(convert_document, *document)] = document
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                try:
+                    error = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    continue
+                docx_path, _ = in_flight.pop(future)
+                if error:
+                    record(docx_path, error)
+            if broken:
+                return list(in_flight.values())
+    return []
+
+def job_count(value):
+    jobs = int(value)
+    if jobs < 0:
+        raise argparse.ArgumentTypeError("--jobs must be 0 (one per CPU) or more")
+    return jobs
 
 def main():
     parser = argparse.ArgumentParser(description='Convert Word documents to Markdown for MkDocs')
     parser.add_argument('--input', required=True, help='Input directory containing Word documents')
     parser.add_argument('--output', required=True, help='Output directory for Markdown files')
+    parser.add_argument('--jobs', type=job_count, default=1,
+                        help='Documents converted in parallel, 0 = one per CPU (default: 1)')
     args = parser.parse_args()
+    jobs = args.jobs or os.cpu_count() or 1
     
     # Create output directory if it doesn't exist
     os.makedirs(args.output, exist_ok=True)
     
-    # Process all Word documents in the input directory
-    for file in os.listdir(args.input):
-        if file.endswith('.docx') and not file.startswith('~$'):  # Skip temporary Word files
-            docx_path = os.path.join(args.input, file)
-            process_document(docx_path, args.output)
+    # Process all Word documents in the input directory and its sub-folders
+    documents = find_documents(args.input, args.output)
+    start = time.perf_counter()
+    failures = convert_all(documents, jobs)
+    elapsed = time.perf_counter() - start
+    
+    converted = len(documents) - len(failures)
+    rate = converted / elapsed if elapsed else 0
+    print(f"\nConverted {converted} of {len(documents)} documents in {elapsed:.1f}s "
+          f"({rate:.1f} documents/s, {jobs} job{'s' if jobs != 1 else ''})")
+    if failures:
+        print(f"{len(failures)} failed:")
+        for docx_path, error in sorted(failures):
+            print(f"  {docx_path}: {error}")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
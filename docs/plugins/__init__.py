@@ -1 +0,0 @@
-# Custom plugins for MkDocs
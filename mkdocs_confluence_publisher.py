@@ -6,21 +6,57 @@ proper structure and formatting. Based on the mkdocs-confluence-publisher approa
 but with SSL handling and Bearer token support for corporate environments.
 """
 
+import base64
+import contextlib
+import cProfile
+import functools
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
+import posixpath
+import random
 import re
+import shlex
+import shutil
+import subprocess
+import threading
+import time
 import urllib3
-from typing import Dict, List, Tuple, Optional
+import uuid
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from html import escape, unescape
+from collections import Counter
+from typing import Dict, List, Set, Tuple, Optional
+from urllib.parse import unquote
 from dotenv import load_dotenv
 
 import markdown
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
 from mkdocs.config import config_options
 from mkdocs.plugins import BasePlugin
+from mkdocs.structure.files import File, Files
 from mkdocs.structure.nav import Page, Section
 
+# Optional image processing, see ImageOptimizer
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import cairosvg
+except (ImportError, OSError):
+    # cairosvg raises OSError when the cairo library itself is missing
+    cairosvg = None
+
 
 # Suppress SSL warnings for corporate environments
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -30,23 +66,572 @@ logger = logging.getLogger('mkdocs.plugins.confluence_publisher')
 
 
 class ConfluencePage:
-    """Represents a Confluence page with ID and title."""
+    """Represents a Confluence page with ID, title, parent and current version."""
     
-    def __init__(self, id: int, title: str):
+    def __init__(self, id: int, title: str, parent_id: Optional[int] = None, version: Optional[int] = None):
         self.id: int = id
         self.title: str = title
+        self.parent_id: Optional[int] = parent_id
+        self.version: Optional[int] = version
 
     def __repr__(self) -> str:
         return f"ConfluencePage(id={self.id}, title='{self.title}')"
 
 
+def content_hash(title: str, parent_id: Optional[int], body: str) -> str:
+    """Hash everything a page update would send, so unchanged pages can be skipped."""
+    digest = hashlib.sha256()
+    for part in (title, str(parent_id or ''), body):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=4096)
+def _file_sha256(path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file, cached for as long as the file is not modified."""
+    stat = os.stat(path)
+    return _file_sha256(path, stat.st_mtime_ns, stat.st_size)
+
+
+ATTACHMENT_COMMENT = 'Uploaded by MkDocs Confluence Publisher'
+ATTACHMENT_HASH_PATTERN = re.compile(r'\(sha256:([0-9a-f]{64})\)')
+
+# Section pages only list their children
+SECTION_PAGE_BODY = '<ac:structured-macro ac:name="children" />'
+
+
+def attachment_hash(attachment: dict) -> Optional[str]:
+    """Extract the content hash the publisher stored in an attachment's comment."""
+    comment = (attachment.get('metadata') or {}).get('comment') or ''
+    match = ATTACHMENT_HASH_PATTERN.search(comment)
+    return match.group(1) if match else None
+
+
+class PublishManifest:
+    """Persistent record of what was last published for each MkDocs page.
+
+    Entries are keyed by ``src_path`` and hold the Confluence page ID, title,
+    parent ID and the content hash of the last successful update. The page ID
+    binds each source file to its page, so a renamed or moved nav entry updates
+    the page it was published to instead of creating a new one. Section pages,
+    which have no source file, are kept by page ID with their title and parent ID
+    so a dry run can plan them too.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, path: str, space_key: str, parent_page_id: int):
+        self.path = path
+        self.space_key = space_key
+        self.parent_page_id = parent_page_id
+        self.pages: Dict[str, dict] = {}
+        self.sections: Dict[int, dict] = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load the manifest from disk, ignoring it if it belongs to another space or parent."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read publish manifest {self.path}: {e}")
+            return
+        
+        if (data.get('version') != self.FORMAT_VERSION
+                or data.get('space_key') != self.space_key
+                or data.get('parent_page_id') != self.parent_page_id):
+            logger.info("Publish manifest does not match current configuration, ignoring it")
+            return
+        
+        self.pages = data.get('pages', {})
+        self.sections = {int(page_id): entry for page_id, entry in data.get('sections', {}).items()}
+        logger.debug(f"Loaded publish manifest with {len(self.pages)} entries")
+
+    def save(self):
+        """Write the manifest to disk if anything changed."""
+        with self._lock:
+            if not self.dirty:
+                return
+            data = {
+                'version': self.FORMAT_VERSION,
+                'space_key': self.space_key,
+                'parent_page_id': self.parent_page_id,
+                'pages': self.pages,
+                'sections': self.sections,
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        logger.debug(f"Saved publish manifest with {len(self.pages)} entries")
+
+    def is_unchanged(self, src_path: str, page: ConfluencePage, digest: str) -> bool:
+        """Return True if the page was last published with the same content hash."""
+        entry = self.pages.get(src_path)
+        return bool(entry) and entry.get('id') == page.id and entry.get('hash') == digest
+
+    def record(self, src_path: str, page: ConfluencePage, digest: str):
+        """Record a successful update of a page."""
+        with self._lock:
+            self.pages[src_path] = {
+                'id': page.id,
+                'title': page.title,
+                'parent_id': page.parent_id,
+                'hash': digest,
+            }
+            self.dirty = True
+
+    def record_sections(self, sections: Dict[int, dict]):
+        """Replace the section pages with those of the nav just published."""
+        with self._lock:
+            if sections != self.sections:
+                self.sections = dict(sections)
+                self.dirty = True
+
+    def remove(self, src_path: str):
+        """Forget a page, e.g. once it has been deleted from Confluence."""
+        with self._lock:
+            if self.pages.pop(src_path, None) is not None:
+                self.dirty = True
+
+
+def source_signature(source: str, attachments: List[str]) -> tuple:
+    """Fingerprint a page's source and the size and mtime of the files it attaches."""
+    stats = []
+    for path in attachments:
+        try:
+            stat = os.stat(path)
+            stats.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stats.append((path, None, None))
+    return hashlib.sha256(source.encode('utf-8')).hexdigest(), tuple(stats)
+
+
+class LiveReloadQueue:
+    """Publish state kept across the rebuilds of one ``mkdocs serve`` session.
+
+    Remembers the source signature of every page queued for publishing, so
+    rebuilds skip pages that did not change, and collects the publish tasks of
+    successive rebuilds until no rebuild happened for ``delay`` seconds. A later
+    rebuild replaces the queued task of the same page.
+    """
+
+    def __init__(self, delay: float, flush):
+        self.delay = delay
+        self.nav_signature: Optional[tuple] = None
+        self.sources: Dict[str, tuple] = {}
+        self._flush = flush
+        self._tasks: Dict[Tuple[str, str], tuple] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def is_unchanged(self, src_path: str, source: str) -> bool:
+        """Return True if the page and its attachments are as they were when last queued."""
+        signature = self.sources.get(src_path)
+        return signature is not None and source_signature(source, [
+            path for path, _, _ in signature[1]
+        ]) == signature
+
+    def remember(self, src_path: str, source: str, attachments: List[str]):
+        """Record the signature of a page that is being published."""
+        self.sources[src_path] = source_signature(source, attachments)
+
+    def forget(self, src_path: str):
+        """Drop a page's signature so the next rebuild publishes it again."""
+        self.sources.pop(src_path, None)
+
+    def queue(self, src_path: str, func, args: tuple):
+        """Queue a publish task, replacing the same task queued by an earlier rebuild."""
+        with self._lock:
+            self._tasks[(src_path, func.__name__)] = (src_path, func, args)
+
+    def schedule(self) -> int:
+        """(Re)start the quiet period after which queued tasks are flushed, returning the queued pages."""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if not self._tasks:
+                return 0
+            self._timer = threading.Timer(self.delay, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+            return len({src_path for src_path, _ in self._tasks})
+
+    def hold(self):
+        """Cancel a pending flush, or wait for a running one to finish, e.g. when a rebuild starts.
+
+        Queued tasks stay queued; the rebuild's ``schedule`` starts a new quiet period.
+        """
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer:
+            timer.cancel()
+            timer.join()
+
+    def take(self) -> List[tuple]:
+        """Remove and return the queued ``(src_path, func, args)`` tasks."""
+        with self._lock:
+            tasks = list(self._tasks.values())
+            self._tasks = {}
+            return tasks
+
+    def flush_now(self):
+        """Cancel the quiet period and flush immediately, e.g. when the server stops."""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+        self._flush()
+
+
+class MultipartFileStream:
+    """multipart/form-data request body that streams a file from disk.
+
+    requests buffers ``files=`` uploads in memory, so large attachments are sent
+    through this file-like object instead, which also has a known length.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, file_path: str, fields: Dict[str, str], content_type: str = 'application/octet-stream',
+                 filename: Optional[str] = None):
+        self.file_path = file_path
+        boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+        
+        head = b''
+        for name, value in fields.items():
+            head += (
+                f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f'{value}\r\n'
+            ).encode('utf-8')
+        filename = (filename or os.path.basename(file_path)).replace('"', '%22')
+        head += (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        ).encode('utf-8')
+        self._head = head
+        self._tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        self._size = len(head) + os.path.getsize(file_path) + len(self._tail)
+        self._file = None
+        self.seek(0)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        return iter(lambda: self.read(self.CHUNK_SIZE), b'')
+
+    def seek(self, offset: int, whence: int = 0):
+        """Rewind the stream; only rewinding to the start is supported."""
+        if offset != 0 or whence != 0:
+            raise ValueError("MultipartFileStream can only be rewound to the start")
+        self.close()
+        self._parts = [self._head, None, self._tail]
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._size
+        chunks = []
+        while size > 0 and self._parts:
+            part = self._parts[0]
+            if part is None:
+                if self._file is None:
+                    self._file = open(self.file_path, 'rb')
+                data = self._file.read(size)
+                if not data:
+                    self._file.close()
+                    self._file = None
+                    self._parts.pop(0)
+                    continue
+            else:
+                data = part[:size]
+                if len(data) == len(part):
+                    self._parts.pop(0)
+                else:
+                    self._parts[0] = part[size:]
+            chunks.append(data)
+            size -= len(data)
+        return b''.join(chunks)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RateLimiter:
+    """Token bucket shared by all threads using a client.
+
+    A rate of zero disables limiting, but a server-requested pause (``Retry-After``)
+    is still honoured by every caller.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.rate <= 0:
+                    return
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Stop all requests for the given number of seconds."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits in-flight requests, adapting the limit to how the server copes.
+
+    The limit grows additively while requests succeed at close to the best latency
+    observed for their endpoint, and shrinks multiplicatively on throttling or when
+    latency climbs. Endpoints are compared only with themselves, since an upload or a
+    large page update is always slower than a lookup.
+    """
+
+    LATENCY_TOLERANCE = 2.0
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(min_limit, max_limit)
+        self.min_limit = min_limit
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.min_latency: Dict[Tuple[str, str], float] = {}
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Block until a request slot is free."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, throttled: bool = False, endpoint: Optional[Tuple[str, str]] = None):
+        """Free a request slot and adjust the limit from the request outcome.
+
+        ``endpoint`` is the ``(method, endpoint template)`` the latency is compared
+        within; without it only throttling counts, e.g. for uploads whose latency
+        depends on the file size.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            best = self.min_latency.get(endpoint, latency) if endpoint else latency
+            if endpoint and latency <= best:
+                self.min_latency[endpoint] = best = latency
+            
+            if throttled:
+                self.limit = max(self.min_limit, self.limit / 2)
+            elif latency > best * self.LATENCY_TOLERANCE:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+def endpoint_template(endpoint: str) -> str:
+    """Replace page and attachment IDs in an API path so requests group by endpoint."""
+    endpoint = re.sub(r'/att\d+', '/{attachment_id}', endpoint)
+    return re.sub(r'/\d+', '/{id}', endpoint)
+
+
+class RequestMetrics:
+    """Per-endpoint request statistics collected by a client across all threads.
+
+    Each attempt is recorded with its latency, status and response size; retries
+    and requests that finally failed are counted separately.
+    """
+
+    # Upper bounds in seconds of the latency histogram exported to Prometheus
+    LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        self.endpoints: Dict[Tuple[str, str], dict] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def _entry(self, method: str, endpoint: str) -> dict:
+        key = (method, endpoint_template(endpoint))
+        entry = self.endpoints.get(key)
+        if entry is None:
+            entry = self.endpoints[key] = {
+                'latencies': [],
+                'response_bytes': 0,
+                'statuses': {},
+                'retries': 0,
+                'errors': 0,
+            }
+        return entry
+
+    def record(self, method: str, endpoint: str, latency: float, status: Optional[int] = None, size: int = 0):
+        """Record one attempt; ``status`` is None when no response was received."""
+        status_key = str(status) if status is not None else 'connection_error'
+        with self._lock:
+            entry = self._entry(method, endpoint)
+            entry['latencies'].append(latency)
+            entry['response_bytes'] += size
+            entry['statuses'][status_key] = entry['statuses'].get(status_key, 0) + 1
+
+    def reset(self):
+        """Drop everything collected so far, e.g. when a live-reload rebuild starts."""
+        with self._lock:
+            self.endpoints = {}
+            self.started = time.time()
+
+    def record_retry(self, method: str, endpoint: str):
+        with self._lock:
+            self._entry(method, endpoint)['retries'] += 1
+
+    def record_error(self, method: str, endpoint: str):
+        with self._lock:
+            self._entry(method, endpoint)['errors'] += 1
+
+    @staticmethod
+    def _percentile(sorted_values: List[float], percent: float) -> float:
+        if not sorted_values:
+            return 0.0
+        rank = max(0, int(round(percent / 100 * len(sorted_values) + 0.5)) - 1)
+        return sorted_values[min(rank, len(sorted_values) - 1)]
+
+    def report(self) -> dict:
+        """Summarise the collected metrics as a JSON-serialisable dict."""
+        with self._lock:
+            items = [(key, dict(entry, latencies=sorted(entry['latencies']))) for key, entry in self.endpoints.items()]
+
+        endpoints = []
+        for (method, endpoint), entry in sorted(items):
+            latencies = entry['latencies']
+            endpoints.append({
+                'method': method,
+                'endpoint': endpoint,
+                'requests': len(latencies),
+                'statuses': dict(sorted(entry['statuses'].items())),
+                'retries': entry['retries'],
+                'errors': entry['errors'],
+                'response_bytes': entry['response_bytes'],
+                'latency_seconds': {
+                    'total': sum(latencies),
+                    'p50': self._percentile(latencies, 50),
+                    'p95': self._percentile(latencies, 95),
+                    'p99': self._percentile(latencies, 99),
+                    'max': latencies[-1] if latencies else 0.0,
+                },
+            })
+
+        return {
+            'started': self.started,
+            'duration_seconds': time.time() - self.started,
+            'requests': sum(e['requests'] for e in endpoints),
+            'retries': sum(e['retries'] for e in endpoints),
+            'errors': sum(e['errors'] for e in endpoints),
+            'response_bytes': sum(e['response_bytes'] for e in endpoints),
+            'endpoints': endpoints,
+        }
+
+    def prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            items = [(key, dict(entry, latencies=list(entry['latencies']))) for key, entry in self.endpoints.items()]
+
+        lines = [
+            '# HELP confluence_publisher_requests_total Confluence API requests by response status.',
+            '# TYPE confluence_publisher_requests_total counter',
+        ]
+        for (method, endpoint), entry in sorted(items):
+            for status, count in sorted(entry['statuses'].items()):
+                lines.append(
+                    f'confluence_publisher_requests_total{{method="{method}",endpoint="{endpoint}",status="{status}"}} {count}'
+                )
+
+        for name, key, help_text in (
+            ('retries', 'retries', 'Confluence API requests that were retried.'),
+            ('errors', 'errors', 'Confluence API requests that failed after all retries.'),
+            ('response_bytes', 'response_bytes', 'Bytes received from the Confluence API.'),
+        ):
+            lines.append(f'# HELP confluence_publisher_{name}_total {help_text}')
+            lines.append(f'# TYPE confluence_publisher_{name}_total counter')
+            for (method, endpoint), entry in sorted(items):
+                lines.append(f'confluence_publisher_{name}_total{{method="{method}",endpoint="{endpoint}"}} {entry[key]}')
+
+        lines.append('# HELP confluence_publisher_request_duration_seconds Confluence API request latency.')
+        lines.append('# TYPE confluence_publisher_request_duration_seconds histogram')
+        for (method, endpoint), entry in sorted(items):
+            labels = f'method="{method}",endpoint="{endpoint}"'
+            latencies = entry['latencies']
+            for bound in self.LATENCY_BUCKETS:
+                count = sum(1 for latency in latencies if latency <= bound)
+                lines.append(f'confluence_publisher_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'confluence_publisher_request_duration_seconds_bucket{{{labels},le="+Inf"}} {len(latencies)}')
+            lines.append(f'confluence_publisher_request_duration_seconds_sum{{{labels}}} {sum(latencies)}')
+            lines.append(f'confluence_publisher_request_duration_seconds_count{{{labels}}} {len(latencies)}')
+
+        return '\n'.join(lines) + '\n'
+
+
 class ConfluenceClient:
-    """Custom Confluence client with SSL bypass and Bearer/Basic auth support."""
+    """Custom Confluence client with SSL bypass, Bearer/Basic auth and retry support."""
     
-    def __init__(self, base_url: str, username: str, token: str, verify_ssl: bool = False):
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    # Requests that may have taken effect before failing are only retried when throttled,
+    # since the server did not process them; retrying a create could duplicate the page
+    IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+    THROTTLE_STATUS = 429
+    # Failures after which a create may or may not have happened
+    SERVER_ERROR_STATUSES = RETRY_STATUSES - {THROTTLE_STATUS}
+    MAX_BACKOFF = 60.0
+    
+    def __init__(self, base_url: str, username: str, token: str, verify_ssl: bool = False, pool_size: int = 10,
+                 max_retries: int = 5, rate_limit: float = 0.0, backoff_factor: float = 1.0):
         self.base_url = base_url.rstrip('/')
         self.session = requests.Session()
         self.session.verify = verify_ssl
+        if max_retries < 0:
+            raise ValueError(f"max_retries must be 0 or more, got {max_retries}")
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.concurrency_limiter = AdaptiveConcurrencyLimiter(pool_size)
+        self.metrics = RequestMetrics()
+        
+        # Size the connection pool so concurrent publish workers don't discard connections
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         
         # Prioritize Bearer token authentication (works in corporate environments)
         if token:
@@ -58,14 +643,94 @@ class ConfluenceClient:
         else:
             raise ValueError("Token must be provided for authentication")
     
-    def _make_request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
-        """Make an authenticated request to Confluence API."""
+    def _make_request(self, method: str, endpoint: str, idempotent: Optional[bool] = None,
+                      **kwargs) -> requests.Response:
+        """Make an authenticated request to Confluence API, retrying throttled and failed requests.
+
+        Failed requests are only retried when ``idempotent`` (by default: when the
+        method is); other requests are retried only when throttled.
+        """
         url = f"{self.base_url}/rest/api{endpoint}"
-        response = self.session.request(method, url, **kwargs)
-        response.raise_for_status()
-        return response
+        if idempotent is None:
+            idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        uploading = isinstance(kwargs.get('data'), MultipartFileStream) or bool(kwargs.get('files'))
+        latency_key = None if uploading else (method, endpoint_template(endpoint))
+        
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._rewind_files(kwargs)
+            
+            self.rate_limiter.acquire()
+            self.concurrency_limiter.acquire()
+            start = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                latency = time.monotonic() - start
+                self.concurrency_limiter.release(latency, throttled=True, endpoint=latency_key)
+                self.metrics.record(method, endpoint, latency)
+                if attempt == self.max_retries or not idempotent:
+                    self.metrics.record_error(method, endpoint)
+                    raise
+                self.metrics.record_retry(method, endpoint)
+                delay = self._backoff_delay(attempt)
+                logger.warning(f"{method} {endpoint} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            
+            latency = time.monotonic() - start
+            throttled = response.status_code in self.RETRY_STATUSES
+            retryable = throttled and (idempotent or response.status_code == self.THROTTLE_STATUS)
+            self.concurrency_limiter.release(latency, throttled=throttled, endpoint=latency_key)
+            self.metrics.record(method, endpoint, latency, response.status_code, len(response.content))
+            
+            if retryable and attempt < self.max_retries:
+                self.metrics.record_retry(method, endpoint)
+                retry_after = self._retry_after(response)
+                if retry_after is not None:
+                    # The server told us when to come back; hold every worker until then
+                    logger.warning(f"{method} {endpoint} returned {response.status_code}, pausing for {retry_after:.1f}s")
+                    self.rate_limiter.pause(retry_after)
+                else:
+                    delay = self._backoff_delay(attempt)
+                    logger.warning(f"{method} {endpoint} returned {response.status_code}, retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                continue
+            
+            if not response.ok:
+                self.metrics.record_error(method, endpoint)
+            response.raise_for_status()
+            return response
     
-    def get_page_by_title(self, space_key: str, title: str) -> Optional[dict]:
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.MAX_BACKOFF, self.backoff_factor * (2 ** attempt)))
+    
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        """Parse a Retry-After header given either in seconds or as an HTTP date."""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    
+    @staticmethod
+    def _rewind_files(kwargs: dict):
+        """Rewind uploaded file objects so a retried request sends them again."""
+        if isinstance(kwargs.get('data'), MultipartFileStream):
+            kwargs['data'].seek(0)
+        for file_spec in (kwargs.get('files') or {}).values():
+            if isinstance(file_spec, tuple) and hasattr(file_spec[1], 'seek'):
+                file_spec[1].seek(0)
+    
+    def get_page_by_title(self, space_key: str, title: str, expand: str = 'version') -> Optional[dict]:
         """Get a page by title in a space."""
         try:
             response = self._make_request(
@@ -74,7 +739,7 @@ class ConfluenceClient:
                 params={
                     'spaceKey': space_key,
                     'title': title,
-                    'expand': 'version'
+                    'expand': expand
                 }
             )
             results = response.json().get('results', [])
@@ -82,8 +747,44 @@ class ConfluenceClient:
         except requests.exceptions.RequestException:
             return None
     
+    def get_page(self, page_id: int, expand: str = 'version') -> dict:
+        """Get a page by ID."""
+        response = self._make_request('GET', f'/content/{page_id}', params={'expand': expand})
+        return response.json()
+    
+    def get_descendant_pages(self, page_id: int, expand: str = 'version,ancestors', limit: int = 200) -> List[dict]:
+        """Get all pages below a page, following pagination until exhausted."""
+        pages = []
+        start = 0
+        
+        while True:
+            response = self._make_request(
+                'GET',
+                f'/content/{page_id}/descendant/page',
+                params={
+                    'expand': expand,
+                    'start': start,
+                    'limit': limit
+                }
+            )
+            data = response.json()
+            results = data.get('results', [])
+            pages.extend(results)
+            
+            # The server may cap the page size, so rely on the next link rather than the limit
+            if not results or 'next' not in data.get('_links', {}):
+                break
+            start += len(results)
+        
+        return pages
+    
     def create_page(self, space_key: str, title: str, body: str, parent_id: Optional[int] = None) -> dict:
-        """Create a new page in Confluence."""
+        """Create a new page in Confluence.
+
+        Throttling is retried by ``_make_request``, since a throttled create never
+        happened. Server errors and lost connections are retried here, once a lookup
+        by title shows the page was not created after all.
+        """
         data = {
             'type': 'page',
             'title': title,
@@ -99,11 +800,27 @@ class ConfluenceClient:
         if parent_id:
             data['ancestors'] = [{'id': str(parent_id)}]
         
-        response = self._make_request('POST', '/content', json=data)
-        return response.json()
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._make_request('POST', '/content', json=data).json()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.HTTPError) as e:
+                response = getattr(e, 'response', None)
+                if attempt == self.max_retries or (
+                        response is not None and response.status_code not in self.SERVER_ERROR_STATUSES):
+                    raise
+                # The page may have been created before the request failed; don't create it twice
+                existing = self.get_page_by_title(space_key, title)
+                if existing:
+                    return existing
+                self.metrics.record_retry('POST', '/content')
+                delay = self._backoff_delay(attempt)
+                logger.warning(f"Creating page {title} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
     
-    def update_page(self, page_id: int, title: str, body: str, version: int) -> dict:
-        """Update an existing page in Confluence."""
+    def update_page(self, page_id: int, title: str, body: str, version: int,
+                    parent_id: Optional[int] = None) -> dict:
+        """Update an existing page in Confluence, moving it below ``parent_id`` if given."""
         data = {
             'version': {'number': version + 1},
             'title': title,
@@ -115,33 +832,1111 @@ class ConfluenceClient:
                 }
             }
         }
+        if parent_id is not None:
+            data['ancestors'] = [{'id': parent_id}]
         
         response = self._make_request('PUT', f'/content/{page_id}', json=data)
         return response.json()
     
-    def get_attachments(self, page_id: int) -> List[dict]:
-        """Get attachments for a page."""
-        response = self._make_request('GET', f'/content/{page_id}/child/attachment')
-        return response.json().get('results', [])
+    def delete_page(self, page_id: int):
+        """Move a page to the space's trash."""
+        self._make_request('DELETE', f'/content/{page_id}')
     
-    def upload_attachment(self, page_id: int, file_path: str, comment: str = '') -> dict:
-        """Upload an attachment to a page."""
-        filename = os.path.basename(file_path)
+    def get_attachments(self, page_id: int, limit: int = 200) -> List[dict]:
+        """Get all attachments for a page, including their comments."""
+        attachments = []
+        start = 0
         
-        with open(file_path, 'rb') as f:
-            files = {'file': (filename, f, 'application/octet-stream')}
-            data = {'comment': comment}
-            
+        while True:
             response = self._make_request(
-                'POST', 
+                'GET',
                 f'/content/{page_id}/child/attachment',
-                files=files,
-                data=data
+                params={
+                    'expand': 'version,metadata',
+                    'start': start,
+                    'limit': limit
+                }
+            )
+            data = response.json()
+            results = data.get('results', [])
+            attachments.extend(results)
+            
+            if not results or 'next' not in data.get('_links', {}):
+                break
+            start += len(results)
+        
+        return attachments
+    
+    def upload_attachment(self, page_id: int, file_path: str, comment: str = '',
+                          attachment_id: Optional[str] = None, filename: Optional[str] = None) -> dict:
+        """Upload an attachment to a page, or a new version of an existing attachment.
+
+        The attachment is named after the file unless ``filename`` is given.
+        """
+        endpoint = f'/content/{page_id}/child/attachment'
+        if attachment_id:
+            endpoint = f'{endpoint}/{attachment_id}/data'
+        
+        body = MultipartFileStream(file_path, {'comment': comment}, filename=filename)
+        try:
+            # Sending the file again at worst adds a version of the attachment
+            response = self._make_request(
+                'POST',
+                endpoint,
+                idempotent=True,
+                data=body,
+                headers={
+                    'Content-Type': body.content_type,
+                    'X-Atlassian-Token': 'nocheck'
+                }
             )
+        finally:
+            body.close()
         
         return response.json()
 
 
+class PhaseProfiler:
+    """Wall and CPU time spent in plugin hooks and conversion stages, per phase and per page.
+
+    Stages run inside the hook that triggered them and are attributed to that hook's
+    page, so a hook's time includes its stages. Only MkDocs' build thread is measured;
+    the time publish workers spend on the network is covered by the request metrics.
+    """
+
+    def __init__(self, enabled: bool = False, output_path: Optional[str] = None):
+        self.enabled = enabled
+        self.output_path = output_path
+        self.phases: Dict[str, List[float]] = {}
+        self.pages: Dict[str, Dict[str, float]] = {}
+        self._current_page: Optional[str] = None
+        self._profile: Optional[cProfile.Profile] = None
+
+    def start(self):
+        """Start collecting a cProfile of the build thread when an output file is configured."""
+        if not self.enabled or not self.output_path:
+            return
+        self._profile = cProfile.Profile()
+        try:
+            self._profile.enable()
+        except ValueError as e:
+            # Another profiler (e.g. python -m cProfile) is already active
+            logger.warning(f"Could not start cProfile: {e}")
+            self._profile = None
+
+    @contextlib.contextmanager
+    def phase(self, name: str, src_path: Optional[str] = None):
+        """Time a phase, attributing it to ``src_path`` or to the page of the enclosing phase."""
+        if not self.enabled:
+            yield
+            return
+        
+        previous_page = self._current_page
+        if src_path is not None:
+            self._current_page = src_path
+        page = self._current_page
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            self._current_page = previous_page
+            totals = self.phases.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+            if page is not None:
+                timings = self.pages.setdefault(page, {})
+                timings[name] = timings.get(name, 0.0) + wall
+
+    def slowest_pages(self, limit: int = 10) -> List[Tuple[str, float, Dict[str, float]]]:
+        """Pages ordered by the time spent in their hooks, with the per-phase breakdown."""
+        totals = [
+            (src_path, sum(t for name, t in timings.items() if name.startswith('on_')), timings)
+            for src_path, timings in self.pages.items()
+        ]
+        return sorted(totals, key=lambda item: item[1], reverse=True)[:limit]
+
+    def finish(self, slowest: int = 10):
+        """Stop profiling, write the cProfile stats and log the phase and slowest-page summary."""
+        if not self.enabled:
+            return
+        
+        if self._profile:
+            self._profile.disable()
+            try:
+                self._profile.dump_stats(self.output_path)
+                logger.info(f"Wrote cProfile stats to {self.output_path}")
+            except OSError as e:
+                logger.error(f"Failed to write cProfile stats: {e}")
+            self._profile = None
+        
+        logger.info("Confluence publisher time by phase (wall / CPU):")
+        for name, (calls, wall, cpu) in sorted(self.phases.items(), key=lambda item: item[1][1], reverse=True):
+            logger.info(f"  {name:<18} {calls:>6} calls  {wall:8.3f}s / {cpu:8.3f}s")
+        
+        pages = self.slowest_pages(slowest)
+        if pages:
+            logger.info(f"Slowest {len(pages)} pages:")
+            for src_path, total, timings in pages:
+                breakdown = ', '.join(
+                    f"{name} {t * 1000:.0f}ms"
+                    for name, t in sorted(timings.items(), key=lambda item: item[1], reverse=True)
+                    if t >= 0.0005
+                )
+                logger.info(f"  {src_path}: {total * 1000:.0f}ms" + (f" ({breakdown})" if breakdown else ''))
+
+
+def profiled(phase: str):
+    """Time a plugin method as a phase of the plugin's profiler.
+
+    Hooks that receive a page attribute their time to it; other methods are
+    attributed to the page of the hook they run in.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not self.profiler.enabled:
+                return func(self, *args, **kwargs)
+            page = kwargs.get('page') or next((arg for arg in args if isinstance(arg, Page)), None)
+            with self.profiler.phase(phase, page.file.src_path if page else None):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+CODE_LANGUAGE_REPLACEMENTS = {
+    'json': 'yaml',
+    'dockerfile': 'bash',
+    'powershell': 'bash',
+    'sh': 'bash',
+    'shell': 'bash',
+    'console': 'bash',
+    'js': 'javascript',
+    'py': 'python',
+    'yml': 'yaml',
+    'c': 'cpp',
+    'c++': 'cpp',
+    'csharp': 'c#',
+}
+
+# Languages the Confluence code macro highlights; blocks in any other language
+# (text, mermaid, ...) are published without one, as the macro rejects unknown names
+CODE_MACRO_LANGUAGES = frozenset({
+    'actionscript3', 'applescript', 'bash', 'c#', 'coldfusion', 'cpp', 'css', 'delphi', 'diff',
+    'erlang', 'groovy', 'html', 'java', 'javafx', 'javascript', 'perl', 'php', 'python', 'ruby',
+    'sass', 'scala', 'sql', 'vb', 'xml', 'yaml',
+})
+
+ADMONITION_MACROS = {
+    'note': 'info',
+    'info': 'info',
+    'abstract': 'info',
+    'summary': 'info',
+    'todo': 'info',
+    'question': 'info',
+    'example': 'info',
+    'quote': 'info',
+    'tip': 'tip',
+    'hint': 'tip',
+    'important': 'tip',
+    'success': 'tip',
+    'caution': 'note',
+    'attention': 'note',
+    'warning': 'warning',
+    'danger': 'warning',
+    'error': 'warning',
+    'failure': 'warning',
+    'bug': 'warning',
+}
+
+# Closer marking a frame whose content is dropped entirely
+_SKIP = object()
+
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+}
+
+# Start and end tags of rendered HTML, tokenized like html.parser does. Comments,
+# doctypes and processing instructions match without a tag name and are dropped.
+HTML_TOKEN_PATTERN = re.compile(
+    r'<(?:(/?)([a-zA-Z][^\t\n\r\f />\x00]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>'
+    r'|!--.*?--\s*>|![^>]*>|\?[^>]*>)',
+    re.DOTALL
+)
+
+HTML_ATTRIBUTE_PATTERN = re.compile(r'([^\s/>][^\s/=>]*)(?:\s*=+\s*(?:"([^"]*)"|\'([^\']*)\'|([^>\s]*)))?')
+
+# Elements whose content is text up to their end tag, never markup
+RAW_TEXT_END_PATTERNS = {
+    'script': re.compile(r'</script\s*>', re.IGNORECASE),
+    'style': re.compile(r'</style\s*>', re.IGNORECASE),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _element_tag_pattern(tag: str) -> re.Pattern:
+    """Start and end tags of one element name, for finding where a skipped element ends."""
+    return re.compile(rf'<(/?){re.escape(tag)}(?=[\s/>])[^>]*>', re.IGNORECASE)
+
+
+def _element_end(html: str, tag: str, position: int) -> int:
+    """Offset of the end tag closing the ``tag`` element whose content starts at ``position``."""
+    depth = 1
+    for match in _element_tag_pattern(tag).finditer(html, position):
+        if match.group(1):
+            depth -= 1
+            if depth == 0:
+                return match.start()
+        elif not match.group(0).endswith('/>'):
+            depth += 1
+    return len(html)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_attributes(markup: str) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """Attribute names and unescaped values of a start tag; tags repeat, so they are parsed once."""
+    attrs = []
+    for match in HTML_ATTRIBUTE_PATTERN.finditer(markup):
+        name, double_quoted, single_quoted, unquoted = match.groups()
+        value = next((v for v in (double_quoted, single_quoted, unquoted) if v is not None), None)
+        attrs.append((name.lower(), unescape(value) if value else value))
+    return tuple(attrs)
+
+
+def _class_list(attrs: Dict[str, Optional[str]]) -> List[str]:
+    return (attrs.get('class') or '').split()
+
+
+def _language_from_classes(classes: List[str]) -> Optional[str]:
+    for css_class in classes:
+        if css_class.startswith('language-'):
+            return css_class[len('language-'):]
+        if css_class in ('mermaid', 'plantuml'):
+            return css_class
+    return None
+
+
+# Fence languages rendered to images by DiagramRenderer, and the renderer each one uses
+DIAGRAM_LANGUAGES = {'mermaid': 'mermaid', 'plantuml': 'plantuml', 'puml': 'plantuml'}
+
+DIAGRAM_FENCE_PATTERN = re.compile(
+    r'^(?P<indent>[ \t]*)(?P<fence>`{3,}|~{3,})[ \t]*(?P<language>mermaid|plantuml|puml)\b[^\n]*\n'
+    r'(?P<code>.*?)^(?P=indent)(?P=fence)[ \t]*$',
+    re.MULTILINE | re.DOTALL
+)
+
+
+def diagram_key(language: str, code: str) -> str:
+    """Cache key of a diagram: its renderer and source, ignoring surrounding whitespace."""
+    return hashlib.sha256(f'{DIAGRAM_LANGUAGES[language]}\0{code.strip()}'.encode('utf-8')).hexdigest()
+
+
+def find_diagrams(markdown_content: str) -> List[Tuple[str, str]]:
+    """Find the mermaid and PlantUML fences of a page, as ``(language, source)`` pairs."""
+    diagrams = []
+    for match in DIAGRAM_FENCE_PATTERN.finditer(markdown_content):
+        indent = match.group('indent')
+        lines = match.group('code').splitlines()
+        if indent:
+            # Fences nested in lists or admonitions: the code is indented like the fence
+            lines = [line[len(indent):] if line.startswith(indent) else line.lstrip() for line in lines]
+        diagrams.append((match.group('language'), '\n'.join(lines)))
+    return diagrams
+
+
+def page_url_dir(url: str) -> str:
+    """Directory that relative links in a page rendered at ``url`` resolve against."""
+    return url if url.endswith('/') or not url else posixpath.dirname(url)
+
+
+def _link_key(path: str) -> str:
+    """Normalise a site-relative path so every way of writing it maps to one key."""
+    path = posixpath.normpath(path).lstrip('/')
+    if path == '.':
+        return ''
+    for suffix in ('/index.md', '/README.md', '/index.html'):
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    if path in ('index.md', 'README.md', 'index.html'):
+        return ''
+    return path
+
+
+class LinkIndex:
+    """Maps every way a page can be linked to its Confluence page title.
+
+    Built once after nav resolution. Pages are indexed by ``src_path`` (as written
+    in Markdown, with ``index.md`` also reachable by its directory) and by the URL
+    MkDocs renders them at, so each link is a single dictionary lookup.
+    """
+
+    def __init__(self, pages=()):
+        self.titles: Dict[str, str] = {}
+        for src_path, url, title in pages:
+            self.add(src_path, url, title)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def add(self, src_path: str, url: Optional[str], title: str):
+        self.titles[_link_key(src_path.replace(os.sep, '/'))] = title
+        if url is not None:
+            key = _link_key(url.rstrip('/'))
+            # The source form wins if a URL happens to look like another page's src_path
+            self.titles.setdefault(key, title)
+
+    def resolve(self, href: str, base: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Resolve a link relative to ``base`` to a page title and optional anchor."""
+        if not href or href.startswith(('#', '//')) or ':' in href.split('/', 1)[0]:
+            # Same-page anchors, protocol-relative and absolute URLs (http:, mailto:, ...)
+            return None
+        path, _, anchor = href.partition('#')
+        path = unquote(path.split('?', 1)[0])
+        if not path.startswith('/'):
+            path = posixpath.join(base, path)
+        title = self.titles.get(_link_key(path))
+        if title is None:
+            return None
+        return title, anchor or None
+
+
+class ConfluenceStorageConverter:
+    """Converts rendered HTML to Confluence storage format in a single pass.
+
+    Elements are dispatched by tag name through ``TAG_HANDLERS`` and, for ``div``
+    elements, by CSS class through ``CLASS_HANDLERS``. A handler emits the opening
+    markup and returns what to emit when the element closes, so supporting a new
+    element never adds another scan over the document. Tags are found with one
+    regular expression rather than ``html.parser``, whose per-tag work made it the
+    bulk of the conversion time.
+    """
+
+    TAG_HANDLERS = {
+        'pre': '_start_pre',
+        'img': '_start_img',
+        'table': '_start_table',
+        'details': '_start_details',
+        'summary': '_start_title',
+        'label': '_start_tab_label',
+        'input': '_start_drop',
+        'mxfile': '_start_skip',
+        'a': '_start_link',
+    }
+
+    CLASS_HANDLERS = {
+        'div': {
+            'admonition': '_start_admonition',
+            'codehilite': '_start_code_wrapper',
+            'highlight': '_start_code_wrapper',
+            'tabbed-set': '_start_tabbed_set',
+            'tabbed-labels': '_start_wrapper',
+            'tabbed-content': '_start_tabbed_content',
+            'tabbed-block': '_start_tab',
+        },
+        'p': {
+            'admonition-title': '_start_title',
+        },
+    }
+
+    def __init__(self, links: Optional[LinkIndex] = None, link_base: str = '',
+                 diagrams: Optional[Dict[str, str]] = None, profiler: Optional[PhaseProfiler] = None):
+        self.links = links
+        self.link_base = link_base
+        self.diagrams = diagrams or {}
+        # Times link resolution as the 'link_fixing' stage; unset in conversion workers
+        self.profiler = profiler if profiler and profiler.enabled else None
+        self._out: List[str] = []
+        self._stack: List[list] = []
+        self._suppress = 0
+        self._capture: Optional[List[str]] = None
+        self._pending: Optional[str] = None
+        self._code_language: Optional[str] = None
+        self._wrapper_language: Optional[str] = None
+        self._default_title: Optional[str] = None
+        self._tab_labels: List[str] = []
+        self._tab_sets: List[bool] = []
+        self.images: List[str] = []
+        # Handlers bound once, rather than looked up by name for every tag
+        self._tag_handlers = {tag: getattr(self, name) for tag, name in self.TAG_HANDLERS.items()}
+        self._class_handlers = {
+            tag: {css_class: getattr(self, name) for css_class, name in handlers.items()}
+            for tag, handlers in self.CLASS_HANDLERS.items()
+        }
+        # Tags that can never be copied straight to the output
+        self._special_tags = (
+            self._tag_handlers.keys() | self._class_handlers.keys() | VOID_ELEMENTS | RAW_TEXT_END_PATTERNS.keys()
+        )
+
+    def convert(self, html: str) -> str:
+        """Convert a complete HTML document or fragment.
+
+        Most tokens are plain text and elements without attributes or handlers, such
+        as table cells, which are copied here directly while nothing is being
+        suppressed, captured or held back; everything else goes through the handlers.
+        """
+        search = HTML_TOKEN_PATTERN.search
+        out = self._out
+        stack = self._stack
+        special_tags = self._special_tags
+        position = 0
+        while True:
+            plain = not (self._suppress or self._pending or self._capture is not None
+                         or self._code_language is not None)
+            match = search(html, position)
+            if match is None:
+                break
+            start = match.start()
+            if start > position:
+                data = html[position:start]
+                if not plain or '&' in data or '>' in data:
+                    self.handle_data(unescape(data))
+                elif data.strip():
+                    out.append(data)
+                elif not out or out[-1] != '\n':
+                    # Whitespace between blocks, as in handle_data
+                    out.append('\n' if '\n' in data else data)
+            position = match.end()
+            
+            end_tag, tag, markup = match.groups()
+            if tag is None:
+                continue
+            tag = tag.lower()
+            if end_tag:
+                if plain and stack and stack[-1][0] == tag and isinstance(stack[-1][1], str):
+                    closer = stack.pop()[1]
+                    if closer:
+                        out.append(closer)
+                else:
+                    self.handle_endtag(tag)
+                continue
+            if plain and not markup and tag not in special_tags:
+                out.append(f'<{tag}>')
+                stack.append([tag, f'</{tag}>'])
+                continue
+            attrs = dict(_parse_attributes(markup)) if markup else {}
+            if markup.endswith('/'):
+                self.handle_startendtag(tag, attrs)
+                continue
+            suppressed = self._suppress
+            self.handle_starttag(tag, attrs)
+            if self._suppress > suppressed:
+                # Dropped content is never looked at: continue at the element's end tag
+                position = _element_end(html, tag, position)
+                continue
+            
+            end_pattern = RAW_TEXT_END_PATTERNS.get(tag)
+            if end_pattern:
+                end = end_pattern.search(html, position)
+                end = end.start() if end else len(html)
+                if end > position:
+                    self.handle_data(html[position:end])
+                position = end
+        if position < len(html):
+            self.handle_data(unescape(html[position:]))
+        
+        while self._stack:
+            self._close_frame(self._stack.pop())
+        return ''.join(self._out).strip()
+
+    # Output helpers
+
+    def _emit(self, markup: str):
+        if self._suppress or self._capture is not None:
+            return
+        if self._pending:
+            self._out.append(self._pending)
+            self._pending = None
+        self._out.append(markup)
+
+    def _push(self, tag: str, closer):
+        self._stack.append([tag, closer])
+
+    def _close_frame(self, frame: list):
+        closer = frame[1]
+        if callable(closer):
+            closer()
+        elif closer == _SKIP:
+            self._suppress -= 1
+        elif closer:
+            self._emit(closer)
+
+    @staticmethod
+    def _attrs_markup(attrs: Dict[str, Optional[str]]) -> str:
+        return ''.join(
+            f' {name}' if value is None else f' {name}="{escape(value)}"'
+            for name, value in attrs.items()
+        )
+
+    # Token handlers
+
+    def handle_starttag(self, tag, attrs):
+        if self._suppress or self._code_language is not None:
+            # Inside skipped or code content only the structure is tracked
+            if self._code_language == '' and tag == 'code':
+                self._code_language = _language_from_classes(_class_list(attrs)) or ''
+            if tag not in VOID_ELEMENTS:
+                self._push(tag, None)
+            return
+        
+        handler = self._tag_handlers.get(tag)
+        class_handlers = self._class_handlers.get(tag)
+        if class_handlers and 'class' in attrs:
+            handler = next(
+                (class_handlers[c] for c in _class_list(attrs) if c in class_handlers),
+                handler
+            )
+        
+        if handler:
+            closer = handler(tag, attrs)
+        elif tag in VOID_ELEMENTS:
+            self._emit(f'<{tag}{self._attrs_markup(attrs)} />')
+            return
+        else:
+            self._emit(f'<{tag}{self._attrs_markup(attrs)}>')
+            closer = f'</{tag}>'
+        
+        if tag not in VOID_ELEMENTS:
+            self._push(tag, closer)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        stack = self._stack
+        for index in range(len(stack) - 1, -1, -1):
+            if stack[index][0] == tag:
+                break
+        else:
+            # Stray end tag
+            return
+        while len(stack) > index:
+            self._close_frame(stack.pop())
+
+    def handle_data(self, data):
+        if self._suppress:
+            return
+        if self._capture is not None:
+            self._capture.append(data)
+            return
+        if not data.strip():
+            # Whitespace between blocks is insignificant; keep at most one line break
+            if not self._pending and not (self._out and self._out[-1] == '\n'):
+                self._out.append('\n' if '\n' in data else data)
+            return
+        self._emit(escape(data, quote=False))
+
+    # Element handlers
+
+    def _start_skip(self, tag, attrs):
+        self._suppress += 1
+        return _SKIP
+
+    def _start_drop(self, tag, attrs):
+        return None
+
+    def _start_wrapper(self, tag, attrs):
+        return ''
+
+    def _start_code_wrapper(self, tag, attrs):
+        self._wrapper_language = _language_from_classes(_class_list(attrs))
+        return self._end_code_wrapper
+
+    def _end_code_wrapper(self):
+        self._wrapper_language = None
+
+    def _start_pre(self, tag, attrs):
+        language = _language_from_classes(_class_list(attrs)) or self._wrapper_language
+        self._code_language = language or ''
+        self._capture = []
+        return self._end_pre
+
+    def _end_pre(self):
+        code = ''.join(self._capture).strip('\n')
+        language = self._code_language
+        self._capture = None
+        self._code_language = None
+        diagram = self.diagrams.get(diagram_key(language, code)) if language in DIAGRAM_LANGUAGES else None
+        if diagram:
+            self._emit(f'<ac:image><ri:attachment ri:filename="{escape(diagram)}" /></ac:image>')
+        else:
+            self._emit(self._code_macro(code, language))
+
+    def _code_macro(self, code: str, language: Optional[str]) -> str:
+        parameter = ''
+        if language:
+            language = CODE_LANGUAGE_REPLACEMENTS.get(language.lower(), language.lower())
+        if language in CODE_MACRO_LANGUAGES:
+            parameter = f'<ac:parameter ac:name="language">{escape(language)}</ac:parameter>'
+        code = code.replace(']]>', ']]]]><![CDATA[>')
+        return (
+            f'<ac:structured-macro ac:name="code">{parameter}'
+            f'<ac:plain-text-body><![CDATA[{code}]]></ac:plain-text-body></ac:structured-macro>'
+        )
+
+    def _start_img(self, tag, attrs):
+        src = attrs.get('src') or ''
+        if not src:
+            # Empty images are typically left behind by the drawio exporter
+            return None
+        alt = attrs.get('alt')
+        alt_markup = f' ac:alt="{escape(alt)}"' if alt else ''
+        if src.startswith(('http://', 'https://')):
+            self._emit(f'<ac:image{alt_markup}><ri:url ri:value="{escape(src)}" /></ac:image>')
+        else:
+            self.images.append(src)
+            filename = posixpath.basename(src.split('?', 1)[0].split('#', 1)[0])
+            self._emit(f'<ac:image{alt_markup}><ri:attachment ri:filename="{escape(filename)}" /></ac:image>')
+        return None
+
+    def _start_table(self, tag, attrs):
+        if 'class' not in attrs:
+            attrs['class'] = 'wrapped'
+        self._emit(f'<table{self._attrs_markup(attrs)}>')
+        return '</table>'
+
+    def _start_link(self, tag, attrs):
+        if 'headerlink' in _class_list(attrs):
+            return self._start_skip(tag, attrs)
+        target = None
+        if self.links:
+            if self.profiler:
+                with self.profiler.phase('link_fixing'):
+                    target = self.links.resolve(attrs.get('href') or '', self.link_base)
+            else:
+                target = self.links.resolve(attrs.get('href') or '', self.link_base)
+        if target:
+            # Links to other published pages become page links, which survive renames in Confluence
+            title, anchor = target
+            anchor_markup = f' ac:anchor="{escape(anchor)}"' if anchor else ''
+            self._emit(f'<ac:link{anchor_markup}><ri:page ri:content-title="{escape(title)}" /><ac:link-body>')
+            return '</ac:link-body></ac:link>'
+        self._emit(f'<a{self._attrs_markup(attrs)}>')
+        return '</a>'
+
+    def _start_macro(self, name: str, default_title: Optional[str]):
+        self._emit(f'<ac:structured-macro ac:name="{name}">')
+        self._pending = '<ac:rich-text-body>'
+        self._default_title = default_title
+        return self._end_macro
+
+    def _end_macro(self):
+        # Flushes the pending body first when the admonition only had a title
+        self._emit('</ac:rich-text-body></ac:structured-macro>')
+
+    def _start_admonition(self, tag, attrs):
+        classes = [c for c in _class_list(attrs) if c != 'admonition']
+        kind = classes[0] if classes else 'note'
+        return self._start_macro(ADMONITION_MACROS.get(kind, 'info'), kind.capitalize())
+
+    def _start_details(self, tag, attrs):
+        return self._start_macro('expand', None)
+
+    def _start_title(self, tag, attrs):
+        if not self._pending:
+            self._emit(f'<{tag}{self._attrs_markup(attrs)}>')
+            return f'</{tag}>'
+        self._capture = []
+        return self._end_title
+
+    def _end_title(self):
+        title = ''.join(self._capture).strip()
+        self._capture = None
+        if title and title != self._default_title:
+            # Written directly so the rich-text body still opens after the parameter
+            self._out.append(f'<ac:parameter ac:name="title">{escape(title, quote=False)}</ac:parameter>')
+
+    def _start_tabbed_set(self, tag, attrs):
+        self._tab_sets.append('tabbed-alternate' in _class_list(attrs))
+        return self._end_tabbed_set
+
+    def _end_tabbed_set(self):
+        self._tab_sets.pop()
+        self._tab_labels = []
+
+    def _start_tab_label(self, tag, attrs):
+        if not self._tab_sets:
+            self._emit(f'<label{self._attrs_markup(attrs)}>')
+            return '</label>'
+        self._capture = []
+        return self._end_tab_label
+
+    def _end_tab_label(self):
+        self._tab_labels.append(''.join(self._capture).strip())
+        self._capture = None
+
+    def _start_tabbed_content(self, tag, attrs):
+        if self._tab_sets and not self._tab_sets[-1]:
+            return self._start_tab(tag, attrs)
+        return ''
+
+    def _start_tab(self, tag, attrs):
+        # Confluence has no native tabs, so each tab becomes a labelled block
+        if self._tab_labels:
+            label = self._tab_labels.pop(0)
+            self._emit(f'<p><strong>{escape(label, quote=False)}</strong></p>')
+        return ''
+
+
+MARKDOWN_EXTENSIONS = ['fenced_code', 'codehilite', 'tables', 'toc', 'admonition']
+
+# Leave highlighting to Confluence's code macro and keep fence languages as ``language-*`` classes
+MARKDOWN_EXTENSION_CONFIGS = {'codehilite': {'use_pygments': False}}
+
+MARKDOWN_IMAGE_PATTERN = re.compile(r'!\[.*?\]\((.*?)\)')
+
+EMPTY_CONTENT = '<p>Content could not be processed.</p>'
+
+
+def find_markdown_images(markdown_content: str, abs_src_path: str) -> List[str]:
+    """Find local images referenced by the markdown that exist on disk."""
+    attachments = []
+    
+    for match in MARKDOWN_IMAGE_PATTERN.finditer(markdown_content):
+        image_path = match.group(1)
+        if not image_path.startswith('http'):
+            # Convert relative path to absolute
+            full_path = os.path.join(os.path.dirname(abs_src_path), image_path)
+            full_path = os.path.normpath(full_path)
+            if os.path.exists(full_path):
+                attachments.append(full_path)
+            else:
+                logger.warning(f"Referenced image not found: {full_path}")
+    
+    return attachments
+
+
+ATTACHMENT_REFERENCE_PATTERN = re.compile(r'<ri:attachment ri:filename="([^"]*)" />')
+
+
+def shared_attachment_name(path: str) -> str:
+    """Content-addressed attachment name: the file's SHA-256 plus its extension."""
+    return file_hash(path) + os.path.splitext(path)[1].lower()
+
+
+def link_shared_attachments(content: str, attachments: List[str], page_title: str) -> Tuple[str, Dict[str, str]]:
+    """Point a page's image references at content-addressed attachments of a shared page.
+
+    Returns the rewritten storage body and the files it now references, by attachment name.
+    """
+    shared = {}
+    by_filename = {}
+    for path in attachments:
+        name = shared_attachment_name(path)
+        shared[name] = path
+        by_filename.setdefault(os.path.basename(path), name)
+    
+    page_markup = f'<ri:page ri:content-title="{escape(page_title)}" />'
+    
+    def replace(match):
+        name = by_filename.get(unescape(match.group(1)))
+        if name is None:
+            return match.group(0)
+        return f'<ri:attachment ri:filename="{name}">{page_markup}</ri:attachment>'
+    
+    return ATTACHMENT_REFERENCE_PATTERN.sub(replace, content), shared
+
+
+def rename_attachment_references(content: str, renames: Dict[str, str]) -> str:
+    """Rename the page attachments a storage body references, e.g. after rasterising an SVG."""
+    def replace(match):
+        name = renames.get(unescape(match.group(1)))
+        return f'<ri:attachment ri:filename="{escape(name)}" />' if name else match.group(0)
+    
+    return ATTACHMENT_REFERENCE_PATTERN.sub(replace, content)
+
+
+class ImageOptimizer:
+    """Shrinks images before they are attached, caching the results on disk.
+
+    PNG and JPEG files wider than ``max_width`` are scaled down and re-encoded
+    (Pillow), and SVGs can be rasterised to PNG (cairosvg). Each result is stored
+    under its attachment name in a cache folder named after the source hash and
+    the settings, so an unchanged image is processed once across builds. An empty
+    folder records that processing would not have made the file smaller.
+    """
+
+    CACHE_VERSION = 1
+    RASTER_FORMATS = {'.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG'}
+
+    def __init__(self, cache_dir: str, max_width: int = 1600, quality: int = 85,
+                 optimize: bool = True, rasterize_svg: bool = False):
+        self.cache_dir = cache_dir
+        self.max_width = max_width
+        self.quality = quality
+        self.optimize = optimize and Image is not None
+        self.rasterize_svg = rasterize_svg and cairosvg is not None
+        self.cached = 0
+        self.processed = 0
+        self.bytes_saved = 0
+
+    def output_name(self, path: str) -> str:
+        """Attachment name of the processed file."""
+        stem, ext = os.path.splitext(os.path.basename(path))
+        if ext.lower() == '.svg' and self.rasterize_svg:
+            return f'{stem}.png'
+        return os.path.basename(path)
+
+    def process(self, path: str) -> str:
+        """Return the file to attach in place of ``path``, processing it on a cache miss."""
+        ext = os.path.splitext(path)[1].lower()
+        if not (ext == '.svg' and self.rasterize_svg or ext in self.RASTER_FORMATS and self.optimize):
+            return path
+        
+        name = self.output_name(path)
+        settings = f'{self.CACHE_VERSION}:{name}:{self.max_width}:{self.quality}:{self.optimize}'
+        key = hashlib.sha256(f'{file_hash(path)}:{settings}'.encode('utf-8')).hexdigest()
+        entry_dir = os.path.join(self.cache_dir, key)
+        output = os.path.join(entry_dir, name)
+        
+        if os.path.isdir(entry_dir):
+            self.cached += 1
+        else:
+            self.processed += 1
+            # Build the entry next to its final place and rename it, so a cache entry is never partial
+            tmp_dir = f'{entry_dir}.{uuid.uuid4().hex}.tmp'
+            os.makedirs(tmp_dir)
+            tmp_output = os.path.join(tmp_dir, name)
+            try:
+                if ext == '.svg':
+                    self._rasterize(path, tmp_output)
+                else:
+                    self._recompress(path, tmp_output, self.RASTER_FORMATS[ext])
+                    if os.path.getsize(tmp_output) >= os.path.getsize(path):
+                        os.remove(tmp_output)
+            except Exception as e:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                logger.warning(f"Could not optimise image {path}, attaching it unchanged: {e}")
+                return path
+            try:
+                os.replace(tmp_dir, entry_dir)
+            except OSError:
+                # Another build filled the entry first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                if not os.path.isdir(entry_dir):
+                    raise
+        
+        if not os.path.exists(output):
+            return path
+        if ext != '.svg':
+            self.bytes_saved += os.path.getsize(path) - os.path.getsize(output)
+        return output
+
+    def _recompress(self, source: str, target: str, image_format: str):
+        with Image.open(source) as image:
+            if image.width > self.max_width:
+                height = max(1, round(image.height * self.max_width / image.width))
+                image = image.resize((self.max_width, height), Image.LANCZOS)
+            if image_format == 'JPEG':
+                if image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+                image.save(target, 'JPEG', quality=self.quality, optimize=True, progressive=True)
+            else:
+                image.save(target, 'PNG', optimize=True)
+
+    def _rasterize(self, source: str, target: str):
+        # Twice the SVG's own size keeps text sharp on high-density screens
+        if not self.optimize:
+            cairosvg.svg2png(url=source, write_to=target, scale=2)
+            return
+        raw = f'{target}.raw.png'
+        cairosvg.svg2png(url=source, write_to=raw, scale=2)
+        self._recompress(raw, target, 'PNG')
+        os.remove(raw)
+
+
+PLANTUML_ALPHABET = bytes.maketrans(
+    b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/',
+    b'0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-_'
+)
+
+
+def plantuml_encode(source: str) -> str:
+    """Encode a diagram for a PlantUML server URL: raw deflate in PlantUML's base64 alphabet."""
+    compressed = zlib.compress(source.encode('utf-8'), 9)[2:-4]
+    return base64.b64encode(compressed).translate(PLANTUML_ALPHABET).decode('ascii')
+
+
+class DiagramRenderer:
+    """Renders mermaid and PlantUML sources to image files, cached on disk by source hash.
+
+    Mermaid is rendered with the mermaid CLI (``mmdc``), PlantUML by a PlantUML
+    server. Cached files are named after the diagram key, so a diagram is rendered
+    once for as long as its source is unchanged, and cache misses are rendered
+    concurrently. Diagrams that fail to render are left out and stay code blocks.
+    """
+
+    def __init__(self, cache_dir: str, image_format: str = 'png', mermaid_command: str = 'mmdc',
+                 plantuml_server: str = '', workers: int = 4, timeout: float = 120, verify_ssl: bool = False):
+        self.cache_dir = cache_dir
+        self.image_format = image_format
+        self.mermaid_command = self._resolve_command(mermaid_command)
+        self.plantuml_server = plantuml_server.rstrip('/')
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.verify_ssl = verify_ssl
+        self.rendered: Dict[str, str] = {}
+        self.failed: Set[str] = set()
+        self.cached = 0
+        self.misses = 0
+        self._session: Optional[requests.Session] = None
+        self._warned_plantuml = False
+
+    @staticmethod
+    def _resolve_command(command: str) -> List[str]:
+        """Split a command line and look its program up on the PATH.
+
+        subprocess does not try PATHEXT, so on Windows ``mmdc`` (installed by npm
+        as ``mmdc.cmd``) is only found through shutil.which.
+        """
+        if os.name == 'nt':
+            # Backslashes are path separators there, not escapes
+            args = [arg.strip('"') for arg in shlex.split(command, posix=False)]
+        else:
+            args = shlex.split(command)
+        if args:
+            args[0] = shutil.which(args[0]) or args[0]
+        return args
+
+    def render(self, diagrams: List[Tuple[str, str]]) -> Dict[str, str]:
+        """Return the image file of each diagram that could be rendered, by diagram key."""
+        results = {}
+        misses = {}
+        for language, code in diagrams:
+            key = diagram_key(language, code)
+            if key in self.rendered:
+                results[key] = self.rendered[key]
+                continue
+            if key in self.failed or key in misses:
+                continue
+            path = os.path.join(self.cache_dir, f'{DIAGRAM_LANGUAGES[language]}-{key[:16]}.{self.image_format}')
+            if os.path.exists(path):
+                self.cached += 1
+                self.rendered[key] = results[key] = path
+                continue
+            if DIAGRAM_LANGUAGES[language] == 'plantuml' and not self.plantuml_server:
+                if not self._warned_plantuml:
+                    logger.warning(
+                        "Found PlantUML diagrams but no plantuml_server is set (nor a plantuml plugin "
+                        "puml_url in mkdocs.yml), publishing them as code"
+                    )
+                    self._warned_plantuml = True
+                continue
+            misses[key] = (language, code, path)
+        
+        if not misses:
+            return results
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.misses += len(misses)
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(misses)),
+                                thread_name_prefix='confluence-diagram') as executor:
+            futures = {
+                executor.submit(self._render_one, language, code, path): key
+                for key, (language, code, path) in misses.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    self.rendered[key] = results[key] = future.result()
+                except Exception as e:
+                    language = misses[key][0]
+                    logger.warning(f"Could not render {language} diagram {key[:16]}, publishing its source: {e}")
+                    self.failed.add(key)
+        return results
+
+    def _render_one(self, language: str, code: str, path: str) -> str:
+        # Render next to the cache entry and rename it, so an entry is never partial
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            if DIAGRAM_LANGUAGES[language] == 'mermaid':
+                self._render_mermaid(code, tmp_path)
+            else:
+                self._render_plantuml(code, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    def _render_mermaid(self, code: str, target: str):
+        source = f'{target}.mmd'
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(code)
+        try:
+            # mmdc picks the output format from the file extension
+            output = f'{target}.{self.image_format}'
+            result = subprocess.run(
+                self.mermaid_command + ['-i', source, '-o', output],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=self.timeout
+            )
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip() or f'exit code {result.returncode}')
+            os.replace(output, target)
+        finally:
+            os.remove(source)
+
+    def _render_plantuml(self, code: str, target: str):
+        if self._session is None:
+            self._session = requests.Session()
+        response = self._session.get(
+            f'{self.plantuml_server}/{self.image_format}/{plantuml_encode(code)}',
+            timeout=self.timeout,
+            verify=self.verify_ssl
+        )
+        response.raise_for_status()
+        with open(target, 'wb') as f:
+            f.write(response.content)
+
+
+def render_markdown(markdown_content: str) -> str:
+    """Render markdown to HTML with the extensions the converter understands."""
+    return markdown.markdown(
+        markdown_content, extensions=MARKDOWN_EXTENSIONS, extension_configs=MARKDOWN_EXTENSION_CONFIGS
+    )
+
+
+def convert_page_source(source: str, abs_src_path: str, rendered_html: bool,
+                        links: Optional[LinkIndex] = None, link_base: str = '',
+                        diagrams: Optional[Dict[str, str]] = None) -> Tuple[str, List[str]]:
+    """Convert a page's Markdown, or the HTML MkDocs rendered for it, to storage format.
+
+    Module-level so it can run in a worker process. For Markdown the returned images
+    are the local files found on disk; for rendered HTML they are the image URLs as
+    they appear in the page, to be resolved against the site files by the caller.
+    Diagrams already rendered to attachments are given by diagram key.
+    """
+    if rendered_html:
+        converter = ConfluenceStorageConverter(links, link_base, diagrams)
+        return converter.convert(source) or EMPTY_CONTENT, converter.images
+    
+    attachments = find_markdown_images(source, abs_src_path)
+    content = ConfluenceStorageConverter(links, link_base, diagrams).convert(render_markdown(source))
+    return content or EMPTY_CONTENT, attachments
+
+
+# Link index of the build, sent once to each conversion worker rather than with every page
+_worker_links: Optional[LinkIndex] = None
+
+
+def init_conversion_worker(links: Optional[LinkIndex]):
+    global _worker_links
+    _worker_links = links
+
+
+def timed_convert_page_source(source: str, abs_src_path: str, rendered_html: bool, link_base: str = '',
+                              diagrams: Optional[Dict[str, str]] = None) -> Tuple[str, List[str], float]:
+    """``convert_page_source`` for a conversion worker, also returning the CPU seconds it took."""
+    start = time.process_time()
+    content, images = convert_page_source(source, abs_src_path, rendered_html, _worker_links, link_base, diagrams)
+    return content, images, time.process_time() - start
+
+
 class ConfluencePublisherPlugin(BasePlugin):
     """MkDocs plugin for publishing to Confluence."""
     
@@ -152,6 +1947,32 @@ class ConfluencePublisherPlugin(BasePlugin):
         ('dry_run', config_options.Type(bool, default=False)),
         ('verify_ssl', config_options.Type(bool, default=False)),
         ('upload_attachments', config_options.Type(bool, default=True)),
+        ('incremental', config_options.Type(bool, default=False)),
+        ('manifest_path', config_options.Type(str, default='.confluence-manifest.json')),
+        ('publish_workers', config_options.Type(int, default=1)),
+        ('max_retries', config_options.Type(int, default=5)),
+        ('rate_limit', config_options.Type((int, float), default=0)),
+        ('use_rendered_html', config_options.Type(bool, default=False)),
+        ('metrics_report', config_options.Type(str, default='')),
+        ('metrics_prometheus', config_options.Type(str, default='')),
+        ('profile', config_options.Type(bool, default=False)),
+        ('profile_output', config_options.Type(str, default='')),
+        ('dry_run_output', config_options.Type(str, default='.confluence-dry-run')),
+        ('conversion_workers', config_options.Type(int, default=1)),
+        ('serve_debounce', config_options.Type((int, float), default=2.0)),
+        ('prune_removed_pages', config_options.Type(bool, default=False)),
+        ('shared_attachments_page', config_options.Type(str, default='')),
+        ('optimize_images', config_options.Type(bool, default=False)),
+        ('rasterize_svg', config_options.Type(bool, default=False)),
+        ('image_max_width', config_options.Type(int, default=1600)),
+        ('image_quality', config_options.Type(int, default=85)),
+        ('image_cache_dir', config_options.Type(str, default='.confluence-image-cache')),
+        ('render_diagrams', config_options.Type(bool, default=False)),
+        ('diagram_format', config_options.Choice(('png', 'svg'), default='png')),
+        ('mermaid_command', config_options.Type(str, default='mmdc')),
+        ('plantuml_server', config_options.Type(str, default='')),
+        ('diagram_cache_dir', config_options.Type(str, default='.confluence-diagram-cache')),
+        ('diagram_workers', config_options.Type(int, default=4)),
     )
 
     def __init__(self):
@@ -159,21 +1980,101 @@ class ConfluencePublisherPlugin(BasePlugin):
         self.confluence: Optional[ConfluenceClient] = None
         self.md_to_page: Dict[str, ConfluencePage] = {}
         self.page_attachments: Dict[str, List[str]] = {}
-        
-        # Setup Markdown processor with useful extensions
-        self.markdown_processor = markdown.Markdown(extensions=[
-            'markdown.extensions.tables',
-            'markdown.extensions.fenced_code',
-            'markdown.extensions.codehilite',
-            'markdown.extensions.toc',
-            'markdown.extensions.admonition',
-            'markdown.extensions.attr_list',
-            'markdown.extensions.def_list'
-        ])
+        self.manifest: Optional[PublishManifest] = None
+        self.page_index: Optional[Dict[str, dict]] = None
+        self.pages_by_id: Dict[int, dict] = {}
+        self.nav_src_paths: Set[str] = set()
+        # Page ID -> src_path of the nav file it is bound to, and pages mapped so far this build
+        self.page_owners: Dict[int, str] = {}
+        self.claimed_page_ids: Set[int] = set()
+        self.section_pages: Dict[Section, int] = {}
+        # Page ID -> (current title, nav title) of pages renamed this build, and the section pages among them
+        self.renames: Dict[int, Tuple[str, str]] = {}
+        self.section_renames: Dict[int, ConfluencePage] = {}
+        # Page ID -> title and parent ID of the section pages mapped this build
+        self.section_entries: Dict[int, dict] = {}
+        self.assets_page: Optional[ConfluencePage] = None
+        self.assets_title: Optional[str] = None
+        self.shared_attachments: Set[str] = set()
+        self.image_optimizer: Optional[ImageOptimizer] = None
+        self.diagram_renderer: Optional[DiagramRenderer] = None
+        self.page_diagrams: Dict[str, Dict[str, str]] = {}
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.pending: List[Future] = []
+        self.publish_failures: List[Tuple[str, str]] = []
+        self._failures_lock = threading.Lock()
+        self._files_by_url: Optional[Dict[str, File]] = None
+        self.profiler = PhaseProfiler()
+        self.conversion_pool: Optional[ProcessPoolExecutor] = None
+        self.link_index: Optional[LinkIndex] = None
+        self.dry_run_pages: Dict[str, dict] = {}
+        # Planned section pages, in nav order: title, action and the ID of an existing page
+        self.dry_run_sections: List[dict] = []
+        # src_path -> (page, files, conversion result or Future from the conversion pool)
+        self.conversions: Dict[str, tuple] = {}
+        self.live_reload: Optional[LiveReloadQueue] = None
+        self._live_reload_config = None
+        self._flush_lock = threading.Lock()
+
+    def on_startup(self, *, command, dirty):
+        """Keep the connection and page tree across rebuilds when running under ``mkdocs serve``."""
+        if command == 'serve' and not self.config['dry_run']:
+            self.live_reload = LiveReloadQueue(self.config['serve_debounce'], self._flush_live_reload)
+
+    def on_shutdown(self):
+        """Publish changes still waiting for the quiet period before ``mkdocs serve`` exits."""
+        if self.live_reload:
+            self.live_reload.flush_now()
 
     def on_config(self, config):
         """Initialize Confluence connection on config load."""
+        if self.live_reload:
+            # The flush publishes through the manifest and page tree this rebuild sets up again
+            self.live_reload.hold()
+            if self.confluence:
+                # Each rebuild reports its own requests, not the whole session's
+                self.confluence.metrics.reset()
+        profile_output = self.config['profile_output']
+        self.profiler = PhaseProfiler(
+            self.config['profile'],
+            self._config_path(config, profile_output) if profile_output else None
+        )
+        self.profiler.start()
+        with self.profiler.phase('on_config'):
+            return self._setup(config)
+
+    def _setup(self, config):
+        """Create the Confluence client, publish manifest and worker pool for a build."""
         logger.info("Initializing Confluence Publisher Plugin")
+        self.pending = []
+        self.conversions = {}
+        self._files_by_url = None
+        self.image_optimizer = self._create_image_optimizer(config)
+        self.diagram_renderer = None
+        self.page_diagrams = {}
+        if self.config['render_diagrams']:
+            self.diagram_renderer = DiagramRenderer(
+                self._config_path(config, self.config['diagram_cache_dir']),
+                image_format=self.config['diagram_format'],
+                mermaid_command=self.config['mermaid_command'],
+                plantuml_server=self.config['plantuml_server'] or self._plantuml_plugin_server(config),
+                workers=self.config['diagram_workers'],
+                verify_ssl=self.config['verify_ssl']
+            )
+        
+        if self.live_reload and self.confluence:
+            # Live-reload rebuild: the publish failures belong to the debounced flush
+            logger.debug("Reusing the Confluence connection of the previous rebuild")
+            self._live_reload_config = config
+            return config
+        
+        self.publish_failures = []
+        self.assets_page = None
+        self.assets_title = None
+        
+        if self.config['dry_run']:
+            self._setup_dry_run(config)
+            return config
         
         # Get configuration from environment
         confluence_url = os.getenv('CONFLUENCE_URL')
@@ -193,44 +2094,132 @@ class ConfluencePublisherPlugin(BasePlugin):
                 base_url=confluence_url,
                 username=confluence_username,
                 token=confluence_token,
-                verify_ssl=self.config['verify_ssl']
+                verify_ssl=self.config['verify_ssl'],
+                pool_size=max(10, self.config['publish_workers']),
+                max_retries=self.config['max_retries'],
+                rate_limit=self.config['rate_limit']
             )
             logger.info("Confluence connection initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Confluence connection: {e}")
         
+        # Always kept, since it binds files to their pages; incremental also skips by its hashes
+        self.manifest = PublishManifest(
+            self._config_path(config, self.config['manifest_path']),
+            self.config['space_key'],
+            self.config['parent_page_id']
+        )
+        self.manifest.load()
+        
+        if self.live_reload:
+            # Publishing happens on the debounced flush, which runs its own workers
+            self._live_reload_config = config
+            return config
+        
+        if self.confluence and self.config['publish_workers'] > 1:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.config['publish_workers'],
+                thread_name_prefix='confluence-publish'
+            )
+            logger.info(f"Publishing with {self.config['publish_workers']} concurrent workers")
+        
         return config
 
+    @profiled('on_nav')
     def on_nav(self, nav, config, files):
         """Create page structure in Confluence based on navigation."""
-        if not self.confluence or self.config['dry_run']:
-            return nav
-        
         prefix = self.config['confluence_prefix']
         space_key = self.config['space_key']
         parent_page_id = self.config['parent_page_id']
         
+        if self.config['dry_run']:
+            self.dry_run_sections = []
+            section_ids = self._plan_sections(nav.items, prefix)
+            self.dry_run_pages = self._plan_pages(nav.items, prefix, parent_page_id, section_ids)
+            self.link_index = self._build_link_index(nav, {
+                src_path: planned['title'] for src_path, planned in self.dry_run_pages.items()
+            })
+            if self.config['shared_attachments_page'] and self.config['upload_attachments']:
+                self.assets_title = f"{prefix}{self.config['shared_attachments_page']}"
+            self._prefetch_diagrams(nav)
+            self._start_conversion_pool()
+            return nav
+        
+        if not self.confluence:
+            return nav
+        
+        if self.live_reload:
+            nav_signature = (prefix, space_key, parent_page_id, self._nav_signature(nav.items))
+            if nav_signature == self.live_reload.nav_signature and self.md_to_page:
+                logger.debug("Navigation unchanged since the last rebuild, reusing the page tree")
+                return nav
+            if self.live_reload.nav_signature is not None:
+                # Titles and links may have changed, so every page is converted again
+                logger.info("Navigation changed, resolving the Confluence page tree again")
+                self.live_reload.sources = {}
+            self.live_reload.nav_signature = nav_signature
+        
         logger.info(f"Creating page structure in Confluence space '{space_key}' with prefix '{prefix}'")
         
+        try:
+            self.page_index = self._build_page_index(parent_page_id)
+        except Exception as e:
+            logger.warning(f"Could not list existing pages, looking titles up when creating them fails: {e}")
+            self.page_index = None
+        self.pages_by_id = {entry['id']: entry for entry in (self.page_index or {}).values()}
+        self.nav_src_paths = {page.file.src_path for page in nav.pages}
+        self.page_owners = {
+            entry['id']: src_path for src_path, entry in self.manifest.pages.items()
+            if src_path in self.nav_src_paths
+        } if self.manifest else {}
+        self.claimed_page_ids = set()
+        self.section_pages = {}
+        self.renames = {}
+        self.section_renames = {}
+        self.section_entries = {}
+        if self.manifest and self.page_index is not None:
+            self._bind_sections(nav.items, prefix)
+        
         try:
             self.md_to_page = self._create_pages(
                 nav.items, prefix, space_key, parent_page_id
             )
             logger.info(f"Created {len(self.md_to_page)} page mappings")
+            if self.manifest:
+                self.manifest.record_sections(self.section_entries)
         except Exception as e:
             logger.error(f"Failed to create page structure: {e}")
+        self._release_renamed_titles()
+        for confluence_page in self.section_renames.values():
+            self._submit(confluence_page.title, self._put_page, confluence_page, SECTION_PAGE_BODY)
+        
+        if self.config['shared_attachments_page'] and self.config['upload_attachments']:
+            self._resolve_assets_page(prefix, space_key, parent_page_id)
+        
+        self.link_index = self._build_link_index(nav, {
+            src_path: confluence_page.title for src_path, confluence_page in self.md_to_page.items()
+        })
+        self._prefetch_diagrams(nav)
+        self._start_conversion_pool()
+        return nav
+
+    @profiled('on_page_markdown')
+    def on_page_markdown(self, markdown: str, page: Page, config, files):
+        """Process page markdown and update Confluence content."""
+        if self.config['use_rendered_html']:
+            return markdown
+        
+        if self.config['dry_run']:
+            self._convert_dry_run(markdown, page, files)
+            return markdown
         
-        return nav
-
-    def on_page_markdown(self, markdown: str, page: Page, config, files):
-        """Process page markdown and update Confluence content."""
-        if not self.confluence or self.config['dry_run']:
+        if not self.confluence:
             return markdown
         
         logger.debug(f"Processing page: {page.file.src_path}")
         
         try:
-            attachments = self._update_page_content(markdown, page)
+            attachments = self._update_page_content(markdown, page, files)
             self.page_attachments[page.file.src_path] = attachments
             logger.debug(f"Updated page content, found {len(attachments)} attachments")
         except Exception as e:
@@ -238,6 +2227,31 @@ class ConfluencePublisherPlugin(BasePlugin):
         
         return markdown
 
+    @profiled('on_page_content')
+    def on_page_content(self, html: str, page: Page, config, files):
+        """Update Confluence content from the HTML MkDocs already rendered for the page."""
+        if not self.config['use_rendered_html']:
+            return html
+        
+        if self.config['dry_run']:
+            self._convert_dry_run(html, page, files)
+            return html
+        
+        if not self.confluence:
+            return html
+        
+        logger.debug(f"Processing rendered page: {page.file.src_path}")
+        
+        try:
+            attachments = self._update_page_content(html, page, files)
+            self.page_attachments[page.file.src_path] = attachments
+            logger.debug(f"Updated page content, found {len(attachments)} attachments")
+        except Exception as e:
+            logger.error(f"Failed to update page content for {page.file.src_path}: {e}")
+        
+        return html
+
+    @profiled('on_post_page')
     def on_post_page(self, output: str, page: Page, config):
         """Upload attachments after page processing."""
         if not self.confluence or self.config['dry_run']:
@@ -252,20 +2266,770 @@ class ConfluencePublisherPlugin(BasePlugin):
         
         if confluence_page and attachments:
             logger.debug(f"Uploading {len(attachments)} attachments for page: {confluence_page.title}")
-            try:
-                self._upload_attachments(confluence_page.id, attachments)
-            except Exception as e:
-                logger.error(f"Failed to upload attachments for {page.file.src_path}: {e}")
+            self._submit(page.file.src_path, self._upload_attachments, confluence_page.id, attachments)
         
         return output
 
     def on_post_build(self, config):
-        """Log completion of publishing process."""
+        """Finish publishing and report where the plugin spent its time."""
+        with self.profiler.phase('on_post_build'):
+            self._finish_publishing(config)
+        self.profiler.finish()
+
+    def _finish_publishing(self, config):
+        """Wait for outstanding publish work and log completion of publishing process."""
         if self.config['dry_run']:
+            self._finish_dry_run(config)
             logger.info("Dry run completed - no changes made to Confluence")
+            return
+        
+        if self.conversion_pool:
+            self._publish_converted_pages()
+        self._report_images()
+        
+        if self.live_reload:
+            queued = self.live_reload.schedule()
+            if queued:
+                logger.info(f"Publishing {queued} changed page(s) after {self.live_reload.delay:g}s without further changes")
+            else:
+                logger.info("No page changes to publish")
+            return
+        
+        if self.manifest and self.confluence:
+            self._prune_removed_pages()
+        
+        if self.executor:
+            logger.info(f"Waiting for {len(self.pending)} queued publish tasks")
+            wait(self.pending)
+            self.executor.shutdown()
+            self.executor = None
+            self.pending = []
+        
+        self._report_publish_results(config)
+
+    def _report_images(self):
+        """Log how many diagrams and images were rendered or processed, or reused from their caches."""
+        renderer = self.diagram_renderer
+        if renderer and (renderer.misses or renderer.cached):
+            logger.info(
+                f"Diagrams: {renderer.misses - len(renderer.failed)} rendered, {renderer.cached} from cache, "
+                f"{len(renderer.failed)} failed"
+            )
+        optimizer = self.image_optimizer
+        if optimizer and (optimizer.processed or optimizer.cached):
+            logger.info(
+                f"Images: {optimizer.processed} processed, {optimizer.cached} from cache, "
+                f"{optimizer.bytes_saved / 1024:.0f} KiB smaller"
+            )
+
+    def _report_publish_results(self, config):
+        """Save the publish manifest and report metrics and failures."""
+        if self.manifest:
+            try:
+                self.manifest.save()
+            except OSError as e:
+                logger.error(f"Failed to save publish manifest: {e}")
+        
+        if self.confluence:
+            self._report_metrics(config)
+        
+        if self.publish_failures:
+            logger.error(f"Failed to publish {len(self.publish_failures)} item(s) to Confluence:")
+            for src_path, error in self.publish_failures:
+                logger.error(f"  {src_path}: {error}")
         else:
             logger.info("Successfully published documentation to Confluence")
 
+    @staticmethod
+    def _plantuml_plugin_server(config) -> str:
+        """Server of the plantuml plugin in mkdocs.yml, which renders the same fences for the site."""
+        plugin = config['plugins'].get('plantuml')
+        return (plugin.config.get('puml_url') or '') if plugin is not None else ''
+
+    @staticmethod
+    def _config_path(config, path: str) -> str:
+        """Resolve a path from the plugin options relative to mkdocs.yml."""
+        if os.path.isabs(path):
+            return path
+        return os.path.join(os.path.dirname(config['config_file_path'] or ''), path)
+
+    def _report_metrics(self, config):
+        """Log a summary of the API requests made during the build and write the configured reports."""
+        report = self.confluence.metrics.report()
+        logger.info(
+            f"Confluence API: {report['requests']} requests, {report['retries']} retries, "
+            f"{report['errors']} errors, {report['response_bytes'] / 1024:.0f} KiB received "
+            f"in {report['duration_seconds']:.1f}s"
+        )
+        slowest = sorted(report['endpoints'], key=lambda e: e['latency_seconds']['total'], reverse=True)
+        for entry in slowest[:3]:
+            latency = entry['latency_seconds']
+            logger.info(
+                f"  {entry['method']} {entry['endpoint']}: {entry['requests']} requests, "
+                f"{latency['total']:.1f}s total, p50 {latency['p50'] * 1000:.0f}ms, "
+                f"p95 {latency['p95'] * 1000:.0f}ms, p99 {latency['p99'] * 1000:.0f}ms"
+            )
+        
+        if self.config['metrics_report']:
+            report.update({
+                'space_key': self.config['space_key'],
+                'parent_page_id': self.config['parent_page_id'],
+                'pages': len(self.md_to_page),
+                'publish_failures': len(self.publish_failures),
+            })
+            path = self._config_path(config, self.config['metrics_report'])
+            try:
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, indent=2)
+                logger.info(f"Wrote publish metrics report to {path}")
+            except OSError as e:
+                logger.error(f"Failed to write publish metrics report: {e}")
+        
+        if self.config['metrics_prometheus']:
+            path = self._config_path(config, self.config['metrics_prometheus'])
+            try:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(self.confluence.metrics.prometheus())
+                logger.info(f"Wrote Prometheus publish metrics to {path}")
+            except OSError as e:
+                logger.error(f"Failed to write Prometheus publish metrics: {e}")
+
+    def on_build_error(self, error):
+        """Stop worker pools so a failed build does not leave processes behind."""
+        for future in self.pending:
+            future.cancel()
+        for _, _, conversion in self.conversions.values():
+            if isinstance(conversion, Future):
+                conversion.cancel()
+        if self.conversion_pool:
+            self.conversion_pool.shutdown(wait=False)
+            self.conversion_pool = None
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def _setup_dry_run(self, config):
+        """Prepare an offline dry run: no client, but the manifest and conversion pool."""
+        logger.info("Dry run: converting all pages without contacting Confluence")
+        manifest_path = self._config_path(config, self.config['manifest_path'])
+        self.manifest = PublishManifest(manifest_path, self.config['space_key'], self.config['parent_page_id'])
+        self.manifest.load()
+        if not self.manifest.pages:
+            logger.info("No usable publish manifest found, the change plan treats every page as new")
+        
+        self.dry_run_pages = {}
+
+    def _start_conversion_pool(self):
+        """Start the conversion process pool, once the link index it needs exists."""
+        workers = self.config['conversion_workers']
+        if workers == 1 or self.live_reload:
+            # Rebuilds under mkdocs serve only convert the pages that changed
+            return
+        # Zero lets the pool size itself to the number of CPUs. Workers are spawned rather
+        # than forked because the build process may already run threads (mkdocs serve).
+        self.conversion_pool = ProcessPoolExecutor(
+            max_workers=workers or None,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_conversion_worker,
+            initargs=(self.link_index,)
+        )
+        logger.info(f"Converting pages on {workers or os.cpu_count()} worker processes")
+
+    @staticmethod
+    def _nav_signature(items) -> tuple:
+        """Titles, source files and nesting of the nav, to detect structural changes."""
+        return tuple(
+            (
+                item.title,
+                item.file.src_path if isinstance(item, Page) else None,
+                ConfluencePublisherPlugin._nav_signature(item.children) if isinstance(item, Section) else (),
+            )
+            for item in items
+        )
+
+    def _flush_live_reload(self):
+        """Run the publish tasks queued by the rebuilds of the last quiet period."""
+        with self._flush_lock:
+            tasks = self.live_reload.take()
+            if not tasks:
+                return
+            
+            logger.info(f"Publishing {len({src_path for src_path, _, _ in tasks})} changed page(s) to Confluence")
+            self.publish_failures = []
+            if self.config['publish_workers'] > 1:
+                with ThreadPoolExecutor(
+                    max_workers=self.config['publish_workers'],
+                    thread_name_prefix='confluence-publish'
+                ) as executor:
+                    for src_path, func, args in tasks:
+                        executor.submit(self._run_publish_task, src_path, func, *args)
+            else:
+                for src_path, func, args in tasks:
+                    self._run_publish_task(src_path, func, *args)
+            
+            # Failed pages are retried on the next rebuild even if their source is unchanged
+            for src_path, _ in self.publish_failures:
+                self.live_reload.forget(src_path)
+            self._report_publish_results(self._live_reload_config)
+
+    def _prefetch_diagrams(self, nav):
+        """Render the diagrams of every page in the nav up front, so cache misses render concurrently."""
+        if not self.diagram_renderer:
+            return
+        diagrams = []
+        for page in nav.pages:
+            try:
+                with open(page.file.abs_src_path, 'r', encoding='utf-8-sig') as f:
+                    diagrams.extend(find_diagrams(f.read()))
+            except OSError as e:
+                logger.debug(f"Could not read {page.file.src_path} for diagrams: {e}")
+        if diagrams:
+            with self.profiler.phase('render_diagrams'):
+                self.diagram_renderer.render(diagrams)
+
+    def _page_diagrams(self, page: Page, source: str) -> Dict[str, str]:
+        """Rendered diagram files of a page by diagram key, remembered for collecting its conversion."""
+        if not self.diagram_renderer:
+            return {}
+        markdown_content = (page.markdown or '') if self.config['use_rendered_html'] else source
+        with self.profiler.phase('render_diagrams'):
+            diagrams = self.diagram_renderer.render(find_diagrams(markdown_content))
+        self.page_diagrams[page.file.src_path] = diagrams
+        return diagrams
+
+    @staticmethod
+    def _diagram_names(diagrams: Dict[str, str]) -> Dict[str, str]:
+        """Attachment names the converter links rendered diagrams to."""
+        return {key: os.path.basename(path) for key, path in diagrams.items()}
+
+    @staticmethod
+    def _used_diagrams(content: str, diagrams: Dict[str, str]) -> List[str]:
+        """Rendered diagram files the converted page actually shows."""
+        return [
+            path for path in dict.fromkeys(diagrams.values())
+            if f'ri:filename="{escape(os.path.basename(path))}"' in content
+        ]
+
+    @staticmethod
+    def _build_link_index(nav, titles: Dict[str, str]) -> LinkIndex:
+        """Index every nav page that has a Confluence page for internal-link rewriting."""
+        link_index = LinkIndex(
+            (page.file.src_path, page.file.url, titles[page.file.src_path])
+            for page in nav.pages
+            if page.file.src_path in titles
+        )
+        logger.debug(f"Indexed {len(link_index)} link targets")
+        return link_index
+
+    def _link_base(self, page: Page) -> str:
+        """Directory relative links in the page are written against."""
+        # get(): the converter benchmark calls the conversion methods on an unconfigured plugin
+        if self.config.get('use_rendered_html'):
+            return page_url_dir(page.url)
+        return posixpath.dirname(page.file.src_path.replace(os.sep, '/'))
+
+    def _plan_pages(self, items, prefix: str, parent_id: Optional[int],
+                    section_ids: Dict[Section, int]) -> Dict[str, dict]:
+        """Map nav pages to the title and parent they would be published with.
+
+        Sections are planned along the way, in nav order. Pages below a section page
+        that would be created have no known parent ID yet.
+        """
+        planned = {}
+        for item in items:
+            if isinstance(item, Page):
+                planned[item.file.src_path] = {'title': f"{prefix}{item.title}", 'parent_id': parent_id}
+            elif isinstance(item, Section):
+                title = f"{prefix}{item.title}"
+                section_id = section_ids.get(item)
+                if section_id is None:
+                    action = 'create'
+                elif self.manifest.sections[section_id]['title'] != title:
+                    action = 'rename'
+                else:
+                    action = 'unchanged'
+                self.dry_run_sections.append({'title': title, 'action': action, 'id': section_id})
+                planned.update(self._plan_pages(item.children, prefix, section_id, section_ids))
+        return planned
+
+    def _plan_sections(self, items, prefix: str) -> Dict[Section, int]:
+        """Bind nav sections to the section pages recorded in the manifest, offline.
+
+        Like a publish, a section is found by its title first; a renamed one is bound
+        to the recorded section page most of its pages and subsections are below now.
+        """
+        by_title = {entry['title']: page_id for page_id, entry in self.manifest.sections.items()}
+        sections = []
+
+        def walk(items):
+            for item in items:
+                if isinstance(item, Section):
+                    walk(item.children)
+                    sections.append(item)
+
+        walk(items)
+        # Subsections come first, so their pages can vote for the section they are in
+        section_ids = {
+            section: by_title[f"{prefix}{section.title}"]
+            for section in sections if f"{prefix}{section.title}" in by_title
+        }
+        taken = set(section_ids.values())
+        for section in sections:
+            if section in section_ids:
+                continue
+            votes = Counter()
+            for child in section.children:
+                if isinstance(child, Page):
+                    entry = self.manifest.pages.get(child.file.src_path, {})
+                else:
+                    entry = self.manifest.sections.get(section_ids.get(child), {})
+                child_parent_id = entry.get('parent_id')
+                if child_parent_id in self.manifest.sections and child_parent_id not in taken:
+                    votes[child_parent_id] += 1
+            if votes:
+                section_id = votes.most_common(1)[0][0]
+                section_ids[section] = section_id
+                taken.add(section_id)
+        return section_ids
+
+    def _convert_dry_run(self, source: str, page: Page, files: Files):
+        """Convert a page for the dry run, on the conversion pool when there is one."""
+        src_path = page.file.src_path
+        rendered = self.config['use_rendered_html']
+        if self.conversion_pool:
+            diagrams = self._page_diagrams(page, source)
+            conversion = self.conversion_pool.submit(
+                timed_convert_page_source, source, page.file.abs_src_path, rendered, self._link_base(page),
+                self._diagram_names(diagrams)
+            )
+        else:
+            start = time.process_time()
+            try:
+                if rendered:
+                    content, attachments = self._convert_rendered_html(source, page, files)
+                else:
+                    content, attachments = self._convert_markdown_to_confluence(source, page)
+                conversion = (content, attachments, time.process_time() - start)
+            except Exception as e:
+                conversion = e
+        self.conversions[src_path] = (page, files, conversion)
+
+    def _conversion_result(self, page: Page, files: Files, conversion) -> Tuple[str, List[str], float]:
+        """Wait for a page conversion, resolving rendered image URLs to source files."""
+        if isinstance(conversion, Exception):
+            raise conversion
+        if not isinstance(conversion, Future):
+            return conversion
+        content, images, seconds = conversion.result()
+        if self.config['use_rendered_html']:
+            images = self._resolve_rendered_images(images, page, files)
+        images += self._used_diagrams(content, self.page_diagrams.get(page.file.src_path, {}))
+        return content, images, seconds
+
+    def _plan_action(self, src_path: str, planned: dict, content: str) -> str:
+        """Decide from the manifest what publishing this page would do.
+
+        Only incremental publishes skip pages by their hash; otherwise every existing
+        page is updated.
+        """
+        entry = self.manifest.pages.get(src_path)
+        if not entry:
+            return 'create'
+        if entry.get('title') != planned['title']:
+            return 'rename'
+        if not self.config['incremental'] or planned['parent_id'] is None:
+            # No parent ID: the page moves below a section page that is yet to be created
+            return 'update'
+        confluence_page = ConfluencePage(id=entry['id'], title=planned['title'], parent_id=planned['parent_id'])
+        digest = content_hash(planned['title'], planned['parent_id'], content)
+        return 'unchanged' if self.manifest.is_unchanged(src_path, confluence_page, digest) else 'update'
+
+    def _finish_dry_run(self, config):
+        """Collect the dry-run conversions, write them out and log the change plan."""
+        output_dir = self._config_path(config, self.config['dry_run_output']) if self.config['dry_run_output'] else None
+        docs_dir = config['docs_dir']
+        pages = {}
+        counts: Dict[str, int] = {}
+        
+        for src_path, (page, files, conversion) in self.conversions.items():
+            planned = self.dry_run_pages.get(src_path)
+            if planned is None:
+                logger.debug(f"Page not in nav, would not be published: {src_path}")
+                continue
+            
+            try:
+                content, attachments, seconds = self._conversion_result(page, files, conversion)
+            except Exception as e:
+                logger.error(f"Failed to convert {src_path}: {e}")
+                pages[src_path] = {'title': planned['title'], 'action': 'failed', 'error': str(e)}
+                counts['failed'] = counts.get('failed', 0) + 1
+                continue
+            
+            content, attachments = self._optimize_attachments(content, attachments)
+            if self.assets_title:
+                content, _ = link_shared_attachments(content, attachments, self.assets_title)
+            action = self._plan_action(src_path, planned, content)
+            counts[action] = counts.get(action, 0) + 1
+            pages[src_path] = {
+                'title': planned['title'],
+                'action': action,
+                'storage_bytes': len(content.encode('utf-8')),
+                'convert_seconds': round(seconds, 6),
+                'attachments': [os.path.relpath(path, docs_dir) for path in dict.fromkeys(attachments)],
+            }
+            
+            if output_dir:
+                xhtml_path = os.path.join(output_dir, os.path.splitext(src_path)[0] + '.xhtml')
+                os.makedirs(os.path.dirname(xhtml_path), exist_ok=True)
+                with open(xhtml_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+        
+        if self.conversion_pool:
+            self.conversion_pool.shutdown()
+            self.conversion_pool = None
+        
+        for section in self.dry_run_sections:
+            counts[section['action']] = counts.get(section['action'], 0) + 1
+        
+        orphaned = [
+            {'src_path': src_path, 'id': entry.get('id'), 'title': entry.get('title')}
+            for src_path, entry in sorted(self.manifest.pages.items())
+            if src_path not in self.dry_run_pages
+        ]
+        summary = {
+            'pages': len(pages),
+            'sections': len(self.dry_run_sections),
+            'create': counts.get('create', 0),
+            'update': counts.get('update', 0),
+            'rename': counts.get('rename', 0),
+            'unchanged': counts.get('unchanged', 0),
+            'failed': counts.get('failed', 0),
+            'orphaned': len(orphaned),
+            'storage_bytes': sum(p.get('storage_bytes', 0) for p in pages.values()),
+            'attachments': len({a for p in pages.values() for a in p.get('attachments', [])}),
+            'convert_seconds': round(sum(p.get('convert_seconds', 0.0) for p in pages.values()), 3),
+        }
+        
+        logger.info(
+            f"Dry run plan: {summary['create']} to create, {summary['update']} to update, "
+            f"{summary['rename']} to rename, "
+            f"{summary['unchanged']} unchanged, {summary['orphaned']} orphaned, {summary['failed']} failed"
+        )
+        logger.info(
+            f"Dry run converted {summary['pages']} pages to {summary['storage_bytes'] / 1024:.0f} KiB "
+            f"of storage format in {summary['convert_seconds']:.2f}s CPU, "
+            f"referencing {summary['attachments']} attachments"
+        )
+        self._report_images()
+        
+        if output_dir:
+            plan = {
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'space_key': self.config['space_key'],
+                'parent_page_id': self.config['parent_page_id'],
+                'summary': summary,
+                'pages': pages,
+                'sections': self.dry_run_sections,
+                'orphaned': orphaned,
+            }
+            os.makedirs(output_dir, exist_ok=True)
+            plan_path = os.path.join(output_dir, 'plan.json')
+            with open(plan_path, 'w', encoding='utf-8') as f:
+                json.dump(plan, f, indent=2)
+            logger.info(f"Wrote dry run output and change plan to {output_dir}")
+
+    def _publish_converted_pages(self):
+        """Queue the update and attachments of each page converted on the pool, as conversions finish."""
+        futures = {
+            conversion: (src_path, page, files)
+            for src_path, (page, files, conversion) in self.conversions.items()
+            if isinstance(conversion, Future)
+        }
+        logger.info(f"Collecting {len(futures)} page conversions")
+        
+        with self.profiler.phase('collect_conversions'):
+            for future in as_completed(futures):
+                src_path, page, files = futures[future]
+                confluence_page = self.md_to_page[src_path]
+                try:
+                    content, attachments, _ = self._conversion_result(page, files, future)
+                except Exception as e:
+                    logger.error(f"Failed to convert page content for {confluence_page.title}: {e}")
+                    with self._failures_lock:
+                        self.publish_failures.append((src_path, str(e)))
+                    continue
+                
+                content, attachments = self._prepare_attachments(content, attachments)
+                self._submit(src_path, self._publish_page, src_path, confluence_page, content)
+                if self.config['upload_attachments'] and attachments:
+                    self._submit(src_path, self._upload_attachments, confluence_page.id, attachments)
+        
+        self.conversions = {}
+        self.conversion_pool.shutdown()
+        self.conversion_pool = None
+
+    def _prune_removed_pages(self):
+        """Delete, in one pass, the pages published from files that are no longer in the nav."""
+        if not self.nav_src_paths:
+            return
+        in_use = {confluence_page.id for confluence_page in self.md_to_page.values()}
+        removed = {}
+        for src_path, entry in list(self.manifest.pages.items()):
+            if src_path in self.nav_src_paths:
+                continue
+            if entry.get('id') in in_use:
+                # The page now belongs to another file, e.g. after the file was renamed
+                self.manifest.remove(src_path)
+            else:
+                removed[src_path] = entry
+        if not removed:
+            return
+        
+        if not self.config['prune_removed_pages']:
+            logger.info(
+                f"{len(removed)} page(s) published from files no longer in the nav remain in Confluence, "
+                "set prune_removed_pages to delete them"
+            )
+            return
+        
+        logger.info(f"Deleting {len(removed)} page(s) no longer in the nav")
+        for src_path, entry in sorted(removed.items()):
+            self._submit(src_path, self._delete_page, src_path, entry)
+
+    def _delete_page(self, src_path: str, entry: dict):
+        """Delete a page that is no longer in the nav and forget it in the manifest."""
+        try:
+            self.confluence.delete_page(entry['id'])
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+        self.manifest.remove(src_path)
+        logger.info(f"Deleted Confluence page: {entry.get('title')} (ID: {entry['id']})")
+
+    def _submit(self, src_path: str, func, *args):
+        """Run a publish task on the worker pool, or inline when publishing serially."""
+        if self.live_reload:
+            self.live_reload.queue(src_path, func, args)
+        elif self.executor:
+            self.pending.append(self.executor.submit(self._run_publish_task, src_path, func, *args))
+        else:
+            self._run_publish_task(src_path, func, *args)
+
+    def _run_publish_task(self, src_path: str, func, *args):
+        """Run a publish task, recording its failure instead of raising."""
+        try:
+            func(*args)
+        except Exception as e:
+            logger.error(f"Failed to publish {src_path}: {e}")
+            with self._failures_lock:
+                self.publish_failures.append((src_path, str(e)))
+
+    def _build_page_index(self, parent_page_id: int) -> Dict[str, dict]:
+        """Index every existing page below the parent page by title."""
+        page_index = {}
+        
+        for result in self.confluence.get_descendant_pages(parent_page_id):
+            ancestors = result.get('ancestors') or []
+            page_index[result['title']] = {
+                'id': int(result['id']),
+                'title': result['title'],
+                'version': result.get('version', {}).get('number'),
+                'parent_id': int(ancestors[-1]['id']) if ancestors else None,
+            }
+        
+        logger.info(f"Indexed {len(page_index)} existing pages under parent {parent_page_id}")
+        return page_index
+
+    def _find_existing_page(self, title: str) -> Optional[dict]:
+        """Find an existing page below the parent page in the prefetched page index."""
+        if self.page_index is None:
+            return None
+        return self.page_index.get(title)
+
+    def _create_or_find_page(self, space_key: str, title: str, body: str, parent_id: int) -> Optional[dict]:
+        """Create a page, or find the page that already has its title.
+
+        Titles missing from the page index are created straight away. Only a create
+        that fails because the title is taken elsewhere in the space costs a lookup
+        by title, and only pages below the parent page are returned: updates send
+        the page's ancestors, so any other page would be moved into the published tree.
+        """
+        try:
+            new_page = self.confluence.create_page(space_key=space_key, title=title, body=body, parent_id=parent_id)
+        except requests.exceptions.HTTPError as e:
+            response = e.response
+            if response is None or response.status_code != 400 or 'already exists' not in response.text:
+                raise
+            logger.debug(f"Title {title} already exists outside the page index, looking it up")
+            existing_page = self.confluence.get_page_by_title(space_key, title, expand='version,ancestors')
+            if not existing_page:
+                raise
+            ancestors = [int(ancestor['id']) for ancestor in existing_page.get('ancestors') or []]
+            if self.config['parent_page_id'] not in ancestors:
+                logger.error(
+                    f"Page {title} (ID: {existing_page['id']}) exists outside parent page "
+                    f"{self.config['parent_page_id']}, not moving it; rename the page or its nav entry"
+                )
+                return None
+            return {
+                'id': int(existing_page['id']),
+                'title': existing_page['title'],
+                'version': existing_page.get('version', {}).get('number'),
+                'parent_id': ancestors[-1],
+            }
+        
+        page = {
+            'id': int(new_page['id']),
+            'title': title,
+            'version': new_page.get('version', {}).get('number'),
+            'parent_id': parent_id,
+        }
+        logger.info(f"Created page: {title} (ID: {page['id']})")
+        if self.page_index is not None:
+            self.page_index[title] = page
+        return page
+
+    def _claimed_by(self, page: dict, src_path: Optional[str] = None) -> Optional[str]:
+        """Name what a page found by title already belongs to, unless that is ``src_path``."""
+        owner = self.page_owners.get(page['id'])
+        if owner is not None and owner != src_path:
+            return owner
+        if page['id'] in self.claimed_page_ids:
+            return 'another nav entry'
+        return None
+
+    def _find_bound_page(self, src_path: str, title: str, parent_id: int) -> Optional[dict]:
+        """Find the page last published from ``src_path``, whatever its title and parent are now.
+
+        The page is renamed or moved by its next content update. If another page
+        already has the new title, that page is used instead, as before bindings,
+        unless it is bound to another file in the nav.
+        """
+        entry = self.manifest.pages.get(src_path) if self.manifest else None
+        if not entry:
+            return None
+        
+        page = self.pages_by_id.get(entry['id'])
+        if page is None:
+            # Not below the parent page any more, or deleted
+            try:
+                result = self.confluence.get_page(entry['id'], expand='version,ancestors')
+            except requests.exceptions.HTTPError as e:
+                if e.response is not None and e.response.status_code == 404:
+                    logger.info(f"Page {entry['id']} last published from {src_path} no longer exists")
+                    return None
+                raise
+            ancestors = result.get('ancestors') or []
+            page = {
+                'id': int(result['id']),
+                'title': result['title'],
+                'version': result.get('version', {}).get('number'),
+                'parent_id': int(ancestors[-1]['id']) if ancestors else None,
+            }
+        
+        if page['title'] != title:
+            existing_page = self._find_existing_page(title)
+            if existing_page and existing_page['id'] != page['id'] and not self._claimed_by(existing_page, src_path):
+                return existing_page
+            logger.info(f"Renaming page: {page['title']} -> {title} (ID: {page['id']})")
+        elif page['parent_id'] != parent_id:
+            logger.info(f"Moving page: {title} (ID: {page['id']}) below page {parent_id}")
+        return page
+
+    def _bind_sections(self, items, prefix: str):
+        """Bind renamed nav sections to the section pages their children were published below.
+
+        Section pages have no source file, so a section is bound through its children:
+        to the page most of its pages and subsection pages are below now. Sections whose
+        title still exists are found by title instead, and pages named after another nav
+        entry or bound to a file are never taken.
+        """
+        titles = set()
+
+        def walk(items):
+            for item in items:
+                titles.add(f"{prefix}{item.title}")
+                if isinstance(item, Section):
+                    walk(item.children)
+
+        walk(items)
+        taken = set(self.page_owners)
+        taken.update(self.page_index[title]['id'] for title in titles if title in self.page_index)
+        self._claim_section_pages(items, prefix, taken)
+
+    def _claim_section_pages(self, items, prefix: str, taken: Set[int]):
+        """Bind the renamed sections among ``items``, after their subsections, strongest claim first."""
+        claims = []
+        for position, item in enumerate(items):
+            if not isinstance(item, Section):
+                continue
+            self._claim_section_pages(item.children, prefix, taken)
+            if f"{prefix}{item.title}" in self.page_index:
+                continue
+            votes = Counter()
+            for child in item.children:
+                child_page = self.pages_by_id.get(self._known_page_id(child, prefix))
+                if child_page and child_page['parent_id'] in self.pages_by_id:
+                    votes[child_page['parent_id']] += 1
+            claims.extend((-count, position, page_id, item) for page_id, count in votes.items())
+        
+        for _, _, page_id, section in sorted(claims, key=lambda claim: claim[:3]):
+            if page_id not in taken and section not in self.section_pages:
+                self.section_pages[section] = page_id
+                taken.add(page_id)
+
+    def _known_page_id(self, item, prefix: str) -> Optional[int]:
+        """ID of a nav item's page as far as bindings and titles tell before the nav is resolved."""
+        if isinstance(item, Page):
+            entry = self.manifest.pages.get(item.file.src_path)
+            if entry:
+                return entry['id']
+        elif item in self.section_pages:
+            return self.section_pages[item]
+        page = self.page_index.get(f"{prefix}{item.title}")
+        return page['id'] if page else None
+
+    def _find_bound_section(self, section: Section, title: str, parent_id: int) -> Optional[dict]:
+        """Find the page of a renamed section.
+
+        Section pages get no content updates, so ``on_nav`` renames (and moves) them
+        once the nav is resolved.
+        """
+        page = self.pages_by_id.get(self.section_pages.get(section))
+        if page is None:
+            return None
+        logger.info(f"Renaming section page: {page['title']} -> {title} (ID: {page['id']})")
+        return page
+
+    def _release_renamed_titles(self):
+        """Move renamed pages out of the way of renames that need their current titles.
+
+        Titles are unique per space, so when bound pages swap titles (or rename in a
+        chain or cycle) the final titles can only be applied once their current holders
+        have let go of them. Those holders are renamed to a temporary title first;
+        their content updates then apply the final ones.
+        """
+        holders = {current: page_id for page_id, (current, _) in self.renames.items()}
+        mapped = list(self.md_to_page.values()) + list(self.section_renames.values())
+        for page_id, (_, title) in self.renames.items():
+            holder = holders.pop(title, None)
+            if holder is None:
+                continue
+            current = self.renames[holder][0]
+            temporary = f"{current} (renaming {uuid.uuid4().hex[:8]})"
+            try:
+                page = self.confluence.get_page(holder, expand='body.storage,version')
+                result = self.confluence.update_page(
+                    holder, temporary, page['body']['storage']['value'], page['version']['number']
+                )
+            except Exception as e:
+                logger.error(f"Failed to release title {current} (ID: {holder}) for page {page_id}: {e}")
+                continue
+            logger.debug(f"Renamed page {holder} to {temporary} to free its title")
+            for confluence_page in mapped:
+                if confluence_page.id == holder:
+                    confluence_page.version = result['version']['number']
+
     def _create_pages(self, items, prefix: str, space_key: str, parent_id: int) -> Dict[str, ConfluencePage]:
         """Recursively create pages in Confluence based on navigation structure."""
         md_to_page = {}
@@ -274,17 +3038,23 @@ class ConfluencePublisherPlugin(BasePlugin):
             page_title = f"{prefix}{item.title}"
             logger.debug(f"Processing item: {page_title}")
             
-            # Check if page already exists
-            existing_page = self.confluence.get_page_by_title(space_key, page_title)
+            # Check if page already exists, following the page this file or section was last published to
+            existing_page = None
+            src_path = item.file.src_path if isinstance(item, Page) else None
+            if src_path:
+                existing_page = self._find_bound_page(src_path, page_title, parent_id)
+            elif isinstance(item, Section):
+                existing_page = self._find_bound_section(item, page_title, parent_id)
+            if existing_page is None:
+                existing_page = self._find_existing_page(page_title)
             
             if existing_page:
-                page_id = int(existing_page['id'])
-                logger.debug(f"Page already exists: {page_title} (ID: {page_id})")
+                logger.debug(f"Page already exists: {page_title} (ID: {existing_page['id']})")
             else:
                 # Create new page
                 if isinstance(item, Section):
                     # Section page with children macro
-                    body = '<ac:structured-macro ac:name="children" />'
+                    body = SECTION_PAGE_BODY
                     logger.info(f"Creating section page: {page_title}")
                 else:
                     # Regular page
@@ -292,23 +3062,42 @@ class ConfluencePublisherPlugin(BasePlugin):
                     logger.info(f"Creating page: {page_title}")
                 
                 try:
-                    new_page = self.confluence.create_page(
-                        space_key=space_key,
-                        title=page_title,
-                        body=body,
-                        parent_id=parent_id
-                    )
-                    page_id = int(new_page['id'])
-                    logger.info(f"Created page: {page_title} (ID: {page_id})")
+                    existing_page = self._create_or_find_page(space_key, page_title, body, parent_id)
                 except Exception as e:
                     logger.error(f"Failed to create page {page_title}: {e}")
                     continue
+                if existing_page is None:
+                    continue
+            
+            owner = self._claimed_by(existing_page, src_path)
+            if owner:
+                # e.g. a new file took the old title of a renamed one, whose page keeps it until updated
+                logger.error(
+                    f"Page {page_title} (ID: {existing_page['id']}) belongs to {owner}, not reusing it; "
+                    "publish again once that page has been renamed"
+                )
+                continue
+            page_id = existing_page['id']
+            page_version = existing_page['version']
+            self.claimed_page_ids.add(page_id)
+            if existing_page['title'] != page_title:
+                self.renames[page_id] = (existing_page['title'], page_title)
+                if isinstance(item, Section):
+                    self.section_renames[page_id] = ConfluencePage(page_id, page_title, parent_id, page_version)
             
             # Map Page objects to Confluence pages
             if isinstance(item, Page):
-                md_to_page[item.file.src_path] = ConfluencePage(id=page_id, title=page_title)
+                md_to_page[item.file.src_path] = ConfluencePage(
+                    id=page_id,
+                    title=page_title,
+                    parent_id=parent_id,
+                    version=page_version
+                )
                 logger.debug(f"Mapped {item.file.src_path} to page ID {page_id}")
             
+            if isinstance(item, Section):
+                self.section_entries[page_id] = {'title': page_title, 'parent_id': parent_id}
+            
             # Recursively process children for sections
             if isinstance(item, Section) and item.children:
                 child_mappings = self._create_pages(
@@ -318,250 +3107,289 @@ class ConfluencePublisherPlugin(BasePlugin):
         
         return md_to_page
 
-    def _update_page_content(self, markdown: str, page: Page) -> List[str]:
-        """Convert markdown to Confluence format and update page."""
+    def _create_image_optimizer(self, config) -> Optional[ImageOptimizer]:
+        """Set up image processing if enabled and its libraries are installed."""
+        optimize = self.config['optimize_images'] and self.config['upload_attachments']
+        rasterize_svg = self.config['rasterize_svg'] and self.config['upload_attachments']
+        if optimize and Image is None:
+            logger.warning("optimize_images needs Pillow (pip install pillow), attaching images unchanged")
+        if rasterize_svg and cairosvg is None:
+            logger.warning("rasterize_svg needs cairosvg and the cairo library, attaching SVGs unchanged")
+        if not (optimize and Image is not None or rasterize_svg and cairosvg is not None):
+            return None
+        return ImageOptimizer(
+            self._config_path(config, self.config['image_cache_dir']),
+            max_width=self.config['image_max_width'],
+            quality=self.config['image_quality'],
+            optimize=optimize,
+            rasterize_svg=rasterize_svg
+        )
+
+    def _optimize_attachments(self, content: str, attachments: List[str]) -> Tuple[str, List[str]]:
+        """Swap a page's images for their processed versions, renaming references that changed."""
+        if not self.image_optimizer:
+            return content, attachments
+        
+        optimized = []
+        renames = {}
+        with self.profiler.phase('optimize_images'):
+            for path in attachments:
+                output = self.image_optimizer.process(path)
+                optimized.append(output)
+                if os.path.basename(output) != os.path.basename(path):
+                    renames[os.path.basename(path)] = os.path.basename(output)
+        if renames:
+            content = rename_attachment_references(content, renames)
+        return content, optimized
+
+    def _prepare_attachments(self, content: str, attachments: List[str]) -> Tuple[str, List[str]]:
+        """Process a page's images and link shared ones, returning the body and the files to attach to the page."""
+        content, attachments = self._optimize_attachments(content, attachments)
+        if self.assets_title:
+            return self._share_attachments(content, attachments), []
+        return content, attachments
+
+    def _resolve_assets_page(self, prefix: str, space_key: str, parent_page_id: int):
+        """Find or create the page holding shared attachments and list what it already has."""
+        title = f"{prefix}{self.config['shared_attachments_page']}"
+        try:
+            existing_page = self._find_existing_page(title) or self._create_or_find_page(
+                space_key, title, '<ac:structured-macro ac:name="attachments" />', parent_page_id
+            )
+            if existing_page is None:
+                logger.error(f"Not sharing attachments through {title}, attaching files to each page")
+                return
+            page_id = existing_page['id']
+            # Attachments are named by content hash, so an existing name is an identical file
+            self.shared_attachments = {att['title'] for att in self.confluence.get_attachments(page_id)}
+        except Exception as e:
+            logger.error(f"Failed to set up shared attachments page {title}, attaching files to each page: {e}")
+            return
+        
+        self.assets_page = ConfluencePage(id=page_id, title=title, parent_id=parent_page_id)
+        self.assets_title = title
+        logger.info(f"Sharing attachments through {title}, which has {len(self.shared_attachments)} already")
+
+    def _share_attachments(self, content: str, attachments: List[str]) -> str:
+        """Link a page's images to the shared attachments page, queueing uploads of files it lacks."""
+        content, shared = link_shared_attachments(content, attachments, self.assets_title)
+        for name, path in shared.items():
+            if name in self.shared_attachments:
+                continue
+            self.shared_attachments.add(name)
+            self._submit(name, self._upload_shared_attachment, name, path)
+        return content
+
+    def _upload_shared_attachment(self, name: str, path: str):
+        """Upload a file to the shared attachments page under its content-addressed name."""
+        try:
+            self.confluence.upload_attachment(
+                page_id=self.assets_page.id,
+                file_path=path,
+                comment=f'{ATTACHMENT_COMMENT} from {os.path.basename(path)} (sha256:{file_hash(path)})',
+                filename=name
+            )
+        except Exception:
+            self.shared_attachments.discard(name)
+            raise
+        logger.info(f"Uploaded shared attachment: {os.path.basename(path)} as {name}")
+
+    def _update_page_content(self, source: str, page: Page, files: Files) -> List[str]:
+        """Convert page Markdown (or rendered HTML) to Confluence format and queue the page update."""
         confluence_page = self.md_to_page.get(page.file.src_path)
         if not confluence_page:
             logger.warning(f"No Confluence page mapping found for {page.file.src_path}")
             return []
         
+        if self.live_reload and self.live_reload.is_unchanged(page.file.src_path, source):
+            logger.debug(f"Page unchanged since the last rebuild, skipping: {page.file.src_path}")
+            return []
+        
+        if self.conversion_pool:
+            # Converted in the background while MkDocs carries on; published from on_post_build
+            diagrams = self._page_diagrams(page, source)
+            conversion = self.conversion_pool.submit(
+                timed_convert_page_source, source, page.file.abs_src_path,
+                self.config['use_rendered_html'], self._link_base(page), self._diagram_names(diagrams)
+            )
+            self.conversions[page.file.src_path] = (page, files, conversion)
+            return []
+        
         try:
-            # Convert markdown to Confluence storage format
-            confluence_content, attachments = self._convert_markdown_to_confluence(markdown, page)
+            # Convert to Confluence storage format
+            if self.config['use_rendered_html']:
+                confluence_content, attachments = self._convert_rendered_html(source, page, files)
+            else:
+                confluence_content, attachments = self._convert_markdown_to_confluence(source, page)
             
             # Validate content before sending
             if not confluence_content or confluence_content.strip() == '':
                 logger.warning(f"Empty content generated for {page.file.src_path}, skipping update")
                 return attachments
             
-            # Get current page info for version
-            current_page = self.confluence.get_page_by_title(
-                self.config['space_key'], 
-                confluence_page.title
-            )
-            
-            if current_page:
-                current_version = current_page['version']['number']
-                
-                # Update page content
-                self.confluence.update_page(
-                    page_id=confluence_page.id,
-                    title=confluence_page.title,
-                    body=confluence_content,
-                    version=current_version
-                )
-                logger.info(f"Updated Confluence page: {confluence_page.title}")
-            else:
-                logger.error(f"Could not find current page info for {confluence_page.title}")
-            
+            if self.live_reload:
+                self.live_reload.remember(page.file.src_path, source, attachments)
+            confluence_content, attachments = self._prepare_attachments(confluence_content, attachments)
+            self._submit(page.file.src_path, self._publish_page, page.file.src_path, confluence_page, confluence_content)
             return attachments
             
         except Exception as e:
-            logger.error(f"Failed to update page content for {confluence_page.title}: {e}")
+            logger.error(f"Failed to convert page content for {confluence_page.title}: {e}")
             # Log the content that caused the error for debugging
-            logger.debug(f"Problematic content length: {len(markdown)} characters")
+            logger.debug(f"Problematic content length: {len(source)} characters")
             return []
 
-    def _sanitize_content(self, content: str) -> str:
-        """Sanitize content to prevent API errors."""
-        # Remove or replace potentially problematic characters/tags
-        
-        # Remove malformed HTML comments
-        content = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
-        
-        # Clean up malformed or nested image tags that might be generated by drawio-exporter
-        content = re.sub(r'<img[^>]*src=""[^>]*>', '', content)  # Remove empty src images
-        content = re.sub(r'<img[^>]*>\s*</img>', '', content)    # Remove self-closed image tags
-        
-        # Remove any draw.io specific elements that might cause issues
-        content = re.sub(r'<mxfile.*?</mxfile>', '', content, flags=re.DOTALL)
+    def _publish_page(self, src_path: str, confluence_page: ConfluencePage, body: str):
+        """Push converted content to Confluence unless it is unchanged since the last publish."""
+        digest = content_hash(confluence_page.title, confluence_page.parent_id, body)
+        if self.config['incremental'] and self.manifest and self.manifest.is_unchanged(src_path, confluence_page, digest):
+            logger.debug(f"Page unchanged since last publish, skipping: {confluence_page.title}")
+            return
         
-        # Clean up multiple consecutive newlines
-        content = re.sub(r'\n\s*\n\s*\n+', '\n\n', content)
+        self._put_page(confluence_page, body)
+        logger.info(f"Updated Confluence page: {confluence_page.title}")
+        if self.manifest:
+            self.manifest.record(src_path, confluence_page, digest)
+
+    def _put_page(self, confluence_page: ConfluencePage, body: str):
+        """Update a page using its known version, retrying once on a version conflict."""
+        if confluence_page.version is None:
+            confluence_page.version = self.confluence.get_page(confluence_page.id)['version']['number']
         
-        # Ensure content is not empty
-        if not content.strip():
-            content = '<p>Content could not be processed.</p>'
+        try:
+            result = self.confluence.update_page(
+                page_id=confluence_page.id,
+                title=confluence_page.title,
+                body=body,
+                version=confluence_page.version,
+                parent_id=confluence_page.parent_id
+            )
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 409:
+                raise
+            # Someone else edited the page since nav resolution; refetch its version and retry once
+            logger.debug(f"Version conflict on {confluence_page.title}, refetching version")
+            confluence_page.version = self.confluence.get_page(confluence_page.id)['version']['number']
+            result = self.confluence.update_page(
+                page_id=confluence_page.id,
+                title=confluence_page.title,
+                body=body,
+                version=confluence_page.version,
+                parent_id=confluence_page.parent_id
+            )
         
-        return content
+        confluence_page.version = result.get('version', {}).get('number', confluence_page.version + 1)
 
     def _convert_markdown_to_confluence(self, markdown_content: str, page: Page) -> Tuple[str, List[str]]:
         """Convert markdown to Confluence storage format and extract attachments."""
-        # Find image attachments
-        attachments = []
-        image_pattern = r'!\[.*?\]\((.*?)\)'
-        
-        for match in re.finditer(image_pattern, markdown_content):
-            image_path = match.group(1)
-            if not image_path.startswith('http'):
-                # Convert relative path to absolute
-                full_path = os.path.join(os.path.dirname(page.file.abs_src_path), image_path)
-                full_path = os.path.normpath(full_path)
-                if os.path.exists(full_path):
-                    attachments.append(full_path)
-                else:
-                    logger.warning(f"Referenced image not found: {full_path}")
-        
-        # Convert markdown to HTML
-        html = markdown.markdown(
-            markdown_content,
-            extensions=['codehilite', 'tables', 'toc', 'admonition']
-        )
-        
-        # Sanitize content before converting to Confluence format
-        html = self._sanitize_content(html)
-        
-        # Convert to Confluence format
-        confluence_content = self._convert_html_to_confluence(html)
-        
-        return confluence_content, attachments
-
-    def _convert_html_to_confluence(self, html: str) -> str:
-        """Convert HTML to Confluence storage format."""
-        
-        # Convert code blocks with codehilite class (from fenced_code extension)
-        def clean_code_content(content):
-            # Strip all HTML tags to get plain text
-            content = re.sub(r'<[^>]+>', '', content)
-            # Decode HTML entities
-            content = content.replace('&quot;', '"').replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
-            return content.strip()
-        
-        # Handle codehilite code blocks (with language detection)
-        def replace_codehilite_with_lang(match):
-            language = match.group(1)
-            code_content = clean_code_content(match.group(2))
-            return f'<ac:structured-macro ac:name="code"><ac:parameter ac:name="language">{language}</ac:parameter><ac:plain-text-body><![CDATA[{code_content}]]></ac:plain-text-body></ac:structured-macro>'
-        
-        def replace_codehilite_no_lang(match):
-            code_content = clean_code_content(match.group(1))
-            return f'<ac:structured-macro ac:name="code"><ac:plain-text-body><![CDATA[{code_content}]]></ac:plain-text-body></ac:structured-macro>'
-        
-        # Replace codehilite blocks with language
-        html = re.sub(
-            r'<div class="codehilite"><pre><span></span><code class="language-(\w+)">(.*?)</code></pre></div>',
-            replace_codehilite_with_lang,
-            html,
-            flags=re.DOTALL
-        )
-        
-        # Replace codehilite blocks without language
-        html = re.sub(
-            r'<div class="codehilite"><pre><span></span><code>(.*?)</code></pre></div>',
-            replace_codehilite_no_lang,
-            html,
-            flags=re.DOTALL
-        )
-        
-        # Convert simple code blocks with language
-        html = re.sub(
-            r'<pre><code class="language-(\w+)">(.*?)</code></pre>',
-            replace_codehilite_with_lang,
-            html,
-            flags=re.DOTALL
-        )
-        
-        # Convert generic code blocks
-        html = re.sub(
-            r'<pre><code>(.*?)</code></pre>',
-            replace_codehilite_no_lang,
-            html,
-            flags=re.DOTALL
-        )
-        
-        # Convert inline code
-        html = re.sub(r'<code>(.*?)</code>', r'<code>\1</code>', html)
-        
-        # Convert tables to Confluence format
-        html = re.sub(r'<table>', '<table class="wrapped">', html)
-        
-        # Convert admonitions to info/warning macros
-        html = re.sub(
-            r'<div class="admonition note">\s*<p class="admonition-title">Note</p>\s*<p>(.*?)</p>\s*</div>',
-            r'<ac:structured-macro ac:name="info"><ac:rich-text-body>\1</ac:rich-text-body></ac:structured-macro>',
-            html,
-            flags=re.DOTALL
-        )
+        attachments = self._find_markdown_images(markdown_content, page)
+        html = self._render_markdown(markdown_content)
+        diagrams = self._page_diagrams(page, markdown_content)
         
-        html = re.sub(
-            r'<div class="admonition warning">\s*<p class="admonition-title">Warning</p>\s*<p>(.*?)</p>\s*</div>',
-            r'<ac:structured-macro ac:name="warning"><ac:rich-text-body>\1</ac:rich-text-body></ac:structured-macro>',
-            html,
-            flags=re.DOTALL
-        )
+        # Convert to Confluence format, dropping markup Confluence rejects and linking pages along the way
+        confluence_content = self._convert_html_to_confluence(html, page, diagrams)
+        if not confluence_content:
+            confluence_content = EMPTY_CONTENT
         
-        # Handle images - convert to Confluence attachment format
-        html = re.sub(
-            r'<img src="([^"]+)" alt="([^"]*)"',
-            r'<ac:image><ri:attachment ri:filename="\1" /></ac:image>',
-            html
+        return confluence_content, attachments + self._used_diagrams(confluence_content, diagrams)
+
+    @profiled('image_scan')
+    def _find_markdown_images(self, markdown_content: str, page: Page) -> List[str]:
+        """Find local images referenced by the markdown that exist on disk."""
+        return find_markdown_images(markdown_content, page.file.abs_src_path)
+
+    @profiled('render')
+    def _render_markdown(self, markdown_content: str) -> str:
+        """Render markdown to HTML with the extensions the converter understands."""
+        return render_markdown(markdown_content)
+
+    def _convert_rendered_html(self, html: str, page: Page, files: Files) -> Tuple[str, List[str]]:
+        """Convert HTML rendered by MkDocs to Confluence storage format and extract attachments."""
+        diagrams = self._page_diagrams(page, html)
+        converter = ConfluenceStorageConverter(
+            self.link_index, self._link_base(page), self._diagram_names(diagrams), self.profiler
         )
+        with self.profiler.phase('convert'):
+            confluence_content = converter.convert(html)
+        if not confluence_content:
+            confluence_content = EMPTY_CONTENT
         
-        # Replace incompatible code language macros
-        html = self._fix_code_macros(html)
-        
-        return html
+        attachments = self._resolve_rendered_images(converter.images, page, files)
+        return confluence_content, attachments + self._used_diagrams(confluence_content, diagrams)
 
-    def _fix_internal_links(self, content: str) -> str:
-        """Fix internal markdown links to point to Confluence pages."""
-        def replace_link(match):
-            href = match.group(2)
-            if href.endswith('.md') and href in self.md_to_page:
-                confluence_page = self.md_to_page[href]
-                logger.debug(f"Fixed link to {href} -> {confluence_page.title}")
-                return f'<ac:link><ri:page ri:content-title="{confluence_page.title}" /></ac:link>'
-            return match.group(0)
-        
-        return re.sub(r'<a (.*?)href="(.*?)"(.*?)>(.*?)</a>', replace_link, content)
+    @profiled('image_scan')
+    def _resolve_rendered_images(self, images: List[str], page: Page, files: Files) -> List[str]:
+        """Map the image URLs found in a rendered page to the source files to attach."""
+        attachments = []
+        for src in images:
+            full_path = self._resolve_rendered_image(src, page, files)
+            if full_path:
+                attachments.append(full_path)
+            else:
+                logger.warning(f"Referenced image not found: {src} in {page.file.src_path}")
+        return attachments
 
-    def _fix_code_macros(self, content: str) -> str:
-        """Replace incompatible code language macros."""
-        # Map of incompatible languages to compatible ones
-        replacements = {
-            'json': 'yaml',
-            'dockerfile': 'bash',
-            'powershell': 'bash',
-        }
+    def _resolve_rendered_image(self, src: str, page: Page, files: Files) -> Optional[str]:
+        """Map an image URL in rendered HTML back to its source file.
+
+        MkDocs rewrites image links relative to the page URL, so they are resolved
+        against that URL and looked up among the site files.
+        """
+        if self._files_by_url is None:
+            self._files_by_url = {file.url: file for file in files}
         
-        for incompatible, compatible in replacements.items():
-            pattern = f'<ac:parameter ac:name="language">{incompatible}</ac:parameter>'
-            replacement = f'<ac:parameter ac:name="language">{compatible}</ac:parameter>'
-            content = content.replace(pattern, replacement)
+        path = src.split('#', 1)[0].split('?', 1)[0]
+        target = posixpath.normpath(posixpath.join(page_url_dir(page.url), path)).lstrip('/')
         
-        return content
+        file = self._files_by_url.get(target) or self._files_by_url.get(unquote(target))
+        return file.abs_src_path if file else None
+
+    @profiled('convert')
+    def _convert_html_to_confluence(self, html: str, page: Optional[Page] = None,
+                                    diagrams: Optional[Dict[str, str]] = None) -> str:
+        """Convert HTML to Confluence storage format, linking other pages relative to ``page``."""
+        if page is None:
+            return ConfluenceStorageConverter().convert(html)
+        return ConfluenceStorageConverter(
+            self.link_index, self._link_base(page), self._diagram_names(diagrams or {}), self.profiler
+        ).convert(html)
 
     def _upload_attachments(self, page_id: int, attachments: List[str]):
-        """Upload attachments to a Confluence page."""
+        """Upload new or changed attachments to a Confluence page."""
         if not attachments:
             return
         
         try:
-            # Get existing attachments
-            existing_attachments = self.confluence.get_attachments(page_id)
-            existing_names = {att['title'] for att in existing_attachments}
+            # Index existing attachments once so each file is a dictionary lookup
+            existing_attachments = {
+                att['title']: att for att in self.confluence.get_attachments(page_id)
+            }
         except Exception as e:
             logger.warning(f"Could not retrieve existing attachments: {e}")
-            existing_names = set()
+            existing_attachments = {}
         
-        for attachment_path in attachments:
+        for attachment_path in dict.fromkeys(attachments):
             filename = os.path.basename(attachment_path)
             
-            if filename in existing_names:
-                logger.debug(f"Attachment already exists, skipping: {filename}")
-                continue
-            
             # Check if file exists before trying to upload
             if not os.path.exists(attachment_path):
                 logger.warning(f"Attachment file not found: {attachment_path}")
                 continue
             
+            digest = file_hash(attachment_path)
+            existing = existing_attachments.get(filename)
+            if existing and attachment_hash(existing) == digest:
+                logger.debug(f"Attachment unchanged, skipping: {filename}")
+                continue
+            
             try:
                 self.confluence.upload_attachment(
                     page_id=page_id,
                     file_path=attachment_path,
-                    comment='Uploaded by MkDocs Confluence Publisher'
+                    comment=f'{ATTACHMENT_COMMENT} (sha256:{digest})',
+                    attachment_id=existing['id'] if existing else None
                 )
-                logger.info(f"Uploaded attachment: {filename}")
+                logger.info(f"{'Updated' if existing else 'Uploaded'} attachment: {filename}")
             except Exception as e:
                 # Log warning instead of error to not fail the entire build
                 logger.warning(f"Could not upload attachment {filename}: {e}")
@@ -0,0 +1,481 @@
+from mkdocs.config import config_options
+from mkdocs.plugins import BasePlugin, event_priority
+import contextlib
+import fnmatch
+from collections import Counter, defaultdict
+import gzip
+from html import unescape
+import logging
+import os
+import json
+import math
+import re
+import shutil
+import yaml
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger('mkdocs.plugins.enhanced_search')
+
+# Levels for the precompressed copies. Brotli above 5 gains little on search text but
+# takes minutes on large indexes; gzip 9 costs about the same as the default.
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 5
+WRITE_BUFFER_SIZE = 1 << 16
+
+GLOB_CHARACTERS = frozenset('*?[')
+
+# Shard manifests list, per shard, the distinct term prefixes of this length
+SHARD_PREFIX_LENGTH = 3
+DEFAULT_SEPARATOR = r'[\s\-]+'
+HOME_SHARD = ('home', 'Home')
+
+# Prebuilt indexes weight title matches like MkDocs' lunr setup, and store scores as integers
+FIELD_WEIGHTS = {'title': 10, 'text': 1}
+SCORE_SCALE = 100
+TERM_TRIM_PATTERN = re.compile(r'^\W+|\W+$')
+TAG_PATTERN = re.compile(r'<[^>]*>')
+
+# lunr's English stop word filter, in the pipeline of both search plugins by default
+STOP_WORDS = frozenset('''
+    a able about across after all almost also am among an and any are as at be because been but by
+    can cannot could dear did do does either else ever every for from get got had has have he her
+    hers him his how however i if in into is it its just least let like likely may me might most
+    must my neither no nor not of off often on only or other our own rather said say says she
+    should since so some than that the their them then there these they this tis to too twas us
+    wants was we were what when where which while who whom why will with would yet you your
+'''.split())
+
+
+def _is_glob(segment):
+    return any(char in GLOB_CHARACTERS for char in segment)
+
+
+class BoostNode:
+    """One path segment of the boost trie."""
+
+    __slots__ = ('children', 'globs', 'page', 'tree')
+
+    def __init__(self):
+        self.children = {}
+        self.globs = []
+        self.page = None  # Boost of the page at exactly this path
+        self.tree = None  # Boost of this path and everything below it
+
+
+class BoostTrie:
+    """Search boosts keyed by site path, matched segment by segment.
+
+    Patterns are written like the files in ``docs_dir``:
+
+    - ``user-guide/setup.md`` boosts that page (and its sections)
+    - ``user-guide/`` or ``user-guide`` boosts the folder and every page below it
+    - segments may be globs: ``*/api.md``, ``user-guide/*.md``, ``api-*/``
+
+    A page takes the boost of the longest matching pattern. When patterns are
+    equally long, a page pattern beats a folder pattern and a literal segment
+    beats a glob, so the result never depends on the order of the file. Each
+    lookup costs time proportional to the number of segments in the path.
+    """
+
+    def __init__(self):
+        self.root = BoostNode()
+        self._cache = {}
+
+    def add(self, pattern, boost):
+        pattern = pattern.strip().lstrip('/')
+        is_page = pattern.endswith('.md')
+        if is_page:
+            pattern = pattern[:-len('.md')]
+        segments = [segment for segment in pattern.split('/') if segment]
+        if segments and segments[-1] == '**':
+            segments.pop()
+            is_page = False
+        if is_page and segments and segments[-1] in ('index', 'README'):
+            # Index pages are served at their folder's URL
+            segments.pop()
+
+        node = self.root
+        for segment in segments:
+            if _is_glob(segment):
+                child = next((glob_node for glob, glob_node in node.globs if glob == segment), None)
+                if child is None:
+                    child = BoostNode()
+                    node.globs.append((segment, child))
+            else:
+                child = node.children.setdefault(segment, BoostNode())
+            node = child
+        if is_page:
+            node.page = boost
+        else:
+            node.tree = boost
+        self._cache.clear()
+
+    def lookup(self, location):
+        """Boost of a search index location such as ``user-guide/setup/#install``, or None."""
+        path = location.split('#', 1)[0].split('?', 1)[0]
+        if path not in self._cache:
+            segments = [segment for segment in path.strip('/').split('/') if segment]
+            if segments and segments[-1].endswith('.html'):
+                # Locations without directory URLs: user-guide/setup.html, user-guide/index.html
+                segments[-1] = segments[-1][:-len('.html')]
+                if segments[-1] == 'index':
+                    segments.pop()
+            best = self._match(self.root, segments, 0, 0)
+            self._cache[path] = best[-1] if best else None
+        return self._cache[path]
+
+    def _match(self, node, segments, depth, literals):
+        """Best ``(depth, is_page, literals, boost)`` match below ``node``, or None."""
+        best = None
+        if node.tree is not None:
+            best = (depth, 0, literals, node.tree)
+        if depth == len(segments):
+            if node.page is not None:
+                best = (depth, 1, literals, node.page)
+            return best
+
+        segment = segments[depth]
+        candidates = []
+        child = node.children.get(segment)
+        if child is not None:
+            candidates.append((child, literals + 1))
+        candidates.extend((glob_node, literals) for glob, glob_node in node.globs
+                          if fnmatch.fnmatchcase(segment, glob))
+        for child, child_literals in candidates:
+            match = self._match(child, segments, depth + 1, child_literals)
+            if match and (best is None or match[:3] > best[:3]):
+                best = match
+        return best
+
+
+def load_boosts(boost_file):
+    """Read ``search-boost.yml`` into a BoostTrie, skipping entries that are not numbers."""
+    trie = BoostTrie()
+    if not os.path.exists(boost_file):
+        return trie
+    try:
+        with open(boost_file, 'r', encoding='utf-8') as f:
+            entries = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        logger.warning(f"Could not parse search boost file: {e}")
+        return trie
+    if not isinstance(entries, dict):
+        logger.warning(f"Search boost file should map paths to boosts: {boost_file}")
+        return trie
+
+    for pattern, boost in entries.items():
+        if isinstance(boost, bool) or not isinstance(boost, (int, float)):
+            logger.warning(f"Ignoring search boost for '{pattern}': {boost!r} is not a number")
+            continue
+        trie.add(str(pattern), float(boost))
+    return trie
+
+
+class _Brotli:
+    """File-like wrapper streaming bytes through a brotli compressor."""
+
+    def __init__(self, f):
+        self.f = f
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def write(self, data):
+        self.f.write(self.compressor.process(data))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.f.write(self.compressor.finish())
+
+
+def write_index(path, search_index):
+    """Write the index compactly, with ``.gz`` and ``.br`` copies for servers to send as-is.
+
+    The JSON is encoded entry by entry straight into the file and both compressors,
+    so the serialised index is never held in memory. Without the brotli module only
+    the ``.gz`` copy is written, and a stale ``.br`` from an earlier build is removed.
+    """
+    with contextlib.ExitStack() as stack:
+        gz_file = stack.enter_context(open(f'{path}.gz', 'wb'))
+        outputs = [
+            stack.enter_context(open(path, 'wb')),
+            stack.enter_context(gzip.GzipFile(
+                filename='', mode='wb', fileobj=gz_file, compresslevel=GZIP_LEVEL, mtime=0
+            )),
+        ]
+        if brotli:
+            outputs.append(stack.enter_context(_Brotli(stack.enter_context(open(f'{path}.br', 'wb')))))
+
+        # Hand the outputs larger blocks than single entries
+        buffer, size = [], 0
+        for chunk in _iter_json(search_index):
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= WRITE_BUFFER_SIZE:
+                _write_all(outputs, buffer)
+                buffer, size = [], 0
+        _write_all(outputs, buffer)
+
+    if not brotli and os.path.exists(f'{path}.br'):
+        os.remove(f'{path}.br')
+
+
+def _iter_json(search_index):
+    """Compact JSON of the index in pieces: one per top-level value, or list entry."""
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+    yield '{'
+    for position, (key, value) in enumerate(search_index.items()):
+        yield f"{',' if position else ''}{encode(str(key))}:"
+        if isinstance(value, list):
+            yield '['
+            for index, item in enumerate(value):
+                yield f"{',' if index else ''}{encode(item)}"
+            yield ']'
+        else:
+            yield encode(value)
+    yield '}'
+
+
+def write_script(path, search_index):
+    """Inline the index into a script, as Material's offline plugin does for ``file://`` sites."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('var __index = ')
+        for chunk in _iter_json(search_index):
+            f.write(chunk)
+
+
+def _write_all(outputs, chunks):
+    data = ''.join(chunks).encode('utf-8')
+    for output in outputs:
+        output.write(data)
+
+
+def _slug(title):
+    return re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-') or 'section'
+
+
+def nav_sections(nav):
+    """Map each page URL to the ``(name, title)`` of its top-level nav section.
+
+    Pages at the top level of the nav belong to no section and are left out.
+    """
+    sections = {}
+    names = {HOME_SHARD[0]}
+
+    def walk(items, section):
+        for item in items:
+            if item.is_page:
+                sections[item.url] = section
+            elif item.is_section:
+                walk(item.children, section)
+
+    for item in nav.items:
+        if item.is_section:
+            name = base = _slug(item.title)
+            count = 1
+            while name in names:
+                count += 1
+                name = f'{base}-{count}'
+            names.add(name)
+            walk(item.children, (name, item.title))
+    return sections
+
+
+def search_separator(config, search_index):
+    """Token separator of the ``search`` plugin in mkdocs.yml, else of the index itself."""
+    plugins = config['plugins']
+    for name in ('search', 'material/search'):
+        plugin = plugins.get(name) if hasattr(plugins, 'get') else None
+        if plugin is not None and plugin.config.get('separator'):
+            return plugin.config['separator']
+    return search_index.get('config', {}).get('separator') or DEFAULT_SEPARATOR
+
+
+def search_stop_words(search_index):
+    """Stop words the index's search pipeline leaves out, which prebuilt shards leave out too.
+
+    MkDocs' search always filters English stop words; Material's records its
+    pipeline and languages in the index config.
+    """
+    index_config = search_index.get('config', {})
+    pipeline = index_config.get('pipeline')
+    lang = index_config.get('lang') or ['en']
+    if isinstance(lang, str):
+        lang = [lang]
+    if (pipeline is None or 'stopWordFilter' in pipeline) and 'en' in lang:
+        return STOP_WORDS
+    return frozenset()
+
+
+def strip_html(text):
+    """Plain text of an index entry's title or text, which hold HTML."""
+    return unescape(TAG_PATTERN.sub(' ', text))
+
+
+def tokenize(text, split, stop_words=frozenset()):
+    """Lowercase terms of ``text``, split by the search separator, without stop words."""
+    for term in split(text.lower()):
+        if term and not (term[0].isalnum() and term[-1].isalnum()):
+            # Like lunr's trimmer, ignore punctuation around terms
+            term = TERM_TRIM_PATTERN.sub('', term)
+        if term and term not in stop_words:
+            yield term
+
+
+def term_prefixes(docs, separator, stop_words=frozenset()):
+    """Distinct lowercase term prefixes of the text of the docs' titles and text, sorted."""
+    split = re.compile(separator).split
+    return sorted({
+        term[:SHARD_PREFIX_LENGTH] for doc in docs for field in FIELD_WEIGHTS
+        for term in tokenize(strip_html(doc.get(field, '')), split, stop_words)
+    })
+
+
+def build_inverted_index(docs, separator, stop_words=frozenset()):
+    """Inverted index of the docs that a client can search without building anything.
+
+    ``terms`` is sorted so clients can find prefix matches by binary search, and
+    ``postings[i]`` lists ``doc, score`` pairs for ``terms[i]`` as one flat list.
+    A score combines the field weights, term frequency, the term's rarity and the
+    doc's search boost, scaled to an integer; boosts are not stored separately.
+    Terms come from the fields' text without their markup, leaving out ``stop_words``.
+    """
+    split = re.compile(separator).split
+    postings = defaultdict(list)
+    for number, doc in enumerate(docs):
+        weights = {}
+        for field, field_weight in FIELD_WEIGHTS.items():
+            for term, count in Counter(tokenize(strip_html(doc.get(field, '')), split, stop_words)).items():
+                weights[term] = weights.get(term, 0) + field_weight * (1 + math.log(count))
+        boost = doc.get('boost', 1)
+        for term, weight in weights.items():
+            entries = postings[term]
+            entries.append(number)
+            entries.append(weight * boost)
+
+    terms = sorted(postings)
+    encoded = []
+    for term in terms:
+        entries = postings[term]
+        scale = math.log(1 + len(docs) / (len(entries) // 2)) * SCORE_SCALE
+        entries[1::2] = [max(1, round(weight * scale)) for weight in entries[1::2]]
+        encoded.append(entries)
+    return {
+        'docs': [{key: doc[key] for key in ('location', 'title', 'text') if key in doc} for doc in docs],
+        'terms': terms,
+        'postings': encoded,
+    }
+
+
+def write_shards(search_dir, search_index, sections, separator, prebuilt=False, default=HOME_SHARD,
+                 stop_words=frozenset()):
+    """Split the index by top-level nav section into ``search/shards/`` plus a manifest.
+
+    Entries of pages outside ``sections`` (top-level pages and pages not in the
+    nav) go to the ``default`` shard. The manifest at ``search/search_manifest.json``
+    carries the index config and, with more than one shard, each shard's term
+    prefixes, so a client fetches only the shards that can match a query. With
+    ``prebuilt`` the shards hold inverted indexes instead of the raw entries,
+    without ``stop_words``.
+    """
+    shards = {}
+    for doc in search_index.get('docs', []):
+        page_url = doc.get('location', '').split('#', 1)[0]
+        shards.setdefault(sections.get(page_url, default), []).append(doc)
+
+    shard_dir = os.path.join(search_dir, 'shards')
+    # Drop shards of sections removed since the last build
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    os.makedirs(shard_dir)
+
+    index_config = dict(search_index.get('config', {}), separator=separator)
+    manifest = {'config': index_config, 'prebuilt': prebuilt, 'prefix_length': SHARD_PREFIX_LENGTH, 'shards': []}
+    for (name, title), docs in shards.items():
+        shard = build_inverted_index(docs, separator, stop_words) if prebuilt else {'docs': docs}
+        prefixes = None
+        if len(shards) > 1:
+            if prebuilt:
+                prefixes = ' '.join(sorted({term[:SHARD_PREFIX_LENGTH] for term in shard['terms']}))
+            else:
+                prefixes = ' '.join(term_prefixes(docs, separator, stop_words))
+        write_index(os.path.join(shard_dir, f'{name}.json'), shard)
+        manifest['shards'].append({
+            'name': name,
+            'title': title,
+            'url': f'shards/{name}.json',
+            'docs': len(docs),
+            'prefixes': prefixes,
+        })
+    write_index(os.path.join(search_dir, 'search_manifest.json'), manifest)
+    return manifest
+
+
+class EnhancedSearchPlugin(BasePlugin):
+    config_scheme = (
+        ('shard_index', config_options.Type(bool, default=False)),
+        ('prebuild_index', config_options.Type(bool, default=False)),
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.sections = {}
+
+    def on_nav(self, nav, config, files):
+        if self.config['shard_index']:
+            self.sections = nav_sections(nav)
+        return nav
+
+    # After the search plugin writes the index, and the offline plugin (at -100) inlines it
+    @event_priority(-110)
+    def on_post_build(self, config):
+        """
+        Enhanced search index by adding additional metadata to search results
+        """
+        search_index_path = os.path.join(config['site_dir'], 'search', 'search_index.json')
+
+        if os.path.exists(search_index_path):
+            with open(search_index_path, 'r', encoding='utf-8') as f:
+                search_index = json.load(f)
+
+            # Add custom boost to certain pages
+            docs_dir = config['docs_dir']
+            boosts = load_boosts(os.path.join(docs_dir, 'search-boost.yml'))
+
+            # Apply boosts to search index
+            for doc in search_index.get('docs', []):
+                boost = boosts.lookup(doc.get('location', ''))
+                if boost is not None:
+                    doc['boost'] = boost
+
+            if self.config['shard_index'] or self.config['prebuild_index']:
+                separator = search_separator(config, search_index)
+                if self.config['shard_index']:
+                    sections, default = self.sections, HOME_SHARD
+                else:
+                    sections, default = {}, ('site', config['site_name'])
+                manifest = write_shards(
+                    os.path.dirname(search_index_path), search_index, sections, separator,
+                    prebuilt=self.config['prebuild_index'], default=default,
+                    stop_words=search_stop_words(search_index)
+                )
+                logger.info(
+                    f"Search index written as {len(manifest['shards'])} shard(s)"
+                    f"{', prebuilt' if manifest['prebuilt'] else ''}"
+                )
+                # The theme still fetches search_index.json and hands it to its worker,
+                # search-shards.js, which loads the shards instead. It gets a stub; the
+                # whole index stays in the offline plugin's search_index.js, which
+                # file:// sites load and which the worker falls back to.
+                write_index(search_index_path, {'config': search_index.get('config', {}), 'docs': []})
+                script_path = os.path.join(os.path.dirname(search_index_path), 'search_index.js')
+                if os.path.exists(script_path):
+                    write_script(script_path, search_index)
+            else:
+                # Save enhanced search index
+                write_index(search_index_path, search_index)
+
+        return config
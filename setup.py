@@ -2,22 +2,28 @@
 Setup script to install the MkDocs Confluence Publisher plugin locally.
 """
 
-from setuptools import setup, find_packages
+from setuptools import setup
 
 setup(
     name='mkdocs-confluence-publisher-local',
     version='1.0.0',
     description='MkDocs plugin for publishing to Confluence',
-    py_modules=['mkdocs_confluence_publisher'],
+    # The publisher, and the site's own search plugin so mkdocs.yml can enable it by name
+    py_modules=['mkdocs_confluence_publisher', 'mkdocs_enhanced_search'],
     install_requires=[
         'mkdocs>=1.0',
         'requests',
         'python-dotenv',
         'markdown',
     ],
+    extras_require={
+        # Image optimisation and SVG rasterisation before upload
+        'images': ['pillow', 'cairosvg'],
+    },
     entry_points={
         'mkdocs.plugins': [
             'confluence_publisher = mkdocs_confluence_publisher:ConfluencePublisherPlugin',
+            'enhanced_search = mkdocs_enhanced_search:EnhancedSearchPlugin',
         ]
     },
     python_requires='>=3.6',
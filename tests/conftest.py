@@ -0,0 +1,55 @@
+"""Shared fixtures: the fake Confluence server from the benchmarks and a throwaway MkDocs project."""
+
+import os
+import sys
+
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from fake_confluence import FakeConfluenceServer  # noqa: E402
+from publish_benchmark import PARENT_PAGE_ID, SPACE_KEY, run_build  # noqa: E402
+
+
+@pytest.fixture
+def confluence(monkeypatch):
+    """A fake Confluence server the publisher is pointed at through its environment variables."""
+    with FakeConfluenceServer(space_key=SPACE_KEY, parent_page_id=PARENT_PAGE_ID) as server:
+        monkeypatch.setenv('CONFLUENCE_URL', server.url)
+        monkeypatch.setenv('CONFLUENCE_API_TOKEN', 'token')
+        yield server
+
+
+@pytest.fixture
+def site(tmp_path, confluence):
+    """Build a project of one-line pages with the given nav, returning the fake space's page tree."""
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+
+    def build(nav, **options):
+        for name in _nav_files(nav):
+            (docs / name).write_text(f"# {name}\n\nText of {name}.\n")
+        config = {
+            'site_name': 'Test',
+            'nav': nav,
+            'plugins': [{'confluence_publisher': dict(
+                space_key=SPACE_KEY, parent_page_id=PARENT_PAGE_ID, confluence_prefix='P - ',
+                upload_attachments=False, **options
+            )}],
+        }
+        config_file = tmp_path / 'mkdocs.yml'
+        config_file.write_text(yaml.safe_dump(config, sort_keys=False))
+        run_build(str(config_file))
+        return {page['title']: page for page in confluence.space.pages.values()}
+
+    return build
+
+
+def _nav_files(nav):
+    for entry in nav:
+        for value in entry.values():
+            if isinstance(value, list):
+                yield from _nav_files(value)
+            else:
+                yield value
@@ -0,0 +1,123 @@
+"""Retries, throttling and concurrency control of the Confluence client."""
+
+import time
+
+import pytest
+import requests
+
+from mkdocs_confluence_publisher import AdaptiveConcurrencyLimiter, ConfluenceClient, RateLimiter, RequestMetrics
+from publish_benchmark import PARENT_PAGE_ID, SPACE_KEY
+
+
+def client_for(server, max_retries=2):
+    return ConfluenceClient(server.url, '', 'token', max_retries=max_retries, backoff_factor=0.001)
+
+
+def post_attempts(server):
+    return server.stats.summary()['endpoints'].get('POST /content', {}).get('requests', 0)
+
+
+def test_throttled_create_is_retried_once_per_attempt(confluence):
+    # Every request is throttled, with no wait
+    confluence.rate_limit = 1e-9
+    confluence.retry_after = 0
+
+    with pytest.raises(requests.exceptions.HTTPError) as error:
+        client_for(confluence).create_page(SPACE_KEY, 'Page', '<p />', PARENT_PAGE_ID)
+
+    assert error.value.response.status_code == 429
+    assert post_attempts(confluence) == 3
+
+
+def test_failed_create_is_retried_after_a_lookup(confluence):
+    confluence.failure_rate = 1.0
+
+    with pytest.raises(requests.exceptions.HTTPError) as error:
+        client_for(confluence).create_page(SPACE_KEY, 'Page', '<p />', PARENT_PAGE_ID)
+
+    assert error.value.response.status_code == 503
+    assert post_attempts(confluence) == 3
+    assert not confluence.space.pages.keys() - {PARENT_PAGE_ID}
+
+
+def test_duplicate_title_is_not_retried(confluence):
+    confluence.space.add_page('Page', PARENT_PAGE_ID)
+
+    with pytest.raises(requests.exceptions.HTTPError) as error:
+        client_for(confluence).create_page(SPACE_KEY, 'Page', '<p />', PARENT_PAGE_ID)
+
+    assert error.value.response.status_code == 400
+    assert post_attempts(confluence) == 1
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.monotonic() - start >= 5 / 50 * 0.9
+
+
+def test_rate_limiter_pause_holds_requests_without_a_rate():
+    limiter = RateLimiter(rate=0)
+    limiter.pause(0.1)
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_concurrency_limit_halves_on_throttling_and_recovers_additively():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8)
+    endpoint = ('GET', '/content/{id}')
+
+    limiter.acquire()
+    limiter.release(0.1, throttled=True, endpoint=endpoint)
+    assert limiter.limit == 4
+
+    limiter.acquire()
+    limiter.release(0.1, endpoint=endpoint)
+    assert limiter.limit == pytest.approx(4.25)
+
+
+def test_concurrency_limit_compares_latency_per_endpoint():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8)
+    limiter.limit = 4.0
+
+    for endpoint, latency in ((('GET', '/content/{id}'), 0.01), (('PUT', '/content/{id}'), 0.5)):
+        limiter.acquire()
+        limiter.release(latency, endpoint=endpoint)
+    # A slow endpoint is not slow compared with a fast one
+    assert limiter.limit > 4.0
+
+    limiter.acquire()
+    limiter.release(0.05, endpoint=('GET', '/content/{id}'))
+    assert limiter.limit < 4.5
+
+
+def test_concurrency_limit_stays_within_bounds():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=2, min_limit=1)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(0.1, throttled=True)
+    assert limiter.limit == 1
+    for _ in range(50):
+        limiter.acquire()
+        limiter.release(0.1)
+    assert limiter.limit == 2
+
+
+def test_metrics_count_attempts_retries_and_errors_until_reset():
+    metrics = RequestMetrics()
+    metrics.record('GET', '/content/123', 0.1, 200, 10)
+    metrics.record('GET', '/content/456', 0.3, 503)
+    metrics.record_retry('GET', '/content/456')
+    metrics.record_error('POST', '/content')
+
+    report = metrics.report()
+    assert (report['requests'], report['retries'], report['errors']) == (2, 1, 1)
+    assert [(e['method'], e['endpoint']) for e in report['endpoints']] == [
+        ('GET', '/content/{id}'), ('POST', '/content'),
+    ]
+
+    metrics.reset()
+    assert metrics.report()['requests'] == 0
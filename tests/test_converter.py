@@ -0,0 +1,109 @@
+"""Rendered HTML is converted to Confluence storage format element by element."""
+
+from mkdocs_confluence_publisher import ConfluenceStorageConverter, LinkIndex, diagram_key
+
+
+def convert(html, **kwargs):
+    return ConfluenceStorageConverter(**kwargs).convert(html)
+
+
+def test_plain_elements_are_kept():
+    html = '<h2 id="usage">Usage</h2>\n\n<p>Some <strong>bold</strong> text<br>\nand more.</p>'
+    assert convert(html) == '<h2 id="usage">Usage</h2>\n<p>Some <strong>bold</strong> text<br />\nand more.</p>'
+
+
+def test_text_is_escaped_for_xhtml():
+    assert convert('<p>a &lt;b&gt; &amp; c&nbsp;d &#169;</p>') == '<p>a &lt;b&gt; &amp; c\xa0d \xa9</p>'
+
+
+def test_code_blocks_become_code_macros():
+    html = '<pre class="codehilite"><code class="language-py">x = "&lt;a&gt;"\nprint(x)\n</code></pre>'
+    assert convert(html) == (
+        '<ac:structured-macro ac:name="code"><ac:parameter ac:name="language">python</ac:parameter>'
+        '<ac:plain-text-body><![CDATA[x = "<a>"\nprint(x)]]></ac:plain-text-body></ac:structured-macro>'
+    )
+
+
+def test_code_language_from_wrapper_and_unknown_languages():
+    wrapped = convert('<div class="highlight language-yml"><pre><code>a: 1</code></pre></div>')
+    assert '<ac:parameter ac:name="language">yaml</ac:parameter>' in wrapped
+    assert 'ac:name="language"' not in convert('<pre><code class="language-toml">a = 1</code></pre>')
+
+
+def test_diagrams_become_attached_images():
+    code = 'graph TD\n  A --> B'
+    html = f'<pre class="mermaid"><code>{code.replace(">", "&gt;")}</code></pre>'
+    content = convert(html, diagrams={diagram_key('mermaid', code): 'diagram-1.png'})
+    assert content == '<ac:image><ri:attachment ri:filename="diagram-1.png" /></ac:image>'
+
+
+def test_admonitions_become_macros_with_titles():
+    html = (
+        '<div class="admonition warning">\n<p class="admonition-title">Careful now</p>\n'
+        '<p>Body text.</p>\n</div>'
+    )
+    assert convert(html) == (
+        '<ac:structured-macro ac:name="warning"><ac:parameter ac:name="title">Careful now</ac:parameter>'
+        '<ac:rich-text-body><p>Body text.</p>\n</ac:rich-text-body></ac:structured-macro>'
+    )
+    # The default title is left to Confluence
+    assert 'ac:name="title"' not in convert('<div class="admonition note"><p class="admonition-title">Note</p></div>')
+
+
+def test_tables_are_wrapped():
+    assert convert('<table>\n<tr>\n<td>a</td>\n</tr>\n</table>') == (
+        '<table class="wrapped">\n<tr>\n<td>a</td>\n</tr>\n</table>'
+    )
+
+
+def test_images_are_attached_and_collected():
+    converter = ConfluenceStorageConverter()
+    content = converter.convert(
+        '<p><img alt="Chart" src="../img/chart.png?v=2" /><img src="https://example.com/a.png"><img src=""></p>'
+    )
+    assert content == (
+        '<p><ac:image ac:alt="Chart"><ri:attachment ri:filename="chart.png" /></ac:image>'
+        '<ac:image><ri:url ri:value="https://example.com/a.png" /></ac:image></p>'
+    )
+    assert converter.images == ['../img/chart.png?v=2']
+
+
+def test_links_to_published_pages_become_page_links():
+    links = LinkIndex([('guide/setup.md', 'guide/setup/', 'Docs - Setup')])
+    content = convert(
+        '<p><a href="../setup/#install">Install</a> <a href="https://example.com">out</a></p>',
+        links=links, link_base='guide/other/'
+    )
+    assert content == (
+        '<p><ac:link ac:anchor="install"><ri:page ri:content-title="Docs - Setup" />'
+        '<ac:link-body>Install</ac:link-body></ac:link> <a href="https://example.com">out</a></p>'
+    )
+
+
+def test_dropped_content():
+    html = (
+        '<h2 id="a">A<a class="headerlink" href="#a">&para;</a></h2>'
+        '<div class="drawio"><mxfile host="x"><diagram><mxCell value="v"><mxCell /></mxCell></diagram></mxfile></div>'
+        '<!-- a comment --><p>after</p>'
+    )
+    assert convert(html) == '<h2 id="a">A</h2><div class="drawio"></div><p>after</p>'
+
+
+def test_script_content_is_text():
+    assert convert('<script>if (a<b && c>d) {}</script><p>x</p>') == (
+        '<script>if (a&lt;b &amp;&amp; c&gt;d) {}</script><p>x</p>'
+    )
+
+
+def test_unclosed_and_stray_tags():
+    assert convert('<div><p>a</span>b</div><ul><li>c') == '<div><p>ab</p></div><ul><li>c</li></ul>'
+
+
+def test_tabs_become_labelled_blocks():
+    html = (
+        '<div class="tabbed-set tabbed-alternate"><input id="t1" type="radio">'
+        '<div class="tabbed-labels"><label for="t1">Python</label><label for="t2">Shell</label></div>'
+        '<div class="tabbed-content"><div class="tabbed-block"><p>one</p></div>'
+        '<div class="tabbed-block"><p>two</p></div></div></div>'
+    )
+    assert convert(html) == '<p><strong>Python</strong></p><p>one</p><p><strong>Shell</strong></p><p>two</p>'
@@ -0,0 +1,45 @@
+"""The dry-run change plan predicts what the next publish would do, sections included."""
+
+import json
+
+
+def plan(site, tmp_path, nav, **options):
+    site(nav, dry_run=True, **options)
+    return json.loads((tmp_path / '.confluence-dry-run' / 'plan.json').read_text())
+
+
+def test_first_dry_run_creates_everything(site, tmp_path):
+    result = plan(site, tmp_path, [{'Alpha': 'a.md'}, {'Guide': [{'Beta': 'b.md'}]}])
+
+    assert {page['action'] for page in result['pages'].values()} == {'create'}
+    assert result['sections'] == [{'title': 'P - Guide', 'action': 'create', 'id': None}]
+    assert result['summary']['create'] == 3
+
+
+def test_published_pages_are_updated_unless_incremental(site, tmp_path):
+    nav = [{'Alpha': 'a.md'}, {'Guide': [{'Beta': 'b.md'}]}]
+    site(nav)
+
+    result = plan(site, tmp_path, nav)
+    assert {page['action'] for page in result['pages'].values()} == {'update'}
+
+    result = plan(site, tmp_path, nav, incremental=True)
+    assert {page['action'] for page in result['pages'].values()} == {'unchanged'}
+    assert result['sections'][0]['action'] == 'unchanged'
+
+
+def test_renamed_section_is_planned_as_rename(site, tmp_path):
+    before = site([{'Guide': [{'Beta': 'b.md'}, {'Gamma': 'c.md'}]}], incremental=True)
+
+    result = plan(site, tmp_path, [{'Manual': [{'Beta': 'b.md'}, {'Gamma': 'c.md'}]}], incremental=True)
+    assert result['sections'] == [{'title': 'P - Manual', 'action': 'rename', 'id': before['P - Guide']['id']}]
+    assert {page['action'] for page in result['pages'].values()} == {'unchanged'}
+    assert (result['summary']['rename'], result['summary']['unchanged']) == (1, 2)
+
+
+def test_pages_moved_below_a_new_section_are_updated(site, tmp_path):
+    site([{'Beta': 'b.md'}], incremental=True)
+
+    result = plan(site, tmp_path, [{'Guide': [{'Beta': 'b.md'}]}], incremental=True)
+    assert result['sections'][0]['action'] == 'create'
+    assert result['pages']['b.md']['action'] == 'update'
@@ -0,0 +1,95 @@
+"""Prebuilt search shards index the text of the theme's index entries, not their markup."""
+
+import json
+
+import yaml
+from mkdocs.commands.build import build
+from mkdocs.config import load_config
+
+from mkdocs_enhanced_search import (
+    STOP_WORDS, build_inverted_index, search_stop_words, strip_html, term_prefixes, write_shards,
+)
+
+SEPARATOR = r'[\s\-]+'
+
+DOCS = [
+    {'location': 'setup/', 'title': 'Setup', 'text': '<p>Install the <code>plugin</code> &amp; its extras.</p>'},
+    {'location': 'setup/#usage', 'title': 'Usage', 'text': '<p>Publish pages with <strong>mkdocs build</strong>.</p>'},
+    {'location': 'guide/', 'title': 'Guide <code>v2</code>', 'text': '<ul><li>Publish</li></ul>', 'boost': 2},
+]
+
+
+def test_strip_html_removes_tags_and_unescapes_entities():
+    assert strip_html('<p>a &lt;b&gt; &amp; c</p>').split() == ['a', '<b>', '&', 'c']
+
+
+def test_inverted_index_terms_have_no_markup_or_stop_words():
+    index = build_inverted_index(DOCS, SEPARATOR, STOP_WORDS)
+
+    assert index['terms'] == sorted(index['terms'])
+    assert {'install', 'plugin', 'extras', 'publish', 'mkdocs', 'v2'} <= set(index['terms'])
+    assert not {'p', 'code', 'li', 'ul', 'strong', 'amp', 'the', 'its', 'with'} & set(index['terms'])
+    assert not any('<' in term or '>' in term for term in index['terms'])
+
+
+def test_inverted_index_scores_titles_and_boosts():
+    index = build_inverted_index(DOCS, SEPARATOR)
+    postings = index['postings'][index['terms'].index('publish')]
+    scores = dict(zip(postings[::2], postings[1::2]))
+
+    assert set(scores) == {1, 2}
+    assert scores[2] > scores[1]
+    assert index['postings'][index['terms'].index('setup')][0] == 0
+
+
+def test_stop_words_follow_the_search_pipeline():
+    assert search_stop_words({'config': {'lang': ['en']}}) is STOP_WORDS
+    assert search_stop_words({'config': {'lang': ['en'], 'pipeline': ['stopWordFilter']}}) is STOP_WORDS
+    assert not search_stop_words({'config': {'lang': ['en'], 'pipeline': ['stemmer']}})
+    assert not search_stop_words({'config': {'lang': ['de']}})
+
+
+def test_prebuilt_shards(tmp_path):
+    search_index = {'config': {'lang': ['en'], 'separator': SEPARATOR}, 'docs': DOCS}
+    sections = {'guide/': ('guide', 'Guide')}
+
+    manifest = write_shards(str(tmp_path), search_index, sections, SEPARATOR, prebuilt=True, stop_words=STOP_WORDS)
+
+    assert [shard['name'] for shard in manifest['shards']] == ['home', 'guide']
+    written = json.loads((tmp_path / 'search_manifest.json').read_text())
+    assert written == manifest
+    assert written['prebuilt'] and written['config']['separator'] == SEPARATOR
+    home = json.loads((tmp_path / 'shards' / 'home.json').read_text())
+    assert [doc['location'] for doc in home['docs']] == ['setup/', 'setup/#usage']
+    assert (tmp_path / 'shards' / 'home.json.gz').exists()
+    assert 'ins' in manifest['shards'][0]['prefixes'].split()
+    assert 'p' not in manifest['shards'][0]['prefixes'].split()
+
+
+def test_shard_prefixes_come_from_text():
+    prefixes = term_prefixes(DOCS, SEPARATOR, STOP_WORDS)
+
+    assert {'ins', 'plu', 'mkd', 'v2'} <= set(prefixes)
+    assert not {'p', 'p>i', 'cod', 'li', 'the'} & set(prefixes)
+
+
+def test_theme_gets_a_stub_index_while_shards_are_searched(tmp_path):
+    docs = tmp_path / 'docs'
+    (docs / 'guide').mkdir(parents=True)
+    (docs / 'index.md').write_text('# Home\n\nWelcome.\n')
+    (docs / 'guide' / 'setup.md').write_text('# Setup\n\nInstall the plugin.\n')
+    config_file = tmp_path / 'mkdocs.yml'
+    config_file.write_text(yaml.safe_dump({
+        'site_name': 'Test',
+        'nav': [{'Home': 'index.md'}, {'Guide': [{'Setup': 'guide/setup.md'}]}],
+        'plugins': ['search', {'enhanced_search': {'shard_index': True, 'prebuild_index': True}}],
+    }))
+
+    build(load_config(config_file=str(config_file)))
+
+    search_dir = tmp_path / 'site' / 'search'
+    assert json.loads((search_dir / 'search_index.json').read_text())['docs'] == []
+    manifest = json.loads((search_dir / 'search_manifest.json').read_text())
+    assert [shard['name'] for shard in manifest['shards']] == ['home', 'guide']
+    guide = json.loads((search_dir / 'shards' / 'guide.json').read_text())
+    assert 'install' in guide['terms'] and 'the' not in guide['terms']
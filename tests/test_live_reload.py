@@ -0,0 +1,54 @@
+"""The debounced publish of mkdocs serve never runs while a rebuild sets up publish state."""
+
+import threading
+import time
+
+from mkdocs_confluence_publisher import LiveReloadQueue
+
+
+def publish(src_path):
+    pass
+
+
+def test_hold_cancels_a_pending_flush_and_keeps_its_tasks():
+    flushed = []
+    queue = LiveReloadQueue(0.05, lambda: flushed.extend(queue.take()))
+    queue.queue('a.md', publish, ())
+    queue.schedule()
+
+    queue.hold()
+    time.sleep(0.1)
+    assert flushed == []
+
+    assert queue.schedule() == 1
+    time.sleep(0.2)
+    assert [src_path for src_path, _, _ in flushed] == ['a.md']
+
+
+def test_hold_waits_for_a_running_flush():
+    started = threading.Event()
+    finished = []
+
+    def flush():
+        started.set()
+        time.sleep(0.1)
+        finished.append(queue.take())
+
+    queue = LiveReloadQueue(0, flush)
+    queue.queue('a.md', publish, ())
+    queue.schedule()
+    assert started.wait(1)
+
+    queue.hold()
+    assert len(finished) == 1
+
+
+def test_later_rebuild_replaces_a_queued_task():
+    queue = LiveReloadQueue(10, lambda: None)
+    queue.queue('a.md', publish, (1,))
+    queue.queue('a.md', publish, (2,))
+    queue.queue('b.md', publish, (3,))
+
+    assert queue.schedule() == 2
+    queue.hold()
+    assert sorted(args for _, _, args in queue.take()) == [(2,), (3,)]
@@ -0,0 +1,69 @@
+"""Files stay bound to the pages they were published to across renames, moves and swaps."""
+
+
+def test_renamed_nav_entry_renames_its_page(site):
+    before = site([{'Alpha': 'a.md'}, {'Beta': 'b.md'}])
+    after = site([{'Alpha 2': 'a.md'}, {'Beta': 'b.md'}])
+
+    assert 'P - Alpha' not in after
+    assert after['P - Alpha 2']['id'] == before['P - Alpha']['id']
+    assert after['P - Beta']['id'] == before['P - Beta']['id']
+
+
+def test_swapped_titles_swap_pages(site):
+    before = site([{'Alpha': 'a.md'}, {'Beta': 'b.md'}])
+    after = site([{'Beta': 'a.md'}, {'Alpha': 'b.md'}])
+
+    assert after['P - Beta']['id'] == before['P - Alpha']['id']
+    assert after['P - Alpha']['id'] == before['P - Beta']['id']
+    assert 'b.md' in after['P - Alpha']['body']
+    assert len(after) == len(before)
+
+
+def test_rename_cycle_resolves(site):
+    before = site([{'One': 'a.md'}, {'Two': 'b.md'}, {'Three': 'c.md'}])
+    after = site([{'Two': 'a.md'}, {'Three': 'b.md'}, {'One': 'c.md'}])
+
+    assert after['P - Two']['id'] == before['P - One']['id']
+    assert after['P - Three']['id'] == before['P - Two']['id']
+    assert after['P - One']['id'] == before['P - Three']['id']
+    assert len(after) == len(before)
+
+
+def test_renamed_section_keeps_its_page(site):
+    before = site([{'Guide': [{'Beta': 'b.md'}, {'Gamma': 'c.md'}]}])
+    after = site([{'Manual': [{'Beta': 'b.md'}, {'Gamma': 'c.md'}]}])
+
+    assert 'P - Guide' not in after
+    assert after['P - Manual']['id'] == before['P - Guide']['id']
+    assert after['P - Beta']['parent_id'] == after['P - Manual']['id']
+
+
+def test_swapped_section_titles_move_pages(site):
+    before = site([{'Guide': [{'Beta': 'b.md'}]}, {'Manual': [{'Gamma': 'c.md'}]}])
+    after = site([{'Manual': [{'Beta': 'b.md'}]}, {'Guide': [{'Gamma': 'c.md'}]}])
+
+    # Section titles that still exist are found by title, so their children move instead
+    assert after['P - Beta']['parent_id'] == after['P - Manual']['id']
+    assert after['P - Gamma']['parent_id'] == after['P - Guide']['id']
+    assert len(after) == len(before)
+
+
+def test_new_file_does_not_take_a_bound_page(site):
+    before = site([{'Alpha': 'a.md'}])
+    after = site([{'Alpha 2': 'a.md'}, {'Alpha': 'e.md'}])
+
+    assert after['P - Alpha 2']['id'] == before['P - Alpha']['id']
+    # Created once the renamed page has let go of the title
+    after = site([{'Alpha 2': 'a.md'}, {'Alpha': 'e.md'}])
+    assert 'e.md' in after['P - Alpha']['body']
+
+
+def test_existing_title_outside_parent_is_left_alone(site, confluence):
+    elsewhere = confluence.space.add_page('Elsewhere', None)
+    outside = confluence.space.add_page('P - Outside', elsewhere['id'])
+
+    after = site([{'Outside': 'f.md'}])
+
+    assert after['P - Outside']['parent_id'] == elsewhere['id']
+    assert after['P - Outside']['version'] == outside['version']